@@ -0,0 +1,83 @@
+import numpy as np
+
+from invest_api.book_snapshot import BookSnapshot, instrument_ids
+from invest_api.utils import NANOS_IN_UNIT, nanos_to_float
+
+__all__ = ("BookArrays")
+
+
+class BookArrays:
+    """
+    Top of recorded order books of one instrument as NumPy arrays (one item per book, ordered by time).
+    Prices are float like in keeper storages.
+    """
+    def __init__(
+            self,
+            time_ns: np.ndarray,
+            bid: np.ndarray,
+            ask: np.ndarray,
+            bid_quantity: np.ndarray,
+            ask_quantity: np.ndarray
+    ) -> None:
+        self.time_ns = np.asarray(time_ns, dtype=np.int64)
+        self.bid = np.asarray(bid, dtype=np.float64)
+        self.ask = np.asarray(ask, dtype=np.float64)
+        self.bid_quantity = np.asarray(bid_quantity, dtype=np.int64)
+        self.ask_quantity = np.asarray(ask_quantity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.time_ns)
+
+    def has_bids_and_asks(self) -> np.ndarray:
+        """
+        :return: Mask of books with both sides (the same check as BookSnapshot.has_bids_and_asks)
+        """
+        return (self.bid_quantity != 0) & (self.ask_quantity != 0)
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, np.ndarray]) -> "BookArrays":
+        """
+        Columns of a ticker day read from keeper file storage (FileStorage.read_ticker_day), wide or array layout
+        """
+        if "bid_prices" in columns:
+            return cls(
+                columns["datetime"].astype("datetime64[ns]").astype(np.int64),
+                columns["bid_prices"][:, 0],
+                columns["ask_prices"][:, 0],
+                columns["bid_qtys"][:, 0],
+                columns["ask_qtys"][:, 0]
+            )
+
+        return cls(
+            columns["datetime"].astype("datetime64[ns]").astype(np.int64),
+            columns["bid_price_1"],
+            columns["ask_price_1"],
+            columns["bid_qty_1"],
+            columns["ask_qty_1"]
+        )
+
+    @classmethod
+    def from_snapshots(cls, books: list[BookSnapshot]) -> "BookArrays":
+        return cls(
+            np.array([x.time_ns for x in books], dtype=np.int64),
+            nanos_to_float(np.array([x.best_bid for x in books], dtype=np.int64)),
+            nanos_to_float(np.array([x.best_ask for x in books], dtype=np.int64)),
+            np.array([x.bid_quantities[0] for x in books], dtype=np.int64),
+            np.array([x.ask_quantities[0] for x in books], dtype=np.int64)
+        )
+
+    def to_snapshots(self, figi: str) -> list[BookSnapshot]:
+        """
+        Books with depth 1, e.g. for tick-by-tick run of a strategy
+        """
+        levels = np.zeros((len(self), 4, 1), dtype=np.int64)
+        levels[:, BookSnapshot.BID_PRICES, 0] = np.rint(self.bid * NANOS_IN_UNIT)
+        levels[:, BookSnapshot.BID_QUANTITIES, 0] = self.bid_quantity
+        levels[:, BookSnapshot.ASK_PRICES, 0] = np.rint(self.ask * NANOS_IN_UNIT)
+        levels[:, BookSnapshot.ASK_QUANTITIES, 0] = self.ask_quantity
+
+        instrument_id = instrument_ids.id(figi)
+        return [
+            BookSnapshot(instrument_id, int(time_ns), True, book_levels)
+            for time_ns, book_levels in zip(self.time_ns, levels)
+        ]
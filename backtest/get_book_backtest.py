@@ -0,0 +1,307 @@
+import logging
+from dataclasses import dataclass, field
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtest.book_arrays import BookArrays
+from configuration.settings import StrategySettings
+from trade_system.signal import SignalType
+from trade_system.strategies.get_book_strategy import GetBookStrategy
+
+__all__ = ("GetBookBacktest", "BacktestSignals", "BacktestResult")
+
+logger = logging.getLogger(__name__)
+
+NO_SIGNAL = -1
+# Rolling windows are processed by chunks, so temporary arrays of std are limited by chunk size * window
+WINDOWS_CHUNK_SIZE = 65536
+# The strategy calculates mean and std by streaming sums, so the result may differ from the backtest
+# for spreads at the band border (relative distance)
+BORDER_TOLERANCE = 1e-9
+
+
+@dataclass(eq=False, repr=True)
+class BacktestSignals:
+    # Positions of signals in merged (future and basic asset) order of books
+    events: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    signal_types: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    time_ns: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    # Price of the future: ask for long, bid for short
+    prices: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+
+
+@dataclass(eq=False, repr=True)
+class BacktestResult:
+    signals: BacktestSignals = field(default_factory=BacktestSignals)
+    # One item per trade
+    signal_types: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    open_time_ns: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    open_prices: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    close_time_ns: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    close_prices: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    # Profit in price points of the future per contract
+    pnl: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+
+    def summary(self) -> dict:
+        return {
+            "signals": len(self.signals.events),
+            "trades": len(self.pnl),
+            "pnl": float(self.pnl.sum()),
+            "win_rate": float((self.pnl > 0).mean()) if len(self.pnl) else 0.0
+        }
+
+
+class GetBookBacktest:
+    """
+    Vectorized GetBookStrategy over a day of recorded books of the future and its basic asset.
+    Signals are the same as tick-by-tick GetBookStrategy.detect_signal for books in the same order
+    (books are merged by time, the future first for equal time).
+    Positions are opened by market at recorded best price of the signal and closed by take or stop levels
+    against recorded quotes (or by the last book of the day). One position at a time.
+    """
+    __SIGNAL_MIN_TICKS_NAME = "SIGNAL_MIN_TICKS"
+    __LONG_TAKE_NAME = "LONG_TAKE"
+    __LONG_STOP_NAME = "LONG_STOP"
+    __SHORT_TAKE_NAME = "SHORT_TAKE"
+    __SHORT_STOP_NAME = "SHORT_STOP"
+    __MAX_BOOK_AGE_MS_NAME = "MAX_BOOK_AGE_MS"
+
+    def __init__(self, settings: StrategySettings) -> None:
+        self.__settings = settings
+
+        self.__signal_min_ticks = int(settings.settings[self.__SIGNAL_MIN_TICKS_NAME])
+        self.__long_take = float(settings.settings[self.__LONG_TAKE_NAME])
+        self.__long_stop = float(settings.settings[self.__LONG_STOP_NAME])
+        self.__short_take = float(settings.settings[self.__SHORT_TAKE_NAME])
+        self.__short_stop = float(settings.settings[self.__SHORT_STOP_NAME])
+        self.__max_book_age_ns = int(settings.settings.get(self.__MAX_BOOK_AGE_MS_NAME, "0")) * 1_000_000
+
+    def signals(self, future: BookArrays, basic: BookArrays) -> BacktestSignals:
+        return _signals(future, *self.__evaluate(future, basic)[:3])
+
+    def run(self, future: BookArrays, basic: BookArrays) -> BacktestResult:
+        order, last_future, signal_types, _ = self.__evaluate(future, basic)
+        signals = _signals(future, order, last_future, signal_types)
+
+        signal_events = np.flatnonzero(signal_types != NO_SIGNAL)
+        if not len(signal_events):
+            return BacktestResult(signals=signals)
+
+        # Quotes of the future for every event (the last known book)
+        has_future = last_future >= 0
+        event_time = np.where(has_future, future.time_ns[last_future], 0)
+        bid = np.where(has_future, future.bid[last_future], np.nan)
+        ask = np.where(has_future, future.ask[last_future], np.nan)
+
+        trades = []
+        next_event = 0
+        for event in signal_events:
+            # Signals are ignored while the position is opened
+            if event < next_event:
+                continue
+
+            close_event = self.__close_event(signal_types[event], event, bid, ask)
+            trades.append((event, close_event))
+            next_event = close_event + 1
+
+        open_events, close_events = (np.array(x, dtype=np.int64) for x in zip(*trades))
+        types = signal_types[open_events]
+        is_long = types == SignalType.LONG
+
+        open_prices = np.where(is_long, ask[open_events], bid[open_events])
+        close_prices = np.where(is_long, bid[close_events], ask[close_events])
+
+        return BacktestResult(
+            signals=signals,
+            signal_types=types,
+            open_time_ns=event_time[open_events],
+            open_prices=open_prices,
+            close_time_ns=event_time[close_events],
+            close_prices=close_prices,
+            pnl=np.where(is_long, close_prices - open_prices, open_prices - close_prices)
+        )
+
+    def verify(self, future: BookArrays, basic: BookArrays) -> bool:
+        """
+        Runs GetBookStrategy.detect_signal tick by tick on the same books and compares signals.
+        Differences are allowed only for spreads at the band border (float rounding).
+        """
+        valid_order, last_future, signal_types, border_distance = self.__evaluate(future, basic)
+        signals = _signals(future, valid_order, last_future, signal_types)
+
+        books = future.to_snapshots(self.__settings.figi) + basic.to_snapshots(self.__settings.basic_asset_figi)
+        order = _merged_order(future, basic)
+
+        strategy = GetBookStrategy(self.__settings)
+        strategy_signals = []
+        for book_index in order:
+            signal = strategy.detect_signal(books[book_index])
+            if signal:
+                strategy_signals.append((int(book_index), int(signal.signal_type)))
+
+        backtest_signals = [(int(x), int(y)) for x, y in zip(signals.events, signals.signal_types)]
+
+        distances = dict(zip(valid_order.tolist(), border_distance.tolist()))
+        differences = set(strategy_signals) ^ set(backtest_signals)
+        mismatches = [x for x in differences if distances.get(x[0], np.inf) > BORDER_TOLERANCE]
+
+        if mismatches:
+            logger.error(f"Backtest signals don't match strategy: "
+                         f"backtest {len(backtest_signals)}, strategy {len(strategy_signals)}, "
+                         f"mismatches {len(mismatches)}")
+            return False
+
+        if differences:
+            logger.info(f"Signals at the band border differ by float rounding: {len(differences)}")
+
+        return True
+
+    def __evaluate(
+            self,
+            future: BookArrays,
+            basic: BookArrays
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        :return: Merged order of valid books (indexes in concatenation future + basic),
+        index of the last future book, signal type (or NO_SIGNAL)
+        and relative distance of spreads to the band border for every event
+        """
+        order = _merged_order(future, basic)
+        is_future = order < len(future)
+
+        # Books without bids or asks are ignored by the strategy
+        valid = np.concatenate((future.has_bids_and_asks(), basic.has_bids_and_asks()))[order]
+        order = order[valid]
+        is_future = is_future[valid]
+
+        events = np.arange(len(order))
+        last_future_event = np.maximum.accumulate(np.where(is_future, events, -1)) if len(order) else events
+        last_basic_event = np.maximum.accumulate(np.where(~is_future, events, -1)) if len(order) else events
+
+        last_future = np.where(last_future_event >= 0, order[np.maximum(last_future_event, 0)], -1)
+        last_basic = np.where(last_basic_event >= 0, order[np.maximum(last_basic_event, 0)] - len(future), -1)
+
+        signal_types = np.full(len(order), NO_SIGNAL, dtype=np.int64)
+        border_distance = np.full(len(order), np.inf)
+
+        # Spreads are calculated when both books are known and not older than max age (PairSynchronizer)
+        is_paired = (last_future >= 0) & (last_basic >= 0)
+        if self.__max_book_age_ns and len(order):
+            # Books are ordered by time, so time of the event is the newest time
+            event_time = np.concatenate((future.time_ns, basic.time_ns))[order]
+            future_age = event_time - future.time_ns[np.maximum(last_future, 0)]
+            basic_age = event_time - basic.time_ns[np.maximum(last_basic, 0)]
+            is_paired &= (future_age <= self.__max_book_age_ns) & (basic_age <= self.__max_book_age_ns)
+
+        paired = np.flatnonzero(is_paired)
+        if not len(paired):
+            return order, last_future, signal_types, border_distance
+
+        future_index = last_future[paired]
+        basic_index = last_basic[paired]
+
+        # The same float operations as GetBookStrategy, so values are equal bit by bit
+        basic_asset_size = float(self.__settings.basic_asset_size)
+        base_price = (basic.bid[basic_index] * basic_asset_size + basic.ask[basic_index] * basic_asset_size) / 2
+
+        long_ready, long_match, long_distance = \
+            self.__spread_signals(future.ask[future_index] - base_price, lower=True)
+        short_ready, short_match, short_distance = \
+            self.__spread_signals(future.bid[future_index] - base_price, lower=False)
+
+        ready = long_ready & short_ready
+        paired_signals = np.full(len(paired), NO_SIGNAL, dtype=np.int64)
+
+        if self.__settings.short_enabled_flag:
+            paired_signals[ready & short_match] = SignalType.SHORT
+        paired_signals[ready & long_match] = SignalType.LONG
+
+        signal_types[paired] = paired_signals
+        border_distance[paired] = np.where(ready, np.minimum(long_distance, short_distance), np.inf)
+
+        return order, last_future, signal_types, border_distance
+
+    def __spread_signals(self, spreads: np.ndarray, lower: bool) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        The strategy keeps only changed spreads and checks the last spread against
+        mean and std (ddof=3) of the last SIGNAL_MIN_TICKS kept spreads.
+        :return: Masks of events when the spread is ready (new spread is added and there are enough spreads)
+        and when the last spread is out of the band, relative distance of the last spread to the band border
+        """
+        window = self.__signal_min_ticks
+
+        added = np.ones(len(spreads), dtype=bool)
+        added[1:] = spreads[1:] != spreads[:-1]
+
+        kept = spreads[added]
+        # Count of kept spreads after every event
+        kept_count = np.cumsum(added)
+
+        ready = added & (kept_count >= window)
+        match = np.zeros(len(spreads), dtype=bool)
+        distance = np.full(len(spreads), np.inf)
+
+        if window < 1 or len(kept) < window:
+            return ready, match, distance
+
+        windows = sliding_window_view(kept, window)
+        mean = np.empty(len(windows))
+        dev = np.empty(len(windows))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for start in range(0, len(windows), WINDOWS_CHUNK_SIZE):
+                chunk = windows[start:start + WINDOWS_CHUNK_SIZE]
+                mean[start:start + WINDOWS_CHUNK_SIZE] = chunk.mean(axis=1)
+                dev[start:start + WINDOWS_CHUNK_SIZE] = chunk.std(axis=1, ddof=3)
+
+        last = kept[window - 1:]
+        border = mean - dev if lower else mean + dev
+        window_match = last < border if lower else last > border
+
+        ready_events = np.flatnonzero(ready)
+        match[ready_events] = window_match[kept_count[ready_events] - window]
+
+        with np.errstate(invalid="ignore"):
+            window_distance = np.abs(last - border) / np.maximum(np.abs(last), 1.0)
+        distance[ready_events] = np.nan_to_num(window_distance, nan=np.inf)[kept_count[ready_events] - window]
+
+        return ready, match, distance
+
+    def __close_event(self, signal_type: int, open_event: int, bid: np.ndarray, ask: np.ndarray) -> int:
+        if signal_type == SignalType.LONG:
+            price = ask[open_event]
+            take, stop = price * self.__long_take, price * self.__long_stop
+            closes = np.flatnonzero((bid[open_event + 1:] >= take) | (bid[open_event + 1:] <= stop))
+        else:
+            price = bid[open_event]
+            take, stop = price * self.__short_take, price * self.__short_stop
+            closes = np.flatnonzero((ask[open_event + 1:] <= take) | (ask[open_event + 1:] >= stop))
+
+        # Position is closed by the last book of the day without take or stop
+        return open_event + 1 + int(closes[0]) if len(closes) else len(bid) - 1
+
+
+def _merged_order(future: BookArrays, basic: BookArrays) -> np.ndarray:
+    """
+    :return: Indexes in concatenation future + basic ordered by time (the future first for equal time)
+    """
+    return np.argsort(np.concatenate((future.time_ns, basic.time_ns)), kind="stable")
+
+
+def _signals(
+        future: BookArrays,
+        order: np.ndarray,
+        last_future: np.ndarray,
+        signal_types: np.ndarray
+) -> BacktestSignals:
+    events = np.flatnonzero(signal_types != NO_SIGNAL)
+    future_index = last_future[events]
+    types = signal_types[events]
+
+    return BacktestSignals(
+        events=order[events],
+        signal_types=types,
+        time_ns=future.time_ns[future_index],
+        prices=np.where(types == SignalType.LONG, future.ask[future_index], future.bid[future_index])
+    )
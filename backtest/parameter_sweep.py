@@ -0,0 +1,155 @@
+import dataclasses
+import itertools
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from backtest.book_arrays import BookArrays
+from backtest.get_book_backtest import GetBookBacktest
+from configuration.settings import StrategySettings
+
+__all__ = ("ParameterSweep", "SharedBooks")
+
+logger = logging.getLogger(__name__)
+
+BOOK_ARRAYS = ("time_ns", "bid", "ask", "bid_quantity", "ask_quantity")
+
+# Books of the worker process (views of shared memory)
+_worker_memory: Optional[shared_memory.SharedMemory] = None
+_worker_books: Optional[tuple[BookArrays, BookArrays]] = None
+
+
+class SharedBooks:
+    """
+    Book arrays of the future and the basic asset in one shared memory block.
+    Workers attach the block by name and use arrays without copy, so books aren't pickled per task.
+    """
+    def __init__(self, future: BookArrays, basic: BookArrays) -> None:
+        arrays = [(side, name, getattr(books, name))
+                  for side, books in enumerate((future, basic)) for name in BOOK_ARRAYS]
+
+        self.__memory = shared_memory.SharedMemory(create=True, size=max(1, sum(x.nbytes for _, _, x in arrays)))
+
+        # (side, name, dtype, offset, length) of every array
+        self.__layout = []
+        offset = 0
+        for side, name, array in arrays:
+            np.ndarray(array.shape, dtype=array.dtype, buffer=self.__memory.buf, offset=offset)[:] = array
+            self.__layout.append((side, name, array.dtype.str, offset, len(array)))
+            offset += array.nbytes
+
+    @property
+    def spec(self) -> tuple[str, list]:
+        """
+        :return: Name of shared memory and layout of arrays (picklable)
+        """
+        return self.__memory.name, self.__layout
+
+    def close(self) -> None:
+        self.__memory.close()
+        self.__memory.unlink()
+
+    @staticmethod
+    def attach(spec: tuple[str, list]) -> tuple[shared_memory.SharedMemory, BookArrays, BookArrays]:
+        name, layout = spec
+        memory = shared_memory.SharedMemory(name=name)
+
+        arrays = [dict(), dict()]
+        for side, array_name, dtype, offset, length in layout:
+            arrays[side][array_name] = np.ndarray((length,), dtype=np.dtype(dtype), buffer=memory.buf, offset=offset)
+
+        return memory, BookArrays(**arrays[0]), BookArrays(**arrays[1])
+
+
+class ParameterSweep:
+    """
+    Backtest of GetBooks strategy for every combination of parameter grid on a process pool.
+    Books are loaded once into shared memory. Results are sorted by PnL
+    and the best settings are formatted as sections of settings.ini.
+    """
+    def __init__(
+            self,
+            settings: StrategySettings,
+            grid: dict[str, list[str]],
+            workers: int = 0
+    ) -> None:
+        """
+        :param grid: Strategy setting name (e.g. SIGNAL_MIN_TICKS) -> values to check
+        :param workers: Count of processes. 0 - count of CPU
+        """
+        # Keys of configparser sections are lower case
+        self.__settings = dataclasses.replace(
+            settings, settings={key.upper(): value for key, value in settings.settings.items()}
+        )
+        self.__grid = {key.upper(): values for key, values in grid.items()}
+        self.__workers = workers or os.cpu_count()
+
+    def combinations(self) -> list[dict[str, str]]:
+        return [dict(zip(self.__grid.keys(), values)) for values in itertools.product(*self.__grid.values())]
+
+    def run(self, future: BookArrays, basic: BookArrays) -> list[tuple[dict[str, str], dict]]:
+        """
+        :return: (parameters, backtest summary) for all combinations, the best PnL first
+        """
+        combinations = self.combinations()
+        logger.info(f"Parameter sweep: combinations {len(combinations)}, workers {self.__workers}")
+
+        shared_books = SharedBooks(future, basic)
+        try:
+            with ProcessPoolExecutor(
+                    max_workers=self.__workers,
+                    initializer=_init_worker,
+                    initargs=(shared_books.spec,)
+            ) as executor:
+                summaries = list(executor.map(
+                    _run_backtest,
+                    [self.__strategy_settings(x) for x in combinations],
+                    # Several small tasks per message, but every worker gets work till the end
+                    chunksize=max(1, len(combinations) // (self.__workers * 4))
+                ))
+        finally:
+            shared_books.close()
+
+        results = list(zip(combinations, summaries))
+        results.sort(key=lambda x: (x[1]["pnl"], -x[1]["trades"]), reverse=True)
+
+        return results
+
+    def settings_sections(self, parameters: dict[str, str]) -> str:
+        """
+        :return: Sections of settings.ini for the strategy with the parameters
+        """
+        settings = self.__strategy_settings(parameters)
+        section = f"STRATEGY_{settings.ticker}"
+
+        lines = [
+            f"[{section}]",
+            f"STRATEGY_NAME={settings.name}",
+            f"TICKER={settings.ticker}",
+            f"FIGI={settings.figi}",
+            f"MAX_LOTS_PER_ORDER={settings.max_lots_per_order}",
+            f"SHORT_ENABLED_FLAG={int(settings.short_enabled_flag)}",
+            f"BASIC_ASSET_FIGI={settings.basic_asset_figi}",
+            f"BASIC_ASSET_SIZE={settings.basic_asset_size}",
+            f"[{section}_SETTINGS]"
+        ] + [f"{key}={value}" for key, value in settings.settings.items()]
+
+        return "\n".join(lines) + "\n"
+
+    def __strategy_settings(self, parameters: dict[str, str]) -> StrategySettings:
+        return dataclasses.replace(self.__settings, settings={**self.__settings.settings, **parameters})
+
+
+def _init_worker(spec: tuple[str, list]) -> None:
+    global _worker_memory, _worker_books
+
+    _worker_memory, future, basic = SharedBooks.attach(spec)
+    _worker_books = (future, basic)
+
+
+def _run_backtest(settings: StrategySettings) -> dict:
+    return GetBookBacktest(settings).run(*_worker_books).summary()
@@ -0,0 +1,33 @@
+import statistics
+import time
+from typing import Callable
+
+__all__ = ("print_latency", "print_rate", "best_time")
+
+
+def print_latency(name: str, timings: list[float]) -> None:
+    """
+    Prints median, p95 and mean of call timings (seconds) in milliseconds
+    """
+    timings = sorted(timings)
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+    print(f"{name}: median {statistics.median(timings) * 1000:.3f} ms, "
+          f"p95 {p95 * 1000:.3f} ms, mean {statistics.mean(timings) * 1000:.3f} ms")
+
+
+def best_time(function: Callable[[], object], repeat: int = 5) -> float:
+    """
+    :return: The best time (seconds) of several runs
+    """
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+
+    return min(timings)
+
+
+def print_rate(name: str, count: int, seconds: float, unit: str = "items") -> None:
+    print(f"{name}: {count / seconds:,.0f} {unit}/s ({seconds / count * 1e6:.3f} us per item)")
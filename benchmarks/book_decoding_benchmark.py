@@ -0,0 +1,46 @@
+"""
+Decoding of order book stream responses into BookSnapshot, books per second on one core:
+SDK path (protobuf -> SDK dataclasses -> BookSnapshot) vs raw path (protobuf -> BookSnapshot, RAW_ORDER_BOOKS=1).
+
+Usage (from the project root):
+    python -m benchmarks.book_decoding_benchmark --books 50000 --depth 10
+"""
+import argparse
+
+from tinkoff.invest import MarketDataResponse
+from tinkoff.invest._grpc_helpers import protobuf_to_dataclass
+from tinkoff.invest.grpc import marketdata_pb2
+
+from benchmarks.bench_utils import best_time, print_rate
+from benchmarks.book_samples import sample_response_proto
+from invest_api.book_snapshot import BookSnapshot
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=50000)
+    parser.add_argument("--depth", type=int, default=10)
+    args = parser.parse_args()
+
+    # Both paths start from bytes received by gRPC
+    payload = sample_response_proto(depth=args.depth).SerializeToString()
+
+    def sdk_path() -> None:
+        for _ in range(args.books):
+            response = protobuf_to_dataclass(marketdata_pb2.MarketDataResponse.FromString(payload), MarketDataResponse)
+            if response.orderbook:
+                BookSnapshot.from_order_book(response.orderbook, args.depth)
+
+    def raw_path() -> None:
+        for _ in range(args.books):
+            response = marketdata_pb2.MarketDataResponse.FromString(payload)
+            if response.HasField("orderbook"):
+                BookSnapshot.from_proto(response.orderbook, args.depth)
+
+    print(f"Books: {args.books}, depth: {args.depth}, response size: {len(payload)} bytes")
+    print_rate("SDK dataclasses path", args.books, best_time(sdk_path, repeat=3), "books")
+    print_rate("Raw protobuf path", args.books, best_time(raw_path, repeat=3), "books")
+
+
+if __name__ == "__main__":
+    main()
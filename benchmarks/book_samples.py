@@ -0,0 +1,43 @@
+import time
+
+from google.protobuf.timestamp_pb2 import Timestamp
+from tinkoff.invest import MarketDataResponse, OrderBook
+from tinkoff.invest._grpc_helpers import protobuf_to_dataclass
+from tinkoff.invest.grpc import common_pb2, marketdata_pb2
+
+from invest_api.utils import NANOS_IN_UNIT
+
+__all__ = ("sample_response_proto", "sample_order_book")
+
+# Price of the best bid and step between levels (nanos)
+BEST_BID_NANOS = 30_125 * NANOS_IN_UNIT + 500_000_000
+PRICE_STEP_NANOS = 250_000_000
+
+
+def sample_response_proto(figi: str = "FUTSBRF06260", depth: int = 10) -> marketdata_pb2.MarketDataResponse:
+    """
+    :return: Stream response with order book of full depth (as api sends it)
+    """
+    def order(nanos: int, quantity: int) -> marketdata_pb2.Order:
+        return marketdata_pb2.Order(
+            price=common_pb2.Quotation(units=nanos // NANOS_IN_UNIT, nano=nanos % NANOS_IN_UNIT),
+            quantity=quantity
+        )
+
+    time_ns = time.time_ns()
+
+    return marketdata_pb2.MarketDataResponse(orderbook=marketdata_pb2.OrderBook(
+        figi=figi,
+        depth=depth,
+        is_consistent=True,
+        bids=[order(BEST_BID_NANOS - level * PRICE_STEP_NANOS, 10 + level) for level in range(depth)],
+        asks=[order(BEST_BID_NANOS + (level + 1) * PRICE_STEP_NANOS, 20 + level) for level in range(depth)],
+        time=Timestamp(seconds=time_ns // NANOS_IN_UNIT, nanos=time_ns % NANOS_IN_UNIT)
+    ))
+
+
+def sample_order_book(figi: str = "FUTSBRF06260", depth: int = 10) -> OrderBook:
+    """
+    :return: Order book as SDK dataclasses (the way SDK stream returns it)
+    """
+    return protobuf_to_dataclass(sample_response_proto(figi, depth), MarketDataResponse).orderbook
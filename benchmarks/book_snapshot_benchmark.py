@@ -0,0 +1,65 @@
+"""
+Memory per retained order book and conversion cost:
+SDK OrderBook (dataclasses per level) vs BookSnapshot (one int64 array).
+
+Usage (from the project root):
+    python -m benchmarks.book_snapshot_benchmark --books 20000 --depth 10
+"""
+import argparse
+import copy
+import tracemalloc
+from typing import Callable
+
+from tinkoff.invest.utils import quotation_to_decimal
+
+from benchmarks.bench_utils import best_time, print_rate
+from benchmarks.book_samples import sample_order_book
+from invest_api.book_snapshot import BookSnapshot
+
+
+def retained_bytes(count: int, new_book: Callable[[], object]) -> float:
+    """
+    :return: Memory in bytes per retained book
+    """
+    tracemalloc.start()
+    start_size, _ = tracemalloc.get_traced_memory()
+
+    books = [new_book() for _ in range(count)]
+
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Memory of the list itself isn't memory of books
+    return (size - start_size - books.__sizeof__()) / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--depth", type=int, default=10)
+    args = parser.parse_args()
+
+    order_book = sample_order_book(depth=args.depth)
+
+    print(f"Books: {args.books}, depth: {args.depth}")
+    print(f"SDK OrderBook: {retained_bytes(args.books, lambda: copy.deepcopy(order_book)):,.0f} bytes per book")
+    print(f"BookSnapshot: "
+          f"{retained_bytes(args.books, lambda: BookSnapshot.from_order_book(order_book, args.depth)):,.0f} "
+          f"bytes per book (levels array {BookSnapshot.from_order_book(order_book, args.depth).nbytes} bytes)")
+
+    def decimal_levels() -> None:
+        # Conversion of every level by Decimal (as Keeper and strategies did before BookSnapshot)
+        for _ in range(args.books):
+            [float(quotation_to_decimal(x.price)) for x in order_book.bids]
+            [float(quotation_to_decimal(x.price)) for x in order_book.asks]
+
+    def snapshots() -> None:
+        for _ in range(args.books):
+            BookSnapshot.from_order_book(order_book, args.depth)
+
+    print_rate("Decimal per level", args.books, best_time(decimal_levels, repeat=3), "books")
+    print_rate("BookSnapshot.from_order_book", args.books, best_time(snapshots, repeat=3), "books")
+
+
+if __name__ == "__main__":
+    main()
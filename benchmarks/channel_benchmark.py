@@ -0,0 +1,118 @@
+"""
+Latency of unary calls of api services against a local stand-in gRPC server (TLS, UsersService/GetAccounts):
+tinkoff Client per call (services before ChannelManager: new TLS and HTTP/2 connection on every call)
+vs AccountService (sync wrapper: ChannelManager.run on the background loop, shared channel, rate limit interceptor)
+vs AsyncAccountService (grpc.aio channel of the running loop, rate limit interceptor).
+
+Usage (from the project root):
+    openssl req -x509 -newkey rsa:2048 -nodes -days 1 -subj "/CN=localhost" -keyout key.pem -out cert.pem
+    python -m benchmarks.channel_benchmark --cert cert.pem --key key.pem --calls 500
+"""
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable
+
+import grpc
+from tinkoff.invest import Client
+from tinkoff.invest.grpc import users_pb2
+
+from benchmarks.bench_utils import print_latency
+from configuration.settings import AccountSettings
+from invest_api.channel_manager import ChannelManager
+from invest_api.services.accounts_service import AccountService, AsyncAccountService
+
+USERS_SERVICE = "tinkoff.public.invest.api.contract.v1.UsersService"
+TOKEN = "benchmark-token"
+APP_NAME = "benchmark"
+
+
+def start_server(cert: bytes, key: bytes) -> tuple[grpc.Server, int]:
+    server = grpc.server(ThreadPoolExecutor(max_workers=4))
+    server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(
+        USERS_SERVICE,
+        {"GetAccounts": grpc.unary_unary_rpc_method_handler(
+            lambda request, context: users_pb2.GetAccountsResponse(),
+            request_deserializer=users_pb2.GetAccountsRequest.FromString,
+            response_serializer=users_pb2.GetAccountsResponse.SerializeToString
+        )}
+    ),))
+
+    port = server.add_secure_port("localhost:0", grpc.ssl_server_credentials([(key, cert)]))
+    server.start()
+    return server, port
+
+
+def measure(calls: int, call: Callable[[], object]) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        start_time = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start_time)
+
+    return timings
+
+
+async def async_measure(calls: int, call: Callable[[], Awaitable]) -> list[float]:
+    timings = []
+    for _ in range(calls):
+        start_time = time.perf_counter()
+        await call()
+        timings.append(time.perf_counter() - start_time)
+
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--cert", required=True, help="PEM certificate of the server (CN=localhost)")
+    parser.add_argument("--key", required=True, help="PEM private key of the server")
+    args = parser.parse_args()
+
+    # Channels of SDK and ChannelManager use default root certificates, the server certificate is trusted
+    # before the first TLS channel is created
+    os.environ["GRPC_DEFAULT_SSL_ROOTS_FILE_PATH"] = os.path.abspath(args.cert)
+
+    server, port = start_server(open(args.cert, "rb").read(), open(args.key, "rb").read())
+    target = f"localhost:{port}"
+
+    try:
+        def call_on_new_client() -> None:
+            with Client(TOKEN, target=target, app_name=APP_NAME) as client:
+                client.users.get_accounts()
+
+        # Services get the manager of the local server by the same token
+        channel_manager = ChannelManager.shared(TOKEN, APP_NAME, target)
+        account_settings = AccountSettings()
+
+        account_service = AccountService(TOKEN, APP_NAME)
+        # The connection is opened once (ChannelManager.warm_up)
+        channel_manager.warm_up()
+        account_service.trading_account_id(account_settings)
+
+        async_account_service = AsyncAccountService(TOKEN, APP_NAME)
+
+        async def run_async_service() -> list[float]:
+            await async_account_service.trading_account_id(account_settings)
+            timings = await async_measure(
+                args.calls, lambda: async_account_service.trading_account_id(account_settings)
+            )
+            await channel_manager.async_close()
+            return timings
+
+        print(f"Unary calls: {args.calls}, TLS")
+        print_latency("Client per call", measure(args.calls, call_on_new_client))
+        print_latency("AccountService (ChannelManager.run)",
+                      measure(args.calls, lambda: account_service.trading_account_id(account_settings)))
+        print_latency("AsyncAccountService", asyncio.run(run_async_service()))
+
+        channel_manager.close()
+    finally:
+        server.stop(grace=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Rows per second saved by keeper file storages (Parquet and Arrow) with one and several concurrent writers.
+Batches of different tickers are saved concurrently as KeepWorker writers do.
+
+Usage (from the project root):
+    python -m benchmarks.file_storage_benchmark --rows 200000 --tickers 20 --writers 1 4
+"""
+import argparse
+import asyncio
+import datetime
+import random
+import tempfile
+import time
+
+from benchmarks.bench_utils import print_rate
+from configuration.settings import KeepSettings
+from keeper.book_records import BookRecordLayout
+from keeper.storages.arrow_storage import ArrowStorage
+from keeper.storages.parquet_storage import ParquetStorage
+
+STORAGES = {"parquet": ParquetStorage, "arrow": ArrowStorage}
+
+
+def sample_batches(rows: int, tickers: int, batch_size: int, depth: int) -> list[list[tuple]]:
+    """
+    :return: Batches of wide layout rows, every batch has rows of one ticker
+    """
+    random.seed(1)
+    start_time = datetime.datetime(2026, 10, 16, 7, tzinfo=datetime.timezone.utc)
+
+    batches = []
+    for number in range(rows // batch_size):
+        ticker = f"TICKER{number % tickers}"
+        batch = []
+        for row in range(batch_size):
+            price = 100 + random.random()
+            batch.append(
+                (ticker, start_time + datetime.timedelta(microseconds=number * batch_size + row)) +
+                tuple(price - 0.01 * x for x in range(depth)) +
+                tuple(random.randint(1, 1000) for _ in range(depth)) +
+                tuple(price + 0.01 * (x + 1) for x in range(depth)) +
+                tuple(random.randint(1, 1000) for _ in range(depth))
+            )
+        batches.append(batch)
+
+    return batches
+
+
+async def save(storage_class, depth: int, writers: int, batches: list[list[tuple]]) -> float:
+    """
+    :return: Seconds to save all batches and finish files
+    """
+    with tempfile.TemporaryDirectory() as storage_dir:
+        keep_settings = KeepSettings(conn_string="", storage_dir=storage_dir, depth=depth)
+        storage = storage_class(keep_settings, BookRecordLayout(depth, "wide"))
+        await storage.open()
+
+        batch_queue = asyncio.Queue()
+        for batch in batches:
+            batch_queue.put_nowait(batch)
+
+        async def writer() -> None:
+            while not batch_queue.empty():
+                await storage.save_batch(batch_queue.get_nowait())
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(writer() for _ in range(writers)))
+        await storage.close()
+
+        return time.perf_counter() - start_time
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--tickers", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=10)
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    batches = sample_batches(args.rows, args.tickers, args.batch_size, args.depth)
+    rows = sum(len(x) for x in batches)
+    print(f"Rows: {rows}, tickers: {args.tickers}, batch size: {args.batch_size}, depth: {args.depth}")
+
+    for name, storage_class in STORAGES.items():
+        for writers in args.writers:
+            print_rate(f"{name}, writers {writers}", rows, asyncio.run(save(storage_class, args.depth, writers, batches)),
+                       "rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Throughput of fixed-point (int nanos) price helpers vs Decimal arithmetic:
+conversion of Quotation, rounding to the price increment (one price and numpy arrays).
+
+Usage (from the project root):
+    python -m benchmarks.fixed_point_benchmark --count 100000
+"""
+import argparse
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+from tinkoff.invest import Quotation
+from tinkoff.invest.utils import quotation_to_decimal
+
+from benchmarks.bench_utils import best_time, print_rate
+from invest_api.utils import NANOS_IN_UNIT, quotation_to_nanos, quotations_to_nanos, round_to_increment, \
+    decimal_to_nanos, nanos_to_quotation
+
+INCREMENT = Decimal("0.05")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    quotations = [Quotation(units=random.randint(1, 100_000), nano=random.randrange(0, NANOS_IN_UNIT, 10_000_000))
+                  for _ in range(args.count)]
+    decimals = [quotation_to_decimal(x) for x in quotations]
+    nanos = [quotation_to_nanos(x) for x in quotations]
+    nanos_array = quotations_to_nanos(quotations)
+    increment_nanos = decimal_to_nanos(INCREMENT)
+
+    print(f"Prices: {args.count}")
+
+    print_rate("Quotation -> Decimal", args.count,
+               best_time(lambda: [quotation_to_decimal(x) for x in quotations]), "prices")
+    print_rate("Quotation -> nanos", args.count,
+               best_time(lambda: [quotation_to_nanos(x) for x in quotations]), "prices")
+    print_rate("Quotation -> nanos array", args.count,
+               best_time(lambda: quotations_to_nanos(quotations)), "prices")
+
+    print_rate("Round Decimal to increment", args.count,
+               best_time(lambda: [(x / INCREMENT).quantize(Decimal(1), ROUND_HALF_UP) * INCREMENT for x in decimals]),
+               "prices")
+    print_rate("Round nanos to increment", args.count,
+               best_time(lambda: [round_to_increment(x, increment_nanos) for x in nanos]), "prices")
+    print_rate("Round nanos array to increment", args.count,
+               best_time(lambda: round_to_increment(nanos_array, increment_nanos)), "prices")
+
+    print_rate("nanos -> Quotation", args.count,
+               best_time(lambda: [nanos_to_quotation(x) for x in nanos]), "prices")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@ from decimal import Decimal
 from tinkoff.invest import OrderState
 
 from configuration.settings import BlogSettings, StrategySettings
+from invest_api.instrument_registry import InstrumentRegistry
 from invest_api.utils import moneyvalue_to_decimal
 from trade_system.signal import SignalType
 from trade_system.strategies.base_strategy import IStrategy
@@ -23,11 +24,13 @@ class Blogger:
             self,
             blog_settings: BlogSettings,
             trade_strategies: list[StrategySettings],
-            messages_queue: asyncio.Queue
+            messages_queue: asyncio.Queue,
+            instrument_registry: InstrumentRegistry
     ) -> None:
         self.__blog_status = blog_settings.blog_status
         self.__trade_strategies: dict[str, StrategySettings] = {x.figi: x for x in trade_strategies}
         self.__messages_queue = messages_queue
+        self.__instrument_registry = instrument_registry
 
     def __send_text_message(self, text: str) -> None:
         try:
@@ -70,7 +73,7 @@ class Blogger:
         if self.__blog_status and trade_order:
             signal_type = Blogger.__signal_type_to_message_test(trade_order.signal.signal_type)
             self.__send_text_message(
-                f"{self.__trade_strategies[trade_order.signal.figi].ticker} position {signal_type} has been closed."
+                f"{self.__ticker(trade_order.signal.figi)} position {signal_type} has been closed."
             )
 
     def open_position_message(self, trade_order: TradeOrder) -> None:
@@ -80,7 +83,7 @@ class Blogger:
         if self.__blog_status and trade_order:
             signal_type = Blogger.__signal_type_to_message_test(trade_order.signal.signal_type)
             self.__send_text_message(
-                f"{self.__trade_strategies[trade_order.signal.figi].ticker} position {signal_type} has been opened. "
+                f"{self.__ticker(trade_order.signal.figi)} position {signal_type} has been opened. "
                 f"Take profit level: {trade_order.signal.take_profit_level:.2f}. "
                 f"Stop loss level: {trade_order.signal.stop_loss_level:.2f}."
             )
@@ -135,7 +138,7 @@ class Blogger:
             summary_commission = moneyvalue_to_decimal(open_order_state.executed_commission) + \
                                  moneyvalue_to_decimal(open_order_state.service_commission)
             self.__send_text_message(
-                f"Open {signal_type} position for {self.__trade_strategies[trade_order.signal.figi].ticker}. "
+                f"Open {signal_type} position for {self.__ticker(trade_order.signal.figi)}. "
                 f"Lots executed: {open_order_state.lots_executed}. "
                 f"Average price: "
                 f"{moneyvalue_to_decimal(open_order_state.average_position_price):.2f}. "
@@ -161,7 +164,7 @@ class Blogger:
                                  moneyvalue_to_decimal(close_order_state.executed_commission) + \
                                  moneyvalue_to_decimal(close_order_state.service_commission)
             self.__send_text_message(
-                f"Close {signal_type} position for {self.__trade_strategies[trade_order.signal.figi].ticker}. "
+                f"Close {signal_type} position for {self.__ticker(trade_order.signal.figi)}. "
                 f"Lots executed: {close_order_state.lots_executed}. "
                 f"Average open price: "
                 f"{moneyvalue_to_decimal(open_order_state.average_position_price):.2f}. "
@@ -173,6 +176,10 @@ class Blogger:
                 f"{summary_commission:.2f}."
             )
 
+    def __ticker(self, figi: str) -> str:
+        strategy_settings = self.__trade_strategies.get(figi, None)
+        return self.__instrument_registry.ticker(figi) or (strategy_settings.ticker if strategy_settings else figi)
+
     @staticmethod
     def __signal_type_to_message_test(signal_type: SignalType) -> str:
         return "long" if signal_type == SignalType.LONG else "short"
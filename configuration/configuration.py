@@ -1,6 +1,8 @@
 from configparser import ConfigParser
+from decimal import Decimal
 
-from configuration.settings import StrategySettings, AccountSettings, TradingSettings, BlogSettings, KeepSettings
+from configuration.settings import StrategySettings, AccountSettings, TradingSettings, BlogSettings, KeepSettings, \
+    RegistrySettings, UniverseSettings, StreamSettings
 
 __all__ = ("ProgramConfiguration")
 
@@ -31,11 +33,55 @@ class ProgramConfiguration:
         self.__trading_settings = TradingSettings(
             delay_start_after_open=int(config["TRADING_SETTINGS"]["DELAY_START_AFTER_EXCHANGE_OPEN_SECONDS"]),
             stop_trade_before_close=int(config["TRADING_SETTINGS"]["STOP_TRADE_BEFORE_EXCHANGE_CLOSE_SECONDS"]),
-            stop_signals_before_close=int(config["TRADING_SETTINGS"]["STOP_SIGNALS_BEFORE_EXCHANGE_CLOSE_MINUTES"])
+            stop_signals_before_close=int(config["TRADING_SETTINGS"]["STOP_SIGNALS_BEFORE_EXCHANGE_CLOSE_MINUTES"]),
+            preparation_concurrency=int(config["TRADING_SETTINGS"]["PREPARATION_CONCURRENCY"])
         )
 
         self.__keep_settings = KeepSettings(
-            conn_string = config["KEEPER"]["CONN_STRING"]
+            conn_string = config["KEEPER"]["CONN_STRING"],
+            storage=config["KEEPER"]["STORAGE"],
+            storage_dir=config["KEEPER"]["STORAGE_DIR"],
+            partitions=bool(int(config["KEEPER"]["PARTITIONS"])),
+            partitions_ahead=int(config["KEEPER"]["PARTITIONS_AHEAD"]),
+            partitions_retention_days=int(config["KEEPER"]["PARTITIONS_RETENTION_DAYS"]),
+            ticker_partitions=int(config["KEEPER"]["TICKER_PARTITIONS"]),
+            table_name=config["KEEPER"]["TABLE_NAME"],
+            depth=int(config["KEEPER"]["DEPTH"]),
+            layout=config["KEEPER"]["LAYOUT"],
+            max_batch_size=int(config["KEEPER"]["MAX_BATCH_SIZE"]),
+            max_latency_ms=int(config["KEEPER"]["MAX_LATENCY_MS"]),
+            writers=int(config["KEEPER"]["WRITERS"]),
+            queue_size=int(config["KEEPER"]["QUEUE_SIZE"]),
+            overflow_policy=config["KEEPER"]["OVERFLOW_POLICY"],
+            spill_dir=config["KEEPER"]["SPILL_DIR"],
+            deduplicate=bool(int(config["KEEPER"]["DEDUPLICATE"])),
+            write_ahead_log=bool(int(config["KEEPER"]["WRITE_AHEAD_LOG"])),
+            wal_dir=config["KEEPER"]["WAL_DIR"],
+            wal_segment_size_mb=int(config["KEEPER"]["WAL_SEGMENT_SIZE_MB"])
+        )
+
+        self.__registry_settings = RegistrySettings(
+            snapshot_file=config["INSTRUMENTS"]["SNAPSHOT_FILE"],
+            ttl_seconds=int(config["INSTRUMENTS"]["TTL_SECONDS"])
+        )
+
+        self.__universe_settings = UniverseSettings(
+            universe_status=bool(int(config["UNIVERSE"]["STATUS"])),
+            strategy_name=config["UNIVERSE"]["STRATEGY_NAME"],
+            max_lots_per_order=int(config["UNIVERSE"]["MAX_LOTS_PER_ORDER"]),
+            basic_assets=[x.strip() for x in config["UNIVERSE"]["BASIC_ASSETS"].split(",") if x.strip()],
+            settings=config["UNIVERSE_SETTINGS"]
+        )
+
+        self.__stream_settings = StreamSettings(
+            subscriptions_per_stream=int(config["STREAMS"]["SUBSCRIPTIONS_PER_STREAM"]),
+            max_connections=int(config["STREAMS"]["MAX_CONNECTIONS"]),
+            snapshot_after_reconnect=bool(int(config["STREAMS"]["SNAPSHOT_AFTER_RECONNECT"])),
+            raw_order_books=bool(int(config["STREAMS"]["RAW_ORDER_BOOKS"])),
+            record_market_data=bool(int(config["STREAMS"]["RECORD_MARKET_DATA"])),
+            record_dir=config["STREAMS"]["RECORD_DIR"],
+            replay_dir=config["STREAMS"]["REPLAY_DIR"],
+            replay_speed=float(config["STREAMS"]["REPLAY_SPEED"])
         )
 
         self.__trade_strategy_settings = []
@@ -47,7 +93,11 @@ class ProgramConfiguration:
                         figi=config[strategy_section]["FIGI"],
                         ticker=config[strategy_section]["TICKER"],
                         max_lots_per_order=int(config[strategy_section]["MAX_LOTS_PER_ORDER"]),
-                        settings=config[strategy_section + "_SETTINGS"]
+                        settings=config[strategy_section + "_SETTINGS"],
+                        # Optional keys (e.g. sections of parameter sweep), instruments api updates them at start
+                        short_enabled_flag=bool(int(config[strategy_section].get("SHORT_ENABLED_FLAG", "1"))),
+                        basic_asset_figi=config[strategy_section].get("BASIC_ASSET_FIGI", ""),
+                        basic_asset_size=Decimal(config[strategy_section].get("BASIC_ASSET_SIZE", "1"))
                     )
                 )
 
@@ -77,4 +127,16 @@ class ProgramConfiguration:
 
     @property
     def keep_settings(self) -> KeepSettings:
-        return self.__keep_settings
\ No newline at end of file
+        return self.__keep_settings
+
+    @property
+    def registry_settings(self) -> RegistrySettings:
+        return self.__registry_settings
+
+    @property
+    def universe_settings(self) -> UniverseSettings:
+        return self.__universe_settings
+
+    @property
+    def stream_settings(self) -> StreamSettings:
+        return self.__stream_settings
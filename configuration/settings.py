@@ -1,6 +1,6 @@
 from dataclasses import dataclass, field
 
-__all__ = ("StrategySettings", "AccountSettings", "ShareSettings", "FutureSettings", "TradingSettings", "BlogSettings", "KeepSettings")
+__all__ = ("StrategySettings", "AccountSettings", "InstrumentSettings", "ShareSettings", "CurrencySettings", "FutureSettings", "TradingSettings", "BlogSettings", "KeepSettings", "RegistrySettings", "UniverseSettings", "StreamSettings")
 
 @dataclass(eq=False, repr=True)
 class StrategySettings:
@@ -27,12 +27,16 @@ class AccountSettings:
 class InstrumentSettings:
     ticker: str = ""
     figi: str = ""
+    uid: str = ""
+    position_uid: str = ""
     lot: int = 1
     short_enabled_flag: bool = False
     otc_flag: bool = False
     buy_available_flag: bool = False
     sell_available_flag: bool = False
     api_trade_available_flag: bool = False
+    # Minimal price step in nanos (fixed-point)
+    min_price_increment: int = 0
 
 
 @dataclass(eq=False, repr=True)
@@ -40,6 +44,11 @@ class ShareSettings(InstrumentSettings):
     pass
 
 
+@dataclass(eq=False, repr=True)
+class CurrencySettings(InstrumentSettings):
+    pass
+
+
 @dataclass(eq=False, repr=True)
 class FutureSettings(InstrumentSettings):
     basic_asset: str = ""
@@ -53,6 +62,8 @@ class TradingSettings:
     delay_start_after_open: int = 10
     stop_trade_before_close: int = 300
     stop_signals_before_close: int = 60
+    # Maximum of parallel api requests during preparations for trading day
+    preparation_concurrency: int = 10
 
 
 @dataclass(eq=False, repr=True)
@@ -63,4 +74,71 @@ class BlogSettings:
 
 @dataclass(eq=False, repr=True)
 class KeepSettings:
-    conn_string: str
\ No newline at end of file
+    conn_string: str
+    # postgres, parquet or arrow (files in storage_dir)
+    storage: str = "postgres"
+    storage_dir: str = "books"
+    # Daily range partitions of postgres table
+    partitions: bool = False
+    partitions_ahead: int = 2
+    # Older partitions are detached. 0 - all partitions are kept attached
+    partitions_retention_days: int = 0
+    # Count of hash sub-partitions by ticker. 0 - without sub-partitions
+    ticker_partitions: int = 0
+    table_name: str = "order_book"
+    # Count of order book levels to save (up to subscribed depth)
+    depth: int = 1
+    # wide - column per level, array - array column per side
+    layout: str = "wide"
+    max_batch_size: int = 1000
+    # Count of concurrent COPY writers (connections of pool)
+    writers: int = 2
+    # Maximum time of record in batch before saving
+    max_latency_ms: int = 1000
+    # Size of data queue. 0 - unbounded
+    queue_size: int = 100000
+    # block, drop_oldest or spill (to local file)
+    overflow_policy: str = "block"
+    spill_dir: str = "spill"
+    # Save only books with changed levels (up to depth)
+    deduplicate: bool = False
+    # Records are written into local write-ahead log first and replayed into DB
+    write_ahead_log: bool = False
+    wal_dir: str = "wal"
+    wal_segment_size_mb: int = 64
+
+
+@dataclass(eq=False, repr=True)
+class RegistrySettings:
+    snapshot_file: str = ""
+    ttl_seconds: int = 86400
+
+
+@dataclass(eq=False, repr=True)
+class UniverseSettings:
+    universe_status: bool = False
+    strategy_name: str = ""
+    max_lots_per_order: int = 1
+    # Tickers of basic assets to select futures. Empty list - all futures
+    basic_assets: list[str] = field(default_factory=list)
+    # Template of internal strategy settings for every future
+    settings: dict = field(default_factory=dict)
+
+
+@dataclass(eq=False, repr=True)
+class StreamSettings:
+    # Subscriptions per one stream connection. More instruments are split between several connections
+    subscriptions_per_stream: int = 100
+    # Maximum of stream connections for order books. 0 - limit of the account tariff
+    max_connections: int = 0
+    # Request unary order books after reconnect of stream
+    snapshot_after_reconnect: bool = True
+    # Decode order books from raw protobuf into BookSnapshot (without tinkoff SDK dataclasses)
+    raw_order_books: bool = False
+    # Record all messages of market data streams into files
+    record_market_data: bool = False
+    record_dir: str = "records"
+    # Replay recorded files instead of api streams (empty - api streams)
+    replay_dir: str = ""
+    # 1 - real time, N - N times faster, 0 - as fast as possible
+    replay_speed: float = 1.0
@@ -0,0 +1,163 @@
+import datetime
+import threading
+
+import numpy as np
+from tinkoff.invest import OrderBook
+
+from invest_api.utils import NANOS_IN_UNIT, quotation_to_nanos
+
+__all__ = ("BookSnapshot", "InstrumentIds", "instrument_ids", "DEFAULT_DEPTH")
+
+DEFAULT_DEPTH = 10
+
+
+class InstrumentIds:
+    """
+    Compact int ids of instruments (figi), so book snapshots don't keep strings
+    """
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__ids: dict[str, int] = dict()
+        self.__figies: list[str] = []
+
+    def id(self, figi: str) -> int:
+        instrument_id = self.__ids.get(figi, None)
+        if instrument_id is not None:
+            return instrument_id
+
+        with self.__lock:
+            instrument_id = self.__ids.get(figi, None)
+            if instrument_id is None:
+                instrument_id = len(self.__figies)
+                self.__figies.append(figi)
+                self.__ids[figi] = instrument_id
+
+            return instrument_id
+
+    def figi(self, instrument_id: int) -> str:
+        return self.__figies[instrument_id]
+
+
+instrument_ids = InstrumentIds()
+
+
+class BookSnapshot:
+    """
+    Order book with fixed depth and fixed layout. All levels are kept in one preallocated int64 array
+    (rows: bid prices, bid quantities, ask prices, ask quantities), prices are fixed-point (nanos).
+    Empty levels have zero price and quantity.
+    A tick costs one small object and one array instead of dozens of Order and Quotation objects.
+    """
+    __slots__ = ("instrument_id", "time_ns", "is_consistent", "levels")
+
+    BID_PRICES = 0
+    BID_QUANTITIES = 1
+    ASK_PRICES = 2
+    ASK_QUANTITIES = 3
+
+    def __init__(
+            self,
+            instrument_id: int,
+            time_ns: int,
+            is_consistent: bool,
+            levels: np.ndarray
+    ) -> None:
+        self.instrument_id = instrument_id
+        self.time_ns = time_ns
+        self.is_consistent = is_consistent
+        self.levels = levels
+
+    @property
+    def figi(self) -> str:
+        return instrument_ids.figi(self.instrument_id)
+
+    @property
+    def time(self) -> datetime.datetime:
+        return datetime.datetime.fromtimestamp(self.time_ns / NANOS_IN_UNIT, tz=datetime.timezone.utc)
+
+    @property
+    def depth(self) -> int:
+        return self.levels.shape[1]
+
+    @property
+    def bid_prices(self) -> np.ndarray:
+        return self.levels[self.BID_PRICES]
+
+    @property
+    def bid_quantities(self) -> np.ndarray:
+        return self.levels[self.BID_QUANTITIES]
+
+    @property
+    def ask_prices(self) -> np.ndarray:
+        return self.levels[self.ASK_PRICES]
+
+    @property
+    def ask_quantities(self) -> np.ndarray:
+        return self.levels[self.ASK_QUANTITIES]
+
+    @property
+    def best_bid(self) -> int:
+        return int(self.levels[self.BID_PRICES, 0])
+
+    @property
+    def best_ask(self) -> int:
+        return int(self.levels[self.ASK_PRICES, 0])
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: Size of levels data in bytes
+        """
+        return self.levels.nbytes
+
+    def has_bids_and_asks(self) -> bool:
+        return bool(self.levels[self.BID_QUANTITIES, 0]) and bool(self.levels[self.ASK_QUANTITIES, 0])
+
+    def __bool__(self) -> bool:
+        return bool(self.levels[self.BID_QUANTITIES, 0] or self.levels[self.ASK_QUANTITIES, 0])
+
+    def __repr__(self) -> str:
+        return f"BookSnapshot(figi={self.figi}, time_ns={self.time_ns}, " \
+               f"bid={self.best_bid}x{self.levels[self.BID_QUANTITIES, 0]}, " \
+               f"ask={self.best_ask}x{self.levels[self.ASK_QUANTITIES, 0]})"
+
+    @classmethod
+    def from_proto(cls, order_book, depth: int = DEFAULT_DEPTH) -> "BookSnapshot":
+        """
+        Decode raw protobuf OrderBook (tinkoff.invest.grpc.marketdata_pb2.OrderBook) without SDK dataclasses
+        """
+        return cls(
+            instrument_ids.id(order_book.figi),
+            order_book.time.seconds * NANOS_IN_UNIT + order_book.time.nanos,
+            order_book.is_consistent,
+            _levels(order_book.bids, order_book.asks, depth)
+        )
+
+    @classmethod
+    def from_order_book(cls, order_book: OrderBook, depth: int = DEFAULT_DEPTH) -> "BookSnapshot":
+        """
+        Convert order book of tinkoff SDK (stream or unary response)
+        """
+        return cls(
+            instrument_ids.id(order_book.figi),
+            int(order_book.time.timestamp()) * NANOS_IN_UNIT + order_book.time.microsecond * 1000,
+            order_book.is_consistent,
+            _levels(order_book.bids, order_book.asks, depth)
+        )
+
+
+def _levels(bids, asks, depth: int) -> np.ndarray:
+    # Both protobuf and SDK orders have price (units, nano) and quantity
+    levels = np.zeros((4, depth), dtype=np.int64)
+
+    bids = bids[:depth]
+    if bids:
+        levels[BookSnapshot.BID_PRICES, :len(bids)] = [quotation_to_nanos(x.price) for x in bids]
+        levels[BookSnapshot.BID_QUANTITIES, :len(bids)] = [x.quantity for x in bids]
+
+    asks = asks[:depth]
+    if asks:
+        levels[BookSnapshot.ASK_PRICES, :len(asks)] = [quotation_to_nanos(x.price) for x in asks]
+        levels[BookSnapshot.ASK_QUANTITIES, :len(asks)] = [x.quantity for x in asks]
+
+    return levels
@@ -0,0 +1,289 @@
+import asyncio
+import contextlib
+import logging
+import threading
+from typing import Any, AsyncIterator, Coroutine, Iterator, Optional, TypeVar
+
+import grpc
+from grpc import StatusCode
+from tinkoff.invest import RequestError, AioRequestError, GetUserTariffResponse
+from tinkoff.invest.async_services import AsyncServices
+from tinkoff.invest.constants import INVEST_GRPC_API
+from tinkoff.invest.services import Services
+
+from invest_api.rate_limiter import RateLimiter, RateLimitInterceptor, AsyncRateLimitInterceptor
+
+__all__ = ("ChannelManager")
+
+logger = logging.getLogger(__name__)
+
+# Keepalive pings keep the connection (TLS + HTTP/2) open between requests
+KEEPALIVE_TIME_MS = 30000
+KEEPALIVE_TIMEOUT_MS = 10000
+
+MAX_RECEIVE_MESSAGE_LENGTH = 16 * 1024 * 1024
+
+CHANNEL_OPTIONS = (
+    ("grpc.max_receive_message_length", MAX_RECEIVE_MESSAGE_LENGTH),
+    ("grpc.keepalive_time_ms", KEEPALIVE_TIME_MS),
+    ("grpc.keepalive_timeout_ms", KEEPALIVE_TIMEOUT_MS),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+)
+
+# Every stream channel opens its own connection instead of sharing subchannel (and TCP connection) with others
+STREAM_CHANNEL_OPTIONS = CHANNEL_OPTIONS + (
+    ("grpc.use_local_subchannel_pool", 1),
+)
+
+# Status codes mean the connection is broken and has to be recreated
+RECONNECT_STATUS_CODES = {StatusCode.UNAVAILABLE}
+
+T = TypeVar("T")
+
+
+class ChannelManager:
+    """
+    Process-wide persistent gRPC channels for tinkoff api (sync and grpc.aio).
+    All services with the same token share one channel, so a request costs one RTT
+    instead of TLS and HTTP/2 handshake on every call.
+    Channels are created lazily and recreated after shutdown or connection errors.
+    Every unary request waits for client-side rate limiter configured by tariff of the account.
+    Sync services run coroutines of async services on the background event loop of the manager.
+    """
+    __managers: dict[tuple[str, str], "ChannelManager"] = dict()
+    __managers_lock = threading.Lock()
+
+    def __init__(self, token: str, app_name: str, target: str = INVEST_GRPC_API) -> None:
+        """
+        :param target: Address of api (e.g. sandbox or local stand-in server)
+        """
+        self.__token = token
+        self.__app_name = app_name
+        self.__target = target
+
+        self.__lock = threading.Lock()
+        self.__channel: Optional[grpc.Channel] = None
+        self.__channel_state: Optional[grpc.ChannelConnectivity] = None
+
+        # grpc.aio channel is bound to the event loop it has been created in, so every loop has its own channel
+        self.__async_channels: dict[asyncio.AbstractEventLoop, grpc.aio.Channel] = dict()
+        self.__background_loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.__rate_limiter = RateLimiter()
+        self.__stream_limits: dict[str, int] = dict()
+
+    @classmethod
+    def shared(cls, token: str, app_name: str, target: str = INVEST_GRPC_API) -> "ChannelManager":
+        """
+        :param target: Address of api, it's used only when the manager is created
+        :return: Channel manager shared by all services with the token
+        """
+        with cls.__managers_lock:
+            manager = cls.__managers.get((token, app_name), None)
+
+            if not manager:
+                manager = ChannelManager(token, app_name, target)
+                cls.__managers[(token, app_name)] = manager
+
+            return manager
+
+    @classmethod
+    def managers(cls) -> list["ChannelManager"]:
+        with cls.__managers_lock:
+            return list(cls.__managers.values())
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return self.__rate_limiter
+
+    def configure_limits(self, tariff: GetUserTariffResponse) -> None:
+        """
+        Apply limits of the account tariff: unary requests per minute and stream connections
+        """
+        self.__rate_limiter.configure(tariff.unary_limits)
+
+        self.__stream_limits = {stream.lstrip("/"): stream_limit.limit
+                                for stream_limit in tariff.stream_limits
+                                for stream in stream_limit.streams}
+
+    def stream_limit(self, stream: str, default: int = 1) -> int:
+        """
+        :param stream: Name of stream method (or its end), e.g. MarketDataStreamService/MarketDataStream
+        :return: Limit of open connections for the stream
+        """
+        for name, limit in self.__stream_limits.items():
+            if name.endswith(stream):
+                return limit
+
+        return default
+
+    @contextlib.contextmanager
+    def client(self) -> Iterator[Services]:
+        """
+        Api client on the shared channel. Unlike tinkoff Client, the channel isn't closed on exit.
+        """
+        channel = self.__get_channel()
+
+        try:
+            yield Services(channel, token=self.__token, app_name=self.__app_name)
+        except RequestError as ex:
+            if ex.code in RECONNECT_STATUS_CODES:
+                logger.info(f"Channel will be recreated by error code: {ex.code}")
+                self.__reset(channel)
+            raise
+
+    @contextlib.asynccontextmanager
+    async def async_client(self) -> AsyncIterator[AsyncServices]:
+        """
+        Async api client on the shared grpc.aio channel of the running event loop.
+        """
+        channel = self.__get_async_channel()
+
+        try:
+            yield AsyncServices(channel, token=self.__token, app_name=self.__app_name)
+        except AioRequestError as ex:
+            if ex.code in RECONNECT_STATUS_CODES:
+                logger.info(f"Async channel will be recreated by error code: {ex.code}")
+                self.__async_reset(channel)
+            raise
+
+    @contextlib.asynccontextmanager
+    async def async_stream_channel(self) -> AsyncIterator[grpc.aio.Channel]:
+        """
+        Dedicated grpc.aio channel (separate connection) for long-living streams.
+        The channel is closed on exit.
+        """
+        channel = grpc.aio.secure_channel(self.__target, grpc.ssl_channel_credentials(), STREAM_CHANNEL_OPTIONS)
+
+        try:
+            yield channel
+        finally:
+            await channel.close()
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """
+        Runs coroutine on the background event loop and waits for the result.
+        Sync services are thin wrappers over async ones, so both versions share one implementation.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.__get_background_loop()).result()
+
+    def async_services(self, channel: grpc.aio.Channel) -> AsyncServices:
+        """
+        Async api client on the given channel (e.g. dedicated stream channel)
+        """
+        return AsyncServices(channel, token=self.__token, app_name=self.__app_name)
+
+    def metadata(self) -> list[tuple[str, str]]:
+        """
+        :return: Request metadata for raw gRPC stubs
+        """
+        return [("authorization", f"Bearer {self.__token}"), ("x-app-name", self.__app_name)]
+
+    def is_healthy(self) -> bool:
+        """
+        :return: True - channel is connected or idle and ready to reconnect
+        """
+        return self.__channel is not None and \
+            self.__channel_state in (grpc.ChannelConnectivity.READY, grpc.ChannelConnectivity.IDLE)
+
+    def warm_up(self, timeout: float = 10) -> bool:
+        """
+        Open connection in advance to avoid handshake on the first request.
+        :return: True - channel is ready
+        """
+        try:
+            grpc.channel_ready_future(self.__get_channel()).result(timeout=timeout)
+            return True
+        except grpc.FutureTimeoutError:
+            logger.error(f"Channel isn't ready after {timeout} seconds")
+            return False
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__channel:
+                self.__close_channel(self.__channel)
+                self.__channel = None
+
+    async def async_close(self) -> None:
+        """
+        Closes async channel of the running event loop
+        """
+        with self.__lock:
+            channel = self.__async_channels.pop(asyncio.get_running_loop(), None)
+
+        if channel:
+            await channel.close()
+
+    def __get_channel(self) -> grpc.Channel:
+        with self.__lock:
+            if self.__channel is None or self.__channel_state == grpc.ChannelConnectivity.SHUTDOWN:
+                logger.info("Create gRPC channel")
+
+                self.__channel_state = None
+                self.__channel = grpc.intercept_channel(
+                    grpc.secure_channel(self.__target, grpc.ssl_channel_credentials(), CHANNEL_OPTIONS),
+                    RateLimitInterceptor(self.__rate_limiter)
+                )
+                self.__channel.subscribe(self.__on_state_change, try_to_connect=True)
+
+            return self.__channel
+
+    def __reset(self, channel: grpc.Channel) -> None:
+        with self.__lock:
+            # Another request may have already recreated the channel
+            if self.__channel is channel:
+                self.__close_channel(channel)
+                self.__channel = None
+
+    def __get_async_channel(self) -> grpc.aio.Channel:
+        loop = asyncio.get_running_loop()
+
+        with self.__lock:
+            channel = self.__async_channels.get(loop, None)
+
+            if channel is None:
+                logger.info("Create async gRPC channel")
+
+                channel = grpc.aio.secure_channel(
+                    self.__target,
+                    grpc.ssl_channel_credentials(),
+                    CHANNEL_OPTIONS,
+                    interceptors=[AsyncRateLimitInterceptor(self.__rate_limiter)]
+                )
+                self.__async_channels[loop] = channel
+
+            return channel
+
+    def __async_reset(self, channel: grpc.aio.Channel) -> None:
+        loop = asyncio.get_running_loop()
+
+        with self.__lock:
+            # Another request may have already recreated the channel
+            if self.__async_channels.get(loop, None) is not channel:
+                return None
+
+            del self.__async_channels[loop]
+
+        # Let concurrent calls on the broken channel complete or fail by themselves
+        asyncio.ensure_future(channel.close(grace=KEEPALIVE_TIMEOUT_MS / 1000))
+
+    def __get_background_loop(self) -> asyncio.AbstractEventLoop:
+        with self.__lock:
+            if self.__background_loop is None:
+                self.__background_loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=self.__background_loop.run_forever,
+                    name="ChannelManagerLoop",
+                    daemon=True
+                ).start()
+
+            return self.__background_loop
+
+    def __on_state_change(self, state: grpc.ChannelConnectivity) -> None:
+        logger.debug(f"Channel state: {state}")
+        self.__channel_state = state
+
+    def __close_channel(self, channel: grpc.Channel) -> None:
+        channel.unsubscribe(self.__on_state_change)
+        channel.close()
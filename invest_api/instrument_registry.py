@@ -0,0 +1,163 @@
+import asyncio
+import dataclasses
+import datetime
+import json
+import logging
+import os
+from decimal import Decimal
+from typing import Optional
+
+from configuration.settings import InstrumentSettings, ShareSettings, FutureSettings, CurrencySettings, \
+    RegistrySettings
+from invest_api.services.instruments_service import AsyncInstrumentService
+
+__all__ = ("InstrumentRegistry")
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentRegistry:
+    """
+    Cache of instruments settings (futures, shares and currencies) shared by trading, blog and keeper.
+    It is loaded from local snapshot file at start and refreshed from api in bulk (one request for every type
+    of instruments) when snapshot is older than configured TTL.
+    """
+    def __init__(
+            self,
+            instrument_service: AsyncInstrumentService,
+            registry_settings: RegistrySettings
+    ) -> None:
+        self.__instrument_service = instrument_service
+        self.__snapshot_file = registry_settings.snapshot_file
+        self.__ttl = datetime.timedelta(seconds=registry_settings.ttl_seconds)
+
+        self.__instruments: dict[str, InstrumentSettings] = dict()
+        self.__by_position_uid: dict[str, InstrumentSettings] = dict()
+        self.__updated_at: Optional[datetime.datetime] = None
+        self.__refresh_lock = asyncio.Lock()
+
+        self.__load_snapshot()
+
+    def is_expired(self) -> bool:
+        return not self.__updated_at or datetime.datetime.now(datetime.UTC) - self.__updated_at >= self.__ttl
+
+    async def refresh(self, force: bool = False) -> None:
+        """
+        Download all futures, shares and currencies if cache is expired. The old cache is kept in case of api errors.
+        """
+        async with self.__refresh_lock:
+            if not force and not self.is_expired():
+                logger.info(f"Instruments cache is actual. Updated at: {self.__updated_at}")
+                return None
+
+            logger.info("Refresh instruments cache")
+
+            try:
+                futures, shares, currencies = await asyncio.gather(
+                    self.__instrument_service.futures(),
+                    self.__instrument_service.shares(),
+                    self.__instrument_service.currencies()
+                )
+            except Exception as ex:
+                logger.error(f"Refresh instruments cache error: {repr(ex)}")
+                return None
+
+            self.__instruments.clear()
+            self.__by_position_uid.clear()
+            for instrument in futures + shares + currencies:
+                self.add(instrument)
+            self.__updated_at = datetime.datetime.now(datetime.UTC)
+
+            logger.info(f"Instruments cache has been refreshed. Futures: {len(futures)}, shares: {len(shares)}, "
+                        f"currencies: {len(currencies)}")
+
+            self.__save_snapshot()
+
+    def add(self, instrument: InstrumentSettings) -> None:
+        """
+        Put instrument into cache (e.g. resolved by unary request)
+        """
+        self.__instruments[instrument.figi] = instrument
+
+        if instrument.position_uid:
+            self.__by_position_uid[instrument.position_uid] = instrument
+
+    def by_figi(self, figi: str) -> Optional[InstrumentSettings]:
+        return self.__instruments.get(figi, None)
+
+    def by_position_uid(self, position_uid: str) -> Optional[InstrumentSettings]:
+        return self.__by_position_uid.get(position_uid, None)
+
+    def future(self, figi: str) -> Optional[FutureSettings]:
+        instrument = self.by_figi(figi)
+        return instrument if isinstance(instrument, FutureSettings) else None
+
+    def futures(self) -> list[FutureSettings]:
+        return [x for x in self.__instruments.values() if isinstance(x, FutureSettings)]
+
+    def shares(self) -> list[ShareSettings]:
+        return [x for x in self.__instruments.values() if isinstance(x, ShareSettings)]
+
+    def currencies(self) -> list[CurrencySettings]:
+        return [x for x in self.__instruments.values() if isinstance(x, CurrencySettings)]
+
+    def ticker(self, figi: str) -> str:
+        instrument = self.by_figi(figi)
+        return instrument.ticker if instrument else ""
+
+    def __load_snapshot(self) -> None:
+        if not self.__snapshot_file or not os.path.exists(self.__snapshot_file):
+            logger.info("Instruments snapshot hasn't been found")
+            return None
+
+        try:
+            with open(self.__snapshot_file, "r", encoding="utf-8") as snapshot_file:
+                snapshot = json.load(snapshot_file)
+
+            for future in snapshot["futures"]:
+                future["basic_asset_size"] = Decimal(future["basic_asset_size"])
+                self.add(FutureSettings(**future))
+
+            for share in snapshot["shares"]:
+                self.add(ShareSettings(**share))
+
+            for currency in snapshot.get("currencies", []):
+                self.add(CurrencySettings(**currency))
+
+            # Snapshot of previous version has no currencies, so it's refreshed at once
+            self.__updated_at = datetime.datetime.fromisoformat(snapshot["updated_at"]) \
+                if "currencies" in snapshot else None
+
+            logger.info(f"Instruments snapshot has been loaded: {len(self.__instruments)}, "
+                        f"updated at: {self.__updated_at}")
+        except Exception as ex:
+            logger.error(f"Load instruments snapshot error: {repr(ex)}")
+            self.__instruments.clear()
+            self.__by_position_uid.clear()
+            self.__updated_at = None
+
+    def __save_snapshot(self) -> None:
+        if not self.__snapshot_file:
+            return None
+
+        try:
+            snapshot_dir = os.path.dirname(self.__snapshot_file)
+            if snapshot_dir and not os.path.exists(snapshot_dir):
+                os.makedirs(snapshot_dir)
+
+            snapshot = {
+                "updated_at": self.__updated_at.isoformat(),
+                "futures": [dataclasses.asdict(x) for x in self.futures()],
+                "shares": [dataclasses.asdict(x) for x in self.shares()],
+                "currencies": [dataclasses.asdict(x) for x in self.currencies()]
+            }
+
+            # Write to temporary file first, so a crash doesn't leave broken snapshot
+            tmp_file_name = self.__snapshot_file + ".tmp"
+            with open(tmp_file_name, "w", encoding="utf-8") as snapshot_file:
+                json.dump(snapshot, snapshot_file, default=str)
+            os.replace(tmp_file_name, self.__snapshot_file)
+
+            logger.info(f"Instruments snapshot has been saved: {self.__snapshot_file}")
+        except Exception as ex:
+            logger.error(f"Save instruments snapshot error: {repr(ex)}")
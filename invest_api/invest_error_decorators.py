@@ -1,50 +1,370 @@
+import asyncio
+import collections
+import enum
+import functools
+import inspect
 import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Optional
 
+from grpc import StatusCode
 from tinkoff.invest import InvestError, RequestError, AioRequestError
 
-__all__ = ()
+from invest_api.utils import invest_api_retry_status_codes
+
+__all__ = ("RetryPolicy", "CircuitBreaker", "CircuitBreakerOpenError", "circuit_breakers")
 
 logger = logging.getLogger(__name__)
 
+# Count of the last successful results kept per method for cache fallback
+CACHE_FALLBACK_SIZE = 1024
+
+
+@dataclass(frozen=True, eq=False, repr=True)
+class RetryPolicy:
+    """
+    Exponential backoff with jitter between attempts
+    """
+    retry_count: int = 5
+    base_delay: float = 0.1
+    max_delay: float = 5.0
+    multiplier: float = 2.0
+    # Part of delay is randomized to avoid synchronous retries from many requests
+    jitter: float = 0.5
+    retry_status_codes: frozenset[StatusCode] = field(
+        default_factory=lambda: frozenset(invest_api_retry_status_codes())
+    )
+    # Minimal delay for some status codes (e.g. rate limit exceeded)
+    status_code_delays: dict[StatusCode, float] = field(
+        default_factory=lambda: {StatusCode.RESOURCE_EXHAUSTED: 1.0, StatusCode.UNAVAILABLE: 0.5}
+    )
+
+    def is_retryable(self, ex: Exception) -> bool:
+        return isinstance(ex, (RequestError, AioRequestError)) and ex.code in self.retry_status_codes
+
+    def delay(self, attempt: int, ex: Optional[Exception] = None) -> float:
+        """
+        :param ex: Error of the attempt (None if the attempt has ended without error, e.g. stream has been closed)
+        :return: Delay in seconds before next attempt
+        """
+        delay = min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1))
+        delay *= 1 - self.jitter * random.random()
+
+        if ex is None:
+            return delay
+
+        delay = max(delay, self.status_code_delays.get(ex.code, 0))
+
+        # Api tells when rate limit will be reset
+        if ex.code == StatusCode.RESOURCE_EXHAUSTED and ex.metadata and ex.metadata.ratelimit_reset:
+            delay = max(delay, ex.metadata.ratelimit_reset)
+
+        return delay
+
+
+class CircuitBreakerOpenError(InvestError):
+    pass
+
+
+@enum.unique
+class CircuitBreakerState(enum.IntEnum):
+    CLOSED = 0
+    OPEN = 1
+    HALF_OPEN = 2
+
+
+class CircuitBreaker:
+    """
+    Fails requests fast after series of errors, so api isn't hammered during incidents.
+    After reset timeout one trial request is allowed (half-open state): success or an answer of api
+    (non-retryable error) closes breaker, retryable or unexpected error (e.g. cancellation) opens it again.
+    """
+    def __init__(self, name: str, failure_threshold: int = 10, reset_timeout: float = 30.0) -> None:
+        self.__name = name
+        self.__failure_threshold = failure_threshold
+        self.__reset_timeout = reset_timeout
+
+        self.__state = CircuitBreakerState.CLOSED
+        self.__failures_in_row = 0
+        self.__opened_at = 0.0
+
+        # Counters for monitoring
+        self.__retries = 0
+        self.__failures = 0
+        self.__opened = 0
+        self.__rejected = 0
+        self.__cached = 0
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def state(self) -> CircuitBreakerState:
+        return self.__state
+
+    def allow_request(self) -> bool:
+        if self.__state == CircuitBreakerState.CLOSED:
+            return True
+
+        if self.__state == CircuitBreakerState.OPEN \
+                and time.monotonic() - self.__opened_at >= self.__reset_timeout:
+            logger.info(f"Circuit breaker {self.__name} is half-open")
+            self.__state = CircuitBreakerState.HALF_OPEN
+            return True
+
+        return False
+
+    def record_success(self) -> None:
+        if self.__state != CircuitBreakerState.CLOSED:
+            logger.info(f"Circuit breaker {self.__name} is closed")
+
+        self.__state = CircuitBreakerState.CLOSED
+        self.__failures_in_row = 0
+
+    def record_failure(self) -> None:
+        self.__failures += 1
+        self.__failures_in_row += 1
+
+        if self.__state == CircuitBreakerState.HALF_OPEN \
+                or (self.__state == CircuitBreakerState.CLOSED and self.__failures_in_row >= self.__failure_threshold):
+            logger.error(f"Circuit breaker {self.__name} is open for {self.__reset_timeout} seconds")
+            self.__state = CircuitBreakerState.OPEN
+            self.__opened_at = time.monotonic()
+            self.__opened += 1
+
+    def end_trial(self) -> None:
+        """
+        Called after the trial request. If the trial hasn't recorded its result (e.g. it has been cancelled),
+        breaker is opened again instead of staying half-open.
+        """
+        if self.__state == CircuitBreakerState.HALF_OPEN:
+            logger.error(f"Circuit breaker {self.__name} trial request has been interrupted")
+            self.__state = CircuitBreakerState.OPEN
+            self.__opened_at = time.monotonic()
+            self.__opened += 1
+
+    def record_retry(self) -> None:
+        self.__retries += 1
+
+    def record_rejected(self) -> None:
+        self.__rejected += 1
+
+    def record_cached(self) -> None:
+        self.__cached += 1
+
+    def stats(self) -> dict:
+        return {
+            "state": self.__state.name,
+            "retries": self.__retries,
+            "failures": self.__failures,
+            "opened": self.__opened,
+            "rejected": self.__rejected,
+            "cached": self.__cached
+        }
+
+
+_circuit_breakers: dict[str, CircuitBreaker] = dict()
+
+
+def _circuit_breaker(name: str) -> CircuitBreaker:
+    breaker = _circuit_breakers.get(name, None)
+
+    if not breaker:
+        breaker = CircuitBreaker(name)
+        _circuit_breakers[name] = breaker
+
+    return breaker
+
+
+def circuit_breakers() -> list[CircuitBreaker]:
+    """
+    :return: All circuit breakers (for monitoring purposes)
+    """
+    return list(_circuit_breakers.values())
+
+
+def _log_invest_error(ex: Exception) -> None:
+    if isinstance(ex, RequestError):
+        tracking_id = ex.metadata.tracking_id if ex.metadata else ""
+        logger.error("RequestError tracking_id=%s code=%s repr=%s details=%s",
+                     tracking_id, str(ex.code), repr(ex), ex.details)
+    elif isinstance(ex, AioRequestError):
+        # tracking_id = ex.metadata.tracking_id if ex.metadata else ""
+        logger.error("AioRequestError code=%s repr=%s details=%s",
+                     str(ex.code), repr(ex), ex.details)
+    else:
+        logger.error("InvestError repr=%s", repr(ex))
+
 
 # Method extends logging for Tinkoff api request if it has been failed
 def invest_error_logging(func):
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_log_wrapper(*args, **kwargs):
+            try:
+                return await func(*args, **kwargs)
+            except InvestError as ex:
+                _log_invest_error(ex)
+                raise
+
+        return async_log_wrapper
+
+    @functools.wraps(func)
     def log_wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
-        except RequestError as ex:
-            tracking_id = ex.metadata.tracking_id if ex.metadata else ""
-            logger.error("RequestError tracking_id=%s code=%s repr=%s details=%s",
-                         tracking_id, str(ex.code), repr(ex), ex.details)
-            raise
-        except AioRequestError as ex:
-            # tracking_id = ex.metadata.tracking_id if ex.metadata else ""
-            logger.error("AioRequestError code=%s repr=%s details=%s",
-                         str(ex.code), repr(ex), ex.details)
-            raise 
         except InvestError as ex:
-            logger.error("InvestError repr=%s", repr(ex))
+            _log_invest_error(ex)
             raise
 
     return log_wrapper
 
 
-# Decorator retries api requests for some kind of exceptions
-def invest_api_retry(retry_count: int = 5, exceptions: tuple = ( RequestError )):
+def _cache_result(cache: Optional[collections.OrderedDict], key: Optional[tuple], result, cache_size: int) -> None:
+    if cache is None or key is None:
+        return None
+
+    cache[key] = result
+    cache.move_to_end(key)
+
+    # The least recently saved results are removed
+    while len(cache) > cache_size:
+        cache.popitem(last=False)
+
+
+def _breaker_name(func) -> str:
+    # Sync and async versions of a service share one breaker: AsyncOrderService.get_orders -> OrderService
+    return func.__qualname__.split(".")[0].removeprefix("Async")
+
+
+def _cache_key(args: tuple, kwargs: dict) -> Optional[tuple]:
+    # The first argument is service instance
+    key = (args[1:], tuple(sorted(kwargs.items())))
+
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
+
+def _cached_result(breaker: CircuitBreaker, cache: Optional[collections.OrderedDict], key: Optional[tuple]):
+    if cache is not None and key is not None and key in cache:
+        logger.info(f"Circuit breaker {breaker.name} is open. Cached result is used")
+        breaker.record_cached()
+        return cache[key]
+
+    breaker.record_rejected()
+    raise CircuitBreakerOpenError(f"Circuit breaker {breaker.name} is open")
+
+
+def _on_retryable_error(
+        ex: Exception,
+        attempt: int,
+        policy: RetryPolicy,
+        breaker: CircuitBreaker
+) -> Optional[float]:
+    """
+    :return: Delay before next attempt or None if request mustn't be retried
+    """
+    if not policy.is_retryable(ex):
+        # Api has answered (e.g. NOT_FOUND or INVALID_ARGUMENT), so it's available
+        breaker.record_success()
+        return None
+
+    breaker.record_failure()
+
+    if attempt >= policy.retry_count or not breaker.allow_request():
+        return None
+
+    breaker.record_retry()
+    delay = policy.delay(attempt, ex)
+    logger.error(f"Retry exception attempt: {attempt}, code: {ex.code}, delay: {delay:.3f} s")
+
+    return delay
+
+
+# Decorator retries api requests for retryable status codes with backoff.
+# Circuit breaker is shared by all methods of the service (sync and async).
+# cache_fallback - the last successful result is returned while circuit breaker is open (read only methods),
+# up to cache_size results per method
+def invest_api_retry(
+        policy: Optional[RetryPolicy] = None,
+        breaker_name: str = "",
+        cache_fallback: bool = False,
+        cache_size: int = CACHE_FALLBACK_SIZE
+):
+    retry_policy = policy or RetryPolicy()
+
     def errors_retry(func):
+        breaker = _circuit_breaker(breaker_name or _breaker_name(func))
+        cache: Optional[collections.OrderedDict] = collections.OrderedDict() if cache_fallback else None
 
-        def errors_wrapper(*args, **kwargs):
-            attempts = 0
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_errors_wrapper(*args, **kwargs):
+                key = _cache_key(args, kwargs) if cache is not None else None
 
-            while attempts < retry_count - 1:
-                attempts += 1
+                if not breaker.allow_request():
+                    return _cached_result(breaker, cache, key)
 
+                is_trial = breaker.state == CircuitBreakerState.HALF_OPEN
+                attempt = 0
                 try:
-                    return func(*args, **kwargs)
-                except exceptions:
-                    logger.error(f"Retry exception attempt: {attempts}")
+                    while True:
+                        attempt += 1
 
-            return func(*args, **kwargs)
+                        try:
+                            result = await func(*args, **kwargs)
+                        except (RequestError, AioRequestError) as ex:
+                            delay = _on_retryable_error(ex, attempt, retry_policy, breaker)
+                            if delay is None:
+                                raise
+
+                            await asyncio.sleep(delay)
+                        else:
+                            breaker.record_success()
+                            _cache_result(cache, key, result, cache_size)
+
+                            return result
+                finally:
+                    if is_trial:
+                        breaker.end_trial()
+
+            return async_errors_wrapper
+
+        @functools.wraps(func)
+        def errors_wrapper(*args, **kwargs):
+            key = _cache_key(args, kwargs) if cache is not None else None
+
+            if not breaker.allow_request():
+                return _cached_result(breaker, cache, key)
+
+            is_trial = breaker.state == CircuitBreakerState.HALF_OPEN
+            attempt = 0
+            try:
+                while True:
+                    attempt += 1
+
+                    try:
+                        result = func(*args, **kwargs)
+                    except (RequestError, AioRequestError) as ex:
+                        delay = _on_retryable_error(ex, attempt, retry_policy, breaker)
+                        if delay is None:
+                            raise
+
+                        time.sleep(delay)
+                    else:
+                        breaker.record_success()
+                        _cache_result(cache, key, result, cache_size)
+
+                        return result
+            finally:
+                if is_trial:
+                    breaker.end_trial()
 
         return errors_wrapper
 
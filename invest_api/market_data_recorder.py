@@ -0,0 +1,92 @@
+import datetime
+import gzip
+import logging
+import os
+import struct
+import time
+from typing import Any, Optional
+
+from tinkoff.invest import MarketDataResponse
+from tinkoff.invest._grpc_helpers import dataclass_to_protobuff
+from tinkoff.invest.grpc import marketdata_pb2
+
+__all__ = ("MarketDataRecorder", "RECORD_FRAME", "RECORD_SUFFIX")
+
+logger = logging.getLogger(__name__)
+
+RECORD_SUFFIX = ".mdr.gz"
+# Frame of recorded message: receive time (ns since epoch) and length of serialized MarketDataResponse
+RECORD_FRAME = struct.Struct("<qI")
+# Uncompressed size of one segment file
+SEGMENT_SIZE = 256 * 1024 * 1024
+
+
+class MarketDataRecorder:
+    """
+    Records every MarketDataResponse of streams (order books, candles, trades, statuses)
+    with receive time into gzip segment files: <record_dir>/<YYYYMMDD>-<N>.mdr.gz.
+    A new segment is started by size and by day. Files are readable after crash (up to the last complete frame).
+    """
+    def __init__(self, record_dir: str) -> None:
+        self.__record_dir = record_dir
+        self.__file: Optional[gzip.GzipFile] = None
+        self.__file_day: Optional[datetime.date] = None
+        self.__file_size = 0
+
+        self.__messages = 0
+        self.__bytes = 0
+
+        if record_dir and not os.path.exists(record_dir):
+            os.makedirs(record_dir)
+
+    def record(self, response: Any) -> None:
+        """
+        :param response: protobuf MarketDataResponse (raw stream) or MarketDataResponse of tinkoff SDK
+        """
+        received_ns = time.time_ns()
+
+        try:
+            if isinstance(response, MarketDataResponse):
+                response = dataclass_to_protobuff(response, marketdata_pb2.MarketDataResponse())
+
+            self.__write(received_ns, response.SerializeToString())
+        except Exception as ex:
+            # Recording mustn't break trading
+            logger.error(f"Record market data error: {repr(ex)}")
+
+    def flush(self) -> None:
+        if self.__file:
+            self.__file.flush()
+
+    def close(self) -> None:
+        if self.__file:
+            self.__file.close()
+            self.__file = None
+
+            logger.info(f"Market data recorder statistics: messages {self.__messages}, bytes {self.__bytes}")
+
+    def __write(self, received_ns: int, data: bytes) -> None:
+        day = datetime.datetime.fromtimestamp(received_ns // 1_000_000_000, tz=datetime.timezone.utc).date()
+
+        if not self.__file or self.__file_day != day or self.__file_size >= SEGMENT_SIZE:
+            self.__open_segment(day)
+
+        self.__file.write(RECORD_FRAME.pack(received_ns, len(data)))
+        self.__file.write(data)
+
+        self.__file_size += RECORD_FRAME.size + len(data)
+        self.__messages += 1
+        self.__bytes += len(data)
+
+    def __open_segment(self, day: datetime.date) -> None:
+        self.close()
+
+        prefix = f"{day:%Y%m%d}-"
+        segment = len([x for x in os.listdir(self.__record_dir or ".") if x.startswith(prefix)])
+        file_name = os.path.join(self.__record_dir, f"{prefix}{segment:06d}{RECORD_SUFFIX}")
+
+        logger.info(f"Record market data into {file_name}")
+        # Fast compression level, recording runs in the loop of market data stream
+        self.__file = gzip.open(file_name, "wb", compresslevel=1)
+        self.__file_day = day
+        self.__file_size = 0
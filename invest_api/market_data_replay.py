@@ -0,0 +1,90 @@
+import asyncio
+import gzip
+import logging
+import os
+import struct
+import time
+from typing import AsyncIterator, Iterator
+
+from tinkoff.invest import Candle, MarketDataResponse
+from tinkoff.invest._grpc_helpers import protobuf_to_dataclass
+from tinkoff.invest.grpc import marketdata_pb2
+
+from invest_api.book_snapshot import BookSnapshot, DEFAULT_DEPTH
+from invest_api.market_data_recorder import RECORD_FRAME, RECORD_SUFFIX
+
+__all__ = ("MarketDataReplay")
+
+logger = logging.getLogger(__name__)
+
+# Control is given to other tasks after this count of messages at max speed
+YIELD_EVERY_MESSAGES = 1000
+
+
+class MarketDataReplay:
+    """
+    Replays market data recorded by MarketDataRecorder (all segments of replay_dir in order of names).
+    The interface is the same as streams of MarketDataStreamService.
+    Recorded intervals between messages are kept at speed 1, speed N is N times faster, speed 0 - as fast as possible.
+    """
+    def __init__(self, replay_dir: str, speed: float = 1.0) -> None:
+        self.__replay_dir = replay_dir
+        self.__speed = speed
+
+    async def order_books(self, figies: list[str]) -> AsyncIterator[BookSnapshot]:
+        figies = set(figies)
+
+        async for response in self.__responses():
+            if response.HasField("orderbook") and response.orderbook.figi in figies:
+                yield BookSnapshot.from_proto(response.orderbook, DEFAULT_DEPTH)
+
+    async def candles(self, figies: list[str]) -> AsyncIterator[Candle]:
+        figies = set(figies)
+
+        async for response in self.__responses():
+            if response.HasField("candle") and response.candle.figi in figies:
+                yield protobuf_to_dataclass(response, MarketDataResponse).candle
+
+    async def __responses(self) -> AsyncIterator[marketdata_pb2.MarketDataResponse]:
+        first_received_ns = 0
+        started_at = 0.0
+        messages = 0
+
+        for received_ns, data in self.__frames():
+            if not first_received_ns:
+                first_received_ns = received_ns
+                started_at = time.monotonic()
+
+            messages += 1
+            if self.__speed > 0:
+                delay = started_at + (received_ns - first_received_ns) / 1e9 / self.__speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif messages % YIELD_EVERY_MESSAGES == 0:
+                await asyncio.sleep(0)
+
+            response = marketdata_pb2.MarketDataResponse()
+            response.ParseFromString(data)
+            yield response
+
+        logger.info(f"Market data replay has been finished: messages {messages}, "
+                    f"time {time.monotonic() - started_at:.3f} s")
+
+    def __frames(self) -> Iterator[tuple[int, bytes]]:
+        file_names = sorted(x for x in os.listdir(self.__replay_dir) if x.endswith(RECORD_SUFFIX))
+        logger.info(f"Replay market data files: {len(file_names)}")
+
+        for file_name in file_names:
+            with gzip.open(os.path.join(self.__replay_dir, file_name), "rb") as replay_file:
+                try:
+                    while header := replay_file.read(RECORD_FRAME.size):
+                        received_ns, length = RECORD_FRAME.unpack(header)
+                        data = replay_file.read(length)
+                        if len(data) != length:
+                            break
+
+                        yield received_ns, data
+
+                except (EOFError, gzip.BadGzipFile, struct.error) as ex:
+                    # The file of crashed recorder has no gzip trailer
+                    logger.warning(f"Replay file {file_name} is incomplete: {repr(ex)}")
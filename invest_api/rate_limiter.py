@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import threading
+import time
+
+import grpc
+from tinkoff.invest import UnaryLimit
+
+__all__ = ("RateLimiter")
+
+logger = logging.getLogger(__name__)
+
+# Size of bucket in seconds of limit: short bursts are allowed, long bursts are queued
+BURST_SECONDS = 5
+
+
+class TokenBucket:
+    """
+    Token bucket with reservations: every request takes a token immediately
+    and waits until the token is refilled, so waiting requests are queued in order.
+    """
+    def __init__(self, name: str, limit_per_minute: int) -> None:
+        self.__name = name
+        self.__rate = limit_per_minute / 60
+        self.__capacity = max(1.0, self.__rate * BURST_SECONDS)
+
+        self.__lock = threading.Lock()
+        self.__tokens = self.__capacity
+        self.__updated_at = time.monotonic()
+
+        self.__requests = 0
+        self.__waits = 0
+        self.__wait_time = 0.0
+        self.__max_wait_time = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    def update(self, name: str, limit_per_minute: int) -> None:
+        """
+        Changes the limit in place: reserved tokens and counters are kept
+        """
+        with self.__lock:
+            self.__name = name
+            self.__rate = limit_per_minute / 60
+            self.__capacity = max(1.0, self.__rate * BURST_SECONDS)
+            self.__tokens = min(self.__tokens, self.__capacity)
+
+    def reserve(self) -> float:
+        """
+        :return: Time in seconds to wait before request
+        """
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.__capacity, self.__tokens + (now - self.__updated_at) * self.__rate)
+            self.__updated_at = now
+
+            self.__tokens -= 1
+            self.__requests += 1
+
+            if self.__tokens >= 0:
+                return 0.0
+
+            wait_time = -self.__tokens / self.__rate
+
+            self.__waits += 1
+            self.__wait_time += wait_time
+            self.__max_wait_time = max(self.__max_wait_time, wait_time)
+
+            return wait_time
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.__requests,
+            "waits": self.__waits,
+            "wait_time": round(self.__wait_time, 3),
+            "max_wait_time": round(self.__max_wait_time, 3)
+        }
+
+
+class RateLimiter:
+    """
+    Client-side limits of unary requests by tariff of the account.
+    Methods with common limit share one token bucket.
+    """
+    def __init__(self) -> None:
+        self.__buckets: dict[str, TokenBucket] = dict()
+
+    def configure(self, unary_limits: list[UnaryLimit]) -> None:
+        """
+        Can be called again (e.g. tariff has been changed): buckets of the same methods are updated in place,
+        so tokens reserved by requests in progress and counters aren't reset
+        """
+        buckets: dict[str, TokenBucket] = dict()
+        reused: set[TokenBucket] = set()
+
+        for unary_limit in unary_limits:
+            methods = [method.lstrip("/") for method in unary_limit.methods]
+            # e.g. tinkoff.public.invest.api.contract.v1.OrdersService/PostOrder -> OrdersService
+            services = sorted({method.split("/")[0].split(".")[-1] for method in methods})
+            name = f"{','.join(services)} ({unary_limit.limit_per_minute}/min)"
+
+            bucket = next((self.__buckets[x] for x in methods if x in self.__buckets), None)
+            if bucket and bucket not in reused:
+                bucket.update(name, unary_limit.limit_per_minute)
+                reused.add(bucket)
+            else:
+                bucket = TokenBucket(name, unary_limit.limit_per_minute)
+
+            for method in methods:
+                buckets[method] = bucket
+
+        self.__buckets = buckets
+        logger.info(f"Rate limiter has been configured. Methods: {len(buckets)}")
+
+    def acquire(self, method: str) -> None:
+        wait_time = self.__reserve(method)
+
+        if wait_time > 0:
+            logger.debug(f"Wait rate limit for {method}: {wait_time:.3f} s")
+            time.sleep(wait_time)
+
+    async def async_acquire(self, method: str) -> None:
+        wait_time = self.__reserve(method)
+
+        if wait_time > 0:
+            logger.debug(f"Wait rate limit for {method}: {wait_time:.3f} s")
+            await asyncio.sleep(wait_time)
+
+    def stats(self) -> dict[str, dict]:
+        """
+        :return: Counters of requests and time spent waiting for tokens by group of methods
+        """
+        return {bucket.name: bucket.stats() for bucket in set(self.__buckets.values())}
+
+    def __reserve(self, method: str) -> float:
+        if isinstance(method, bytes):
+            method = method.decode()
+
+        bucket = self.__buckets.get(method.lstrip("/"), None)
+        return bucket.reserve() if bucket else 0.0
+
+
+class RateLimitInterceptor(grpc.UnaryUnaryClientInterceptor):
+    """
+    Every unary request of sync channel waits for rate limiter
+    """
+    def __init__(self, rate_limiter: RateLimiter) -> None:
+        self.__rate_limiter = rate_limiter
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        self.__rate_limiter.acquire(client_call_details.method)
+        return continuation(client_call_details, request)
+
+
+class AsyncRateLimitInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """
+    Every unary request of grpc.aio channel waits for rate limiter
+    """
+    def __init__(self, rate_limiter: RateLimiter) -> None:
+        self.__rate_limiter = rate_limiter
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        await self.__rate_limiter.async_acquire(client_call_details.method)
+        return await continuation(client_call_details, request)
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Optional
+
+import grpc
+from tinkoff.invest import AioRequestError
+from tinkoff.invest.grpc import marketdata_pb2, marketdata_pb2_grpc
+
+from invest_api.book_snapshot import BookSnapshot
+from invest_api.market_data_recorder import MarketDataRecorder
+
+__all__ = ("RawOrderBookStream")
+
+logger = logging.getLogger(__name__)
+
+
+class RawOrderBookStream:
+    """
+    Order book stream on raw protobuf stub (without tinkoff SDK dataclasses).
+    Responses are decoded directly into BookSnapshot.
+    The interface is similar to AsyncMarketDataStreamManager: async iteration and stop().
+    """
+    def __init__(
+            self,
+            channel: grpc.aio.Channel,
+            metadata: list[tuple[str, str]],
+            figies: list[str],
+            depth: int,
+            recorder: Optional[MarketDataRecorder] = None
+    ) -> None:
+        self.__stub = marketdata_pb2_grpc.MarketDataStreamServiceStub(channel)
+        self.__metadata = metadata
+        self.__figies = figies
+        self.__depth = depth
+        self.__recorder = recorder
+
+        self.__stop_event = asyncio.Event()
+        self.__call: Optional[grpc.aio.StreamStreamCall] = None
+
+    def __aiter__(self) -> AsyncIterator[BookSnapshot]:
+        return self.__read()
+
+    def stop(self) -> None:
+        self.__stop_event.set()
+
+        if self.__call:
+            self.__call.cancel()
+
+    async def __read(self) -> AsyncIterator[BookSnapshot]:
+        self.__call = self.__stub.MarketDataStream(self.__requests(), metadata=self.__metadata)
+
+        try:
+            async for response in self.__call:
+                if self.__recorder:
+                    self.__recorder.record(response)
+
+                if response.HasField("orderbook"):
+                    yield BookSnapshot.from_proto(response.orderbook, self.__depth)
+
+        except grpc.aio.AioRpcError as ex:
+            # The same exception as tinkoff SDK raises, so retry logic is common for both streams
+            raise AioRequestError(ex.code(), ex.details(), None) from ex
+
+    async def __requests(self) -> AsyncIterator[marketdata_pb2.MarketDataRequest]:
+        yield marketdata_pb2.MarketDataRequest(
+            subscribe_order_book_request=marketdata_pb2.SubscribeOrderBookRequest(
+                subscription_action=marketdata_pb2.SUBSCRIPTION_ACTION_SUBSCRIBE,
+                instruments=[
+                    marketdata_pb2.OrderBookInstrument(
+                        instrument_id=figi,
+                        depth=self.__depth
+                    )
+                    for figi in self.__figies
+                ]
+            )
+        )
+
+        # The request stream is kept open until stop, otherwise the server completes the call
+        await self.__stop_event.wait()
@@ -1,27 +1,51 @@
 import logging
 from datetime import timedelta
 
-from tinkoff.invest import CandleInterval, Client, HistoricCandle
+from tinkoff.invest import CandleInterval, HistoricCandle
 from tinkoff.invest.utils import now
 
+from invest_api.channel_manager import ChannelManager
 from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
 
-__all__ = ("ClientService")
+__all__ = ("ClientService", "AsyncClientService")
 
 logger = logging.getLogger(__name__)
 
 
 class ClientService:
     """
-    The class encapsulate tinkoff client api
+    The class encapsulate tinkoff client api (sync wrapper over AsyncClientService)
+    """
+    def __init__(self, token: str, app_name: str) -> None:
+        self.__channel_manager = ChannelManager.shared(token, app_name)
+        self.__async_service = AsyncClientService(token, app_name)
+
+    def download_historic_candle(
+            self,
+            figi: str,
+            from_days: int,
+            interval: CandleInterval
+    ) -> list[HistoricCandle]:
+        """Download and return all requested historical candles"""
+        return self.__channel_manager.run(self.__async_service.download_historic_candle(figi, from_days, interval))
+
+    def cancel_all_orders(self, account_id: str) -> None:
+        """ Cancel all open orders. """
+        return self.__channel_manager.run(self.__async_service.cancel_all_orders(account_id))
+
+
+class AsyncClientService:
+    """
+    The class encapsulate tinkoff client api (asyncio version)
     """
     def __init__(self, token: str, app_name: str) -> None:
         self.__token = token
         self.__app_name = app_name
+        self.__channel_manager = ChannelManager.shared(token, app_name)
 
     @invest_api_retry()
     @invest_error_logging
-    def download_historic_candle(
+    async def download_historic_candle(
             self,
             figi: str,
             from_days: int,
@@ -33,8 +57,8 @@ class ClientService:
         from_ = now() - timedelta(days=from_days)
         logger.info(f"Start download recent candles. Figi: {figi}, from days: {from_}, interval: {interval.name}")
 
-        with Client(self.__token, app_name=self.__app_name) as client:
-            for candle in client.get_all_candles(
+        async with self.__channel_manager.async_client() as client:
+            async for candle in client.get_all_candles(
                     figi=figi,
                     from_=from_,
                     interval=interval
@@ -49,11 +73,11 @@ class ClientService:
 
     @invest_api_retry()
     @invest_error_logging
-    def cancel_all_orders(self, account_id: str) -> None:
+    async def cancel_all_orders(self, account_id: str) -> None:
         """ Cancel all open orders. """
         logger.info(f"Cancel all orders for account id: {account_id}")
 
-        with Client(self.__token, app_name=self.__app_name) as client:
-            client.cancel_all_orders(account_id=account_id)
+        async with self.__channel_manager.async_client() as client:
+            await client.cancel_all_orders(account_id=account_id)
 
         logger.info(f"Cancellation all orders complete.")
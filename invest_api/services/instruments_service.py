@@ -1,50 +1,94 @@
 import datetime
 import logging
 
-from tinkoff.invest import Client, TradingSchedule, InstrumentIdType, InstrumentStatus, InstrumentShort
+from tinkoff.invest import TradingSchedule, InstrumentIdType, InstrumentStatus, InstrumentShort, Share, Future, \
+    Currency
 from tinkoff.invest.utils import quotation_to_decimal
 
-from configuration.settings import ShareSettings, FutureSettings
+from configuration.settings import ShareSettings, FutureSettings, CurrencySettings
+from invest_api.channel_manager import ChannelManager
 from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
-from invest_api.utils import moex_exchange_name, get_next_morning
+from invest_api.utils import moex_exchange_name, get_next_morning, quotation_to_nanos
 
-__all__ = ("InstrumentService")
+__all__ = ("InstrumentService", "AsyncInstrumentService")
 
 logger = logging.getLogger(__name__)
 
 
 class InstrumentService:
     """
-    The class encapsulate tinkoff instruments api
+    The class encapsulate tinkoff instruments api (sync wrapper over AsyncInstrumentService)
+    """
+    def __init__(self, token: str, app_name: str) -> None:
+        self.__channel_manager = ChannelManager.shared(token, app_name)
+        self.__async_service = AsyncInstrumentService(token, app_name)
+
+    def moex_today_trading_schedule(self) -> (bool, datetime, datetime, datetime):
+        """
+        :return: Information about trading day status, datetime trading day start, datetime trading day end
+        (both on today)
+        """
+        return self.__channel_manager.run(self.__async_service.moex_today_trading_schedule())
+
+    def find_instrument(self, query: str) -> list[InstrumentShort]:
+        return self.__channel_manager.run(self.__async_service.find_instrument(query))
+
+    def share_by_figi(self, figi: str) -> ShareSettings:
+        """
+        :return: Information about share settings by it figi
+        """
+        return self.__channel_manager.run(self.__async_service.share_by_figi(figi))
+
+    def future_by_figi(self, figi: str) -> FutureSettings:
+        """
+        :return: Information about future settings by it figi
+        """
+        return self.__channel_manager.run(self.__async_service.future_by_figi(figi))
+
+    def futures(self) -> list[FutureSettings]:
+        """
+        :return: Settings of all available futures (one request)
+        """
+        return self.__channel_manager.run(self.__async_service.futures())
+
+    def shares(self) -> list[ShareSettings]:
+        """
+        :return: Settings of all available shares (one request)
+        """
+        return self.__channel_manager.run(self.__async_service.shares())
+
+    def currencies(self) -> list[CurrencySettings]:
+        """
+        :return: Settings of all available currencies (one request)
+        """
+        return self.__channel_manager.run(self.__async_service.currencies())
+
+
+class AsyncInstrumentService:
+    """
+    The class encapsulate tinkoff instruments api (asyncio version)
     """
     def __init__(self, token: str, app_name: str) -> None:
         self.__token = token
         self.__app_name = app_name
+        self.__channel_manager = ChannelManager.shared(token, app_name)
 
-    def moex_today_trading_schedule(self) -> (bool, datetime, datetime, datetime):
+    async def moex_today_trading_schedule(self) -> (bool, datetime, datetime, datetime):
         """
         :return: Information about trading day status, datetime trading day start, datetime trading day end
         (both on today)
         """
-        for schedule in self.__trading_schedules(
+        return _moex_today_trading_schedule(
+            await self.__trading_schedules(
                 exchange=moex_exchange_name(),
                 _from=datetime.datetime.utcnow(),
                 _to=datetime.datetime.utcnow() + datetime.timedelta(days=1)
-        ):
-            is_trading_day, start_time, end_time, next_time = False, datetime.datetime.utcnow(), datetime.datetime.utcnow(), get_next_morning()
-            for day in schedule.days:
-                if day.date.date() == datetime.datetime.now(datetime.UTC).date():
-                    logger.info(f"MOEX today schedule: {day}")
-                    is_trading_day, start_time, end_time = day.is_trading_day, day.start_time, day.end_time
-                if day.date.date() == datetime.datetime.now(datetime.UTC).date() + datetime.timedelta(days=1) and day.is_trading_day:
-                    logger.info(f"MOEX next day schedule: {day}")
-                    next_time = day.start_time
-        
-        return is_trading_day, start_time, end_time, next_time
+            )
+        )
 
     @invest_api_retry()
     @invest_error_logging
-    def __trading_schedules(
+    async def __trading_schedules(
             self,
             exchange: str,
             _from: datetime,
@@ -52,104 +96,169 @@ class InstrumentService:
     ) -> list[TradingSchedule]:
         result = []
 
-        with Client(self.__token, app_name=self.__app_name) as client:
+        async with self.__channel_manager.async_client() as client:
             logger.debug(f"Trading Schedules for exchange: {exchange}, from: {_from}, to: {_to}")
 
-            for schedule in client.instruments.trading_schedules(
+            for schedule in (await client.instruments.trading_schedules(
                     exchange=exchange,
                     from_=_from,
                     to=_to
-            ).exchanges:
+            )).exchanges:
                 logger.info(f"Schedule = {schedule}")
                 result.append(schedule)
 
         return result
 
-    @invest_api_retry()
+    @invest_api_retry(cache_fallback=True)
     @invest_error_logging
-    def find_instrument(self, query: str) -> list[InstrumentShort]:
-         with Client(self.__token, app_name=self.__app_name) as client:
+    async def find_instrument(self, query: str) -> list[InstrumentShort]:
+        async with self.__channel_manager.async_client() as client:
             logger.debug(f"FindInstrument query: {query}")
-        
-            instruments = client.instruments.find_instrument(
+
+            instruments = (await client.instruments.find_instrument(
                 query=query
-            ).instruments
+            )).instruments
             logger.debug(f"Found instruments: {instruments}")
 
             return instruments
-    
-    @invest_api_retry()
+
+    @invest_api_retry(cache_fallback=True)
     @invest_error_logging
-    def share_by_figi(self, figi: str) -> ShareSettings:
+    async def share_by_figi(self, figi: str) -> ShareSettings:
         """
         :return: Information about share settings by it figi
         """
-        with Client(self.__token, app_name=self.__app_name) as client:
+        async with self.__channel_manager.async_client() as client:
             logger.debug(f"ShareBy figi: {figi}:")
 
-            share = client.instruments.share_by(
+            share = (await client.instruments.share_by(
                 id_type=InstrumentIdType.INSTRUMENT_ID_TYPE_FIGI,
                 id=figi
-            ).instrument
+            )).instrument
             logger.debug(f"{share}")
 
-            return ShareSettings(
-                ticker=share.ticker,
-                lot=share.lot,
-                short_enabled_flag=share.short_enabled_flag,
-                otc_flag=share.otc_flag,
-                buy_available_flag=share.buy_available_flag,
-                sell_available_flag=share.sell_available_flag,
-                api_trade_available_flag=share.api_trade_available_flag
-            )
-            
+            return _share_settings(share)
 
-    @invest_api_retry()
+    @invest_api_retry(cache_fallback=True)
     @invest_error_logging
-    def future_by_figi(self, figi: str) -> FutureSettings:
+    async def future_by_figi(self, figi: str) -> FutureSettings:
         """
-        :return: Information about share settings by it figi
+        :return: Information about future settings by it figi
         """
-        with Client(self.__token, app_name=self.__app_name) as client:
+        async with self.__channel_manager.async_client() as client:
             logger.debug(f"FutureBy figi: {figi}:")
 
-            future = client.instruments.future_by(
+            future = (await client.instruments.future_by(
                 id_type=InstrumentIdType.INSTRUMENT_ID_TYPE_FIGI,
                 id=figi
-            ).instrument
+            )).instrument
             logger.debug(f"{future}")
 
-            return FutureSettings(
-                figi=future.figi,
-                ticker=future.ticker,
-                lot=future.lot,
-                short_enabled_flag=future.short_enabled_flag,
-                otc_flag=future.otc_flag,
-                buy_available_flag=future.buy_available_flag,
-                sell_available_flag=future.sell_available_flag,
-                api_trade_available_flag=future.api_trade_available_flag,
-                basic_asset=future.basic_asset,
-                basic_asset_size=quotation_to_decimal(future.basic_asset_size),
-                basic_asset_position_uid=future.basic_asset_position_uid
-            )
-            
-    
-    @invest_api_retry()
+            return _future_settings(future)
+
+    @invest_api_retry(cache_fallback=True)
     @invest_error_logging
-    def __currencies(self) -> None:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            for cur in client.instruments.currencies(
-                    instrument_status=InstrumentStatus.INSTRUMENT_STATUS_BASE
-            ).instruments:
-                logger.debug(f"{cur}")
+    async def futures(self) -> list[FutureSettings]:
+        """
+        :return: Settings of all available futures (one request)
+        """
+        async with self.__channel_manager.async_client() as client:
+            futures = (await client.instruments.futures(
+                instrument_status=InstrumentStatus.INSTRUMENT_STATUS_BASE
+            )).instruments
+            logger.debug(f"Futures count: {len(futures)}")
 
-    @invest_api_retry()
+            return [_future_settings(future) for future in futures]
+
+    @invest_api_retry(cache_fallback=True)
+    @invest_error_logging
+    async def shares(self) -> list[ShareSettings]:
+        """
+        :return: Settings of all available shares (one request)
+        """
+        async with self.__channel_manager.async_client() as client:
+            shares = (await client.instruments.shares(
+                instrument_status=InstrumentStatus.INSTRUMENT_STATUS_BASE
+            )).instruments
+            logger.debug(f"Shares count: {len(shares)}")
+
+            return [_share_settings(share) for share in shares]
+
+    @invest_api_retry(cache_fallback=True)
     @invest_error_logging
-    def __instrument_by_figi(self, figi: str) -> None:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            logger.debug(f"InstrumentBy figi: {figi}:")
+    async def currencies(self) -> list[CurrencySettings]:
+        """
+        :return: Settings of all available currencies (one request)
+        """
+        async with self.__channel_manager.async_client() as client:
+            currencies = (await client.instruments.currencies(
+                instrument_status=InstrumentStatus.INSTRUMENT_STATUS_BASE
+            )).instruments
+            logger.debug(f"Currencies count: {len(currencies)}")
+
+            return [_currency_settings(currency) for currency in currencies]
+
+
+def _moex_today_trading_schedule(schedules: list[TradingSchedule]) -> (bool, datetime, datetime, datetime):
+    for schedule in schedules:
+        is_trading_day, start_time, end_time, next_time = False, datetime.datetime.utcnow(), datetime.datetime.utcnow(), get_next_morning()
+        for day in schedule.days:
+            if day.date.date() == datetime.datetime.now(datetime.UTC).date():
+                logger.info(f"MOEX today schedule: {day}")
+                is_trading_day, start_time, end_time = day.is_trading_day, day.start_time, day.end_time
+            if day.date.date() == datetime.datetime.now(datetime.UTC).date() + datetime.timedelta(days=1) and day.is_trading_day:
+                logger.info(f"MOEX next day schedule: {day}")
+                next_time = day.start_time
+
+    return is_trading_day, start_time, end_time, next_time
+
+
+def _share_settings(share: Share) -> ShareSettings:
+    return ShareSettings(
+        ticker=share.ticker,
+        figi=share.figi,
+        uid=share.uid,
+        position_uid=share.position_uid,
+        lot=share.lot,
+        short_enabled_flag=share.short_enabled_flag,
+        otc_flag=share.otc_flag,
+        buy_available_flag=share.buy_available_flag,
+        sell_available_flag=share.sell_available_flag,
+        api_trade_available_flag=share.api_trade_available_flag,
+        min_price_increment=quotation_to_nanos(share.min_price_increment)
+    )
+
+
+def _currency_settings(currency: Currency) -> CurrencySettings:
+    return CurrencySettings(
+        ticker=currency.ticker,
+        figi=currency.figi,
+        uid=currency.uid,
+        position_uid=currency.position_uid,
+        lot=currency.lot,
+        short_enabled_flag=currency.short_enabled_flag,
+        otc_flag=currency.otc_flag,
+        buy_available_flag=currency.buy_available_flag,
+        sell_available_flag=currency.sell_available_flag,
+        api_trade_available_flag=currency.api_trade_available_flag,
+        min_price_increment=quotation_to_nanos(currency.min_price_increment)
+    )
 
-            instrument = client.instruments.get_instrument_by(id_type=InstrumentIdType.INSTRUMENT_ID_TYPE_FIGI,
-                                                              id=figi).instrument
 
-            logger.debug(f"{instrument}")
+def _future_settings(future: Future) -> FutureSettings:
+    return FutureSettings(
+        figi=future.figi,
+        ticker=future.ticker,
+        uid=future.uid,
+        position_uid=future.position_uid,
+        lot=future.lot,
+        short_enabled_flag=future.short_enabled_flag,
+        otc_flag=future.otc_flag,
+        buy_available_flag=future.buy_available_flag,
+        sell_available_flag=future.sell_available_flag,
+        api_trade_available_flag=future.api_trade_available_flag,
+        min_price_increment=quotation_to_nanos(future.min_price_increment),
+        basic_asset=future.basic_asset,
+        basic_asset_size=quotation_to_decimal(future.basic_asset_size),
+        basic_asset_position_uid=future.basic_asset_position_uid
+    )
@@ -1,62 +1,128 @@
 import logging
 from typing import Optional
 
-from tinkoff.invest import Client, GetTradingStatusResponse, SecurityTradingStatus, Quotation
+from tinkoff.invest import GetTradingStatusResponse, SecurityTradingStatus, Quotation, GetLastPricesResponse, \
+    GetOrderBookResponse, OrderBook
 
+from invest_api.channel_manager import ChannelManager
 from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
 
-__all__ = ("MarketDataService")
+__all__ = ("MarketDataService", "AsyncMarketDataService")
 
 logger = logging.getLogger(__name__)
 
 
 class MarketDataService:
     """
-    The class encapsulate tinkoff market data service api
+    The class encapsulate tinkoff market data service api (sync wrapper over AsyncMarketDataService)
+    """
+    def __init__(self, token: str, app_name: str) -> None:
+        self.__channel_manager = ChannelManager.shared(token, app_name)
+        self.__async_service = AsyncMarketDataService(token, app_name)
+
+    def is_stock_ready_for_trading(self, figi: str) -> bool:
+        """
+        Calculate and return decision does stock available for trading today:
+        Limit orders are allowed
+        Market orders are allowed
+        Trading by API are allowed
+        Status is NORMAL_TRADING (bot is skipping other statuses)
+        """
+        return self.__channel_manager.run(self.__async_service.is_stock_ready_for_trading(figi))
+
+    def get_last_price(self, figi: str) -> Optional[Quotation]:
+        """
+        Request last price for instrument by figi.
+        Main reason is for order purposes (more close to current price).
+        """
+        return self.__channel_manager.run(self.__async_service.get_last_price(figi))
+
+    def get_order_book(self, figi: str, depth: int) -> OrderBook:
+        """
+        Request current order book for instrument by figi.
+        """
+        return self.__channel_manager.run(self.__async_service.get_order_book(figi, depth))
+
+
+class AsyncMarketDataService:
+    """
+    The class encapsulate tinkoff market data service api (asyncio version)
     """
     def __init__(self, token: str, app_name: str) -> None:
         self.__token = token
         self.__app_name = app_name
+        self.__channel_manager = ChannelManager.shared(token, app_name)
 
     @invest_api_retry()
     @invest_error_logging
-    def __get_trading_status(self, figi: str) -> GetTradingStatusResponse:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            status = client.market_data.get_trading_status(figi=figi)
+    async def __get_trading_status(self, figi: str) -> GetTradingStatusResponse:
+        async with self.__channel_manager.async_client() as client:
+            status = await client.market_data.get_trading_status(figi=figi)
 
             logger.debug(f"Trading Status {figi}: {status}")
 
             return status
 
-    def is_stock_ready_for_trading(self, figi: str) -> bool:
+    async def is_stock_ready_for_trading(self, figi: str) -> bool:
         """
-        Calculate and return decision does stock available for trading today:
-        Limit orders are allowed
-        Market orders are allowed
-        Trading by API are allowed
-        Status is NORMAL_TRADING (bot is skipping other statuses)
+        Calculate and return decision does stock available for trading today.
+        See MarketDataService.is_stock_ready_for_trading
         """
-        status = self.__get_trading_status(figi)
+        return _is_ready_for_trading(await self.__get_trading_status(figi))
 
-        return status.limit_order_available_flag and \
-               status.market_order_available_flag and \
-               status.api_trade_available_flag and \
-               status.trading_status == SecurityTradingStatus.SECURITY_TRADING_STATUS_NORMAL_TRADING
-
-    @invest_api_retry()
+    @invest_api_retry(cache_fallback=True)
     @invest_error_logging
-    def get_last_price(self, figi: str) -> Optional[Quotation]:
+    async def get_last_price(self, figi: str) -> Optional[Quotation]:
         """
         Request last price for instrument by figi.
         Main reason is for order purposes (more close to current price).
         """
-        with Client(self.__token, app_name=self.__app_name) as client:
-            prices = client.market_data.get_last_prices(figi=[figi])
+        async with self.__channel_manager.async_client() as client:
+            prices = await client.market_data.get_last_prices(figi=[figi])
 
             logger.debug(f"Last prices for {figi}: {prices}")
 
-            for price in prices.last_prices:
-                if price.figi == figi:
-                    return price.price
-            else:
-                return None
+            return _last_price(prices, figi)
+
+    @invest_api_retry()
+    @invest_error_logging
+    async def get_order_book(self, figi: str, depth: int) -> OrderBook:
+        """
+        Request current order book for instrument by figi.
+        The result has the same type as order book from market data stream.
+        """
+        async with self.__channel_manager.async_client() as client:
+            order_book = await client.market_data.get_order_book(figi=figi, depth=depth)
+
+            logger.debug(f"Order book for {figi}: {order_book}")
+
+            return _order_book(order_book)
+
+
+def _is_ready_for_trading(status: GetTradingStatusResponse) -> bool:
+    return status.limit_order_available_flag and \
+           status.market_order_available_flag and \
+           status.api_trade_available_flag and \
+           status.trading_status == SecurityTradingStatus.SECURITY_TRADING_STATUS_NORMAL_TRADING
+
+
+def _last_price(prices: GetLastPricesResponse, figi: str) -> Optional[Quotation]:
+    for price in prices.last_prices:
+        if price.figi == figi:
+            return price.price
+    else:
+        return None
+
+
+def _order_book(order_book: GetOrderBookResponse) -> OrderBook:
+    return OrderBook(
+        figi=order_book.figi,
+        depth=order_book.depth,
+        is_consistent=True,
+        bids=order_book.bids,
+        asks=order_book.asks,
+        time=order_book.orderbook_ts,
+        limit_up=order_book.limit_up,
+        limit_down=order_book.limit_down,
+        instrument_uid=order_book.instrument_uid
+    )
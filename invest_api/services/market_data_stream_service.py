@@ -1,15 +1,22 @@
-import asyncio
 import datetime
 import logging
-from typing import Generator
+from typing import Generator, AsyncIterator, Optional
 
-from tinkoff.invest import Client, CandleInstrument, SubscriptionInterval, InfoInstrument, TradeInstrument, \
-    MarketDataResponse, Candle, AsyncClient, AioRequestError, OrderBook, OrderBookInstrument, SubscribeInfoResponse
+import grpc
+from tinkoff.invest import CandleInstrument, SubscriptionInterval, InfoInstrument, TradeInstrument, \
+    MarketDataResponse, Candle, SubscribeInfoResponse
 from tinkoff.invest.market_data_stream.async_market_data_stream_manager import AsyncMarketDataStreamManager
 from tinkoff.invest.market_data_stream.market_data_stream_interface import IMarketDataStreamManager
 from tinkoff.invest.market_data_stream.market_data_stream_manager import MarketDataStreamManager
 
-from invest_api.utils import invest_api_retry_status_codes
+from configuration.settings import StreamSettings
+from invest_api.book_snapshot import BookSnapshot
+from invest_api.channel_manager import ChannelManager
+from invest_api.market_data_recorder import MarketDataRecorder
+from invest_api.market_data_replay import MarketDataReplay
+from invest_api.services.market_data_service import AsyncMarketDataService
+from invest_api.sharded_stream import ShardedOrderBookStream
+from invest_api.stream_session import StreamSession
 
 __all__ = ("MarketDataStreamService")
 
@@ -18,11 +25,25 @@ logger = logging.getLogger(__name__)
 
 class MarketDataStreamService:
     """
-    The class encapsulate tinkoff market data stream (gRPC) service api
+    The class encapsulate tinkoff market data stream (gRPC) service api.
+    Async streams can be recorded into files or replayed from recorded files instead of api.
     """
-    def __init__(self, token: str, app_name: str) -> None:
+    def __init__(self, token: str, app_name: str, stream_settings: Optional[StreamSettings] = None) -> None:
         self.__token = token
         self.__app_name = app_name
+        stream_settings = stream_settings or StreamSettings()
+
+        self.__channel_manager = ChannelManager.shared(token, app_name)
+        self.__recorder = MarketDataRecorder(stream_settings.record_dir) \
+            if stream_settings.record_market_data else None
+        self.__replay = MarketDataReplay(stream_settings.replay_dir, stream_settings.replay_speed) \
+            if stream_settings.replay_dir else None
+        self.__orderbook_stream = ShardedOrderBookStream(
+            self.__channel_manager,
+            stream_settings,
+            AsyncMarketDataService(token, app_name),
+            self.__recorder
+        )
 
     def start_candles_stream(
             self,
@@ -34,7 +55,7 @@ class MarketDataStreamService:
         """
         logger.debug(f"Starting candles stream")
 
-        with Client(self.__token, app_name=self.__app_name) as client:
+        with self.__channel_manager.client() as client:
             market_data_candles_stream: MarketDataStreamManager = client.create_market_data_stream()
 
             logger.info(f"Subscribe candles: {figies}")
@@ -67,122 +88,78 @@ class MarketDataStreamService:
             self,
             figies: list[str],
             trade_before_time: datetime
-    ) -> Generator[Candle, None, None]:
+    ) -> AsyncIterator[Candle]:
         """
         The method starts async gRPC stream and return candles
         """
-        logger.debug(f"Starting async candles stream loop")
-
-        while datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) < trade_before_time:
-            try:
-                logger.debug(f"Starting async candles stream")
-
-                async with AsyncClient(self.__token, app_name=self.__app_name) as client:
-                    async_market_data_candles_stream: AsyncMarketDataStreamManager = client.create_market_data_stream()
-
-                    logger.info(f"Subscribe candles: {figies}")
-                    async_market_data_candles_stream.candles.subscribe(
-                        [
-                            CandleInstrument(
-                                figi=figi,
-                                interval=SubscriptionInterval.SUBSCRIPTION_INTERVAL_ONE_MINUTE
-                            )
-                            for figi in figies
-                        ]
-                    )
+        logger.debug(f"Starting async candles stream")
 
-                    async for market_data in async_market_data_candles_stream:
-                        logger.debug(f"market_data: {market_data}")
+        if self.__replay:
+            async for candle in self.__replay.candles(figies):
+                yield candle
+            return
 
-                        # trading will stop at trade_before_time
-                        if datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) >= trade_before_time:
-                            logger.debug(f"Time to stop candle stream")
-                            self.__stop_stream(async_market_data_candles_stream)
-                            break
+        def open_stream(channel: grpc.aio.Channel) -> AsyncMarketDataStreamManager:
+            stream = self.__channel_manager.async_services(channel).create_market_data_stream()
+            stream.candles.subscribe(
+                [
+                    CandleInstrument(
+                        figi=figi,
+                        interval=SubscriptionInterval.SUBSCRIPTION_INTERVAL_ONE_MINUTE
+                    )
+                    for figi in figies
+                ]
+            )
 
-                        if market_data.candle:
-                            yield market_data.candle
+            return stream
 
-            except AioRequestError as ex:
-                logger.error("AioRequestError code=%s repr=%s details=%s", str(ex.code), repr(ex), ex.details)
+        session = StreamSession(
+            name="Candles",
+            channel_manager=self.__channel_manager,
+            figies=figies,
+            open_stream=open_stream,
+            recorder=self.__recorder
+        )
 
-                if ex.code in invest_api_retry_status_codes():
-                    logger.debug(f"Status code available for reconnect")
-                    await asyncio.sleep(1)
-                else:
-                    raise
+        try:
+            async for market_data in session.market_data(trade_before_time):
+                logger.debug(f"market_data: {market_data}")
 
-            finally:
-                self.__stop_stream(async_market_data_candles_stream)
+                if market_data.candle:
+                    yield market_data.candle
+        finally:
+            logger.info(f"Stream {session.name} statistics: {session.stats()}")
+
+            if self.__recorder:
+                self.__recorder.close()
 
-    
-    
     async def start_async_orderbook_stream(
             self,
             figies: list[str],
             trade_before_time: datetime
-    ) -> Generator[OrderBook, None, None]:
+    ) -> AsyncIterator[BookSnapshot]:
         """
-        The method starts async gRPC stream and return orderbook
+        The method starts async gRPC streams (shards) and return orderbook of all instruments as BookSnapshot.
+        If raw order books are enabled (StreamSettings.raw_order_books), protobuf is decoded directly into BookSnapshot.
+        With replay order books are read from recorded files until the end of records.
         """
-        logger.debug(f"Starting async orderbook stream loop")
-
-        while datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) < trade_before_time:
-            try:
-                logger.debug(f"Starting async orderbook stream")
-
-                async with AsyncClient(self.__token, app_name=self.__app_name) as client:
-                    async_market_data_orderbook_stream: AsyncMarketDataStreamManager = client.create_market_data_stream()
+        logger.debug(f"Starting async orderbook streams")
 
-                    logger.info(f"Subscribe orderbook: {figies}")
-
-                    """
-                    async_market_data_orderbook_stream.info.subscribe(
-                        [
-                            InfoInstrument(
-                                instrument_id=figi
-                            )
-                            for figi in figies
-                        ]
-                    )
-                    """
-                    
-                    async_market_data_orderbook_stream.order_book.subscribe(
-                        [
-                            OrderBookInstrument(
-                                instrument_id=figi,
-                                depth=10
-                            )
-                            for figi in figies
-                        ]
-                    )
+        if self.__replay:
+            async for order_book in self.__replay.order_books(figies):
+                yield order_book
+            return
 
-                    async for market_data in async_market_data_orderbook_stream:
-                        logger.debug(f"market_data: {market_data}")
+        async for order_book in self.__orderbook_stream.order_books(figies, trade_before_time):
+            yield order_book
 
-                        # trading will stop at trade_before_time
-                        
-                        if datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) >= trade_before_time:
-                            logger.debug(f"Time to stop orderbook stream")
-                            self.__stop_stream(async_market_data_orderbook_stream)
-                            break
-                        
-                        if market_data.orderbook:
-                            yield market_data.orderbook
-
-            except AioRequestError as ex:
-                logger.error("AioRequestError code=%s repr=%s details=%s", str(ex.code), repr(ex), ex.details)
-
-                if ex.code in invest_api_retry_status_codes():
-                    logger.info(f"Status code available for reconnect")
-                    await asyncio.sleep(1)
-                else:
-                    raise
-
-            finally:
-                self.__stop_stream(async_market_data_orderbook_stream)
+    def close(self) -> None:
+        """
+        Finishes the segment of recorded market data (if recording is enabled)
+        """
+        if self.__recorder:
+            self.__recorder.close()
 
-    
     @staticmethod
     def __stop_stream(stream: IMarketDataStreamManager) -> None:
         if stream:
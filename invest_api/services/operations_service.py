@@ -1,35 +1,72 @@
+import asyncio
 import datetime
 import logging
 from decimal import Decimal
-from typing import Optional
+from typing import Optional, Union
 
-from tinkoff.invest import Client, PositionsResponse, PositionsSecurities, OperationState, Operation, PortfolioResponse
+from tinkoff.invest import PositionsResponse, PositionsSecurities, PositionsFutures, OperationState, Operation, \
+    PortfolioResponse
 from tinkoff.invest.utils import quotation_to_decimal
 
+from invest_api.channel_manager import ChannelManager
 from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
-from invest_api.services.market_data_service import MarketDataService
+from invest_api.services.market_data_service import AsyncMarketDataService
 from invest_api.utils import moneyvalue_to_decimal, rub_currency_name
 
-__all__ = ("OperationService")
+__all__ = ("OperationService", "AsyncOperationService")
 
 logger = logging.getLogger(__name__)
 
 
 class OperationService:
     """
-    The class encapsulate tinkoff operations service api
+    The class encapsulate tinkoff operations service api (sync wrapper over AsyncOperationService)
+    """
+    def __init__(self, token: str, app_name: str) -> None:
+        self.__channel_manager = ChannelManager.shared(token, app_name)
+        self.__async_service = AsyncOperationService(token, app_name)
+
+    def available_rub_on_account(self, account_id: str) -> Optional[Decimal]:
+        """
+        Return available amount of rub on account
+        """
+        return self.__channel_manager.run(self.__async_service.available_rub_on_account(account_id))
+
+    def positions_securities(self, account_id: str) -> list[PositionsSecurities]:
+        """
+        :return: All open positions for account
+        """
+        return self.__channel_manager.run(self.__async_service.positions_securities(account_id))
+
+    def positions_futures(self, account_id: str) -> list[PositionsFutures]:
+        """
+        :return: All open futures positions for account
+        """
+        return self.__channel_manager.run(self.__async_service.positions_futures(account_id))
+
+    def open_positions(self, account_id: str) -> list[Union[PositionsSecurities, PositionsFutures]]:
+        """
+        :return: All open positions of securities and futures for account
+        """
+        return self.__channel_manager.run(self.__async_service.open_positions(account_id))
+
+
+class AsyncOperationService:
+    """
+    The class encapsulate tinkoff operations service api (asyncio version)
     """
     def __init__(self, token: str, app_name: str) -> None:
         self.__token = token
         self.__app_name = app_name
+        self.__channel_manager = ChannelManager.shared(token, app_name)
+        self.__market_data_service = AsyncMarketDataService(token, app_name)
 
-    def available_rub_on_account(self, account_id: str) -> Optional[Decimal]:
+    async def available_rub_on_account(self, account_id: str) -> Optional[Decimal]:
         """
         Return available amount of rub on account
         """
         total_money = 0
-        market_data_service = MarketDataService(self.__token, self.__app_name)
-        position = self.__get_positions(account_id)
+        position = await self.__get_positions(account_id)
 
         if position:
             for money in position.money:
@@ -37,29 +74,48 @@ class OperationService:
                     logger.debug(f"Amount of RUB on account: {money}")
                     total_money = moneyvalue_to_decimal(money)
 
-            for security in position.securities:
-                if security.blocked == 0 and security.balance < 0:
-                    last_price = market_data_service.get_last_price(security.figi)
-                    if last_price:
-                        total_money += quotation_to_decimal(last_price) * security.balance * 2
+            short_securities = [x for x in position.securities if x.blocked == 0 and x.balance < 0]
+            last_prices = await asyncio.gather(
+                *[self.__market_data_service.get_last_price(x.figi) for x in short_securities]
+            )
+
+            for security, last_price in zip(short_securities, last_prices):
+                if last_price:
+                    total_money += quotation_to_decimal(last_price) * security.balance * 2
 
         return total_money
 
-    def positions_securities(self, account_id: str) -> list[PositionsSecurities]:
+    async def positions_securities(self, account_id: str) -> list[PositionsSecurities]:
         """
         :return: All open positions for account
         """
-        positions = self.__get_positions(account_id)
+        positions = await self.__get_positions(account_id)
 
         return positions.securities if positions else None
 
+    async def positions_futures(self, account_id: str) -> list[PositionsFutures]:
+        """
+        :return: All open futures positions for account
+        """
+        positions = await self.__get_positions(account_id)
+
+        return positions.futures if positions else None
+
+    async def open_positions(self, account_id: str) -> list[Union[PositionsSecurities, PositionsFutures]]:
+        """
+        :return: All open positions of securities and futures for account (one request)
+        """
+        positions = await self.__get_positions(account_id)
+
+        return list(positions.securities) + list(positions.futures) if positions else None
+
     @invest_api_retry()
     @invest_error_logging
-    def __get_positions(self, account_id: str) -> PositionsResponse:
-        with Client(self.__token, app_name=self.__app_name) as client:
+    async def __get_positions(self, account_id: str) -> PositionsResponse:
+        async with self.__channel_manager.async_client() as client:
             logger.debug(f"Get Positions for: {account_id}:")
 
-            positions = client.operations.get_positions(account_id=account_id)
+            positions = await client.operations.get_positions(account_id=account_id)
 
             logger.debug(f"{positions}")
 
@@ -67,7 +123,7 @@ class OperationService:
 
     @invest_api_retry()
     @invest_error_logging
-    def __get_operations(
+    async def __get_operations(
             self,
             account_id: str,
             from_: datetime,
@@ -75,16 +131,16 @@ class OperationService:
             state: OperationState,
             figi: str = ""
     ) -> list[Operation]:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        async with self.__channel_manager.async_client() as client:
             logger.debug(f"Get operations for: {account_id}, from: {from_}, to: {to_}, state: {state}, figi: {figi}")
 
-            operations = client.operations.get_operations(
+            operations = (await client.operations.get_operations(
                 account_id=account_id,
                 from_=from_,
                 to=to_,
                 state=state,
                 figi=figi
-            ).operations
+            )).operations
 
             logger.debug(f"{operations}")
 
@@ -92,11 +148,11 @@ class OperationService:
 
     @invest_api_retry()
     @invest_error_logging
-    def __get_portfolio(self, account_id: str) -> PortfolioResponse:
-        with Client(self.__token, app_name=self.__app_name) as client:
+    async def __get_portfolio(self, account_id: str) -> PortfolioResponse:
+        async with self.__channel_manager.async_client() as client:
             logger.debug(f"Get portfolio for: {account_id}")
 
-            portfolio = client.operations.get_portfolio(account_id=account_id)
+            portfolio = await client.operations.get_portfolio(account_id=account_id)
 
             logger.debug(f"{portfolio}")
 
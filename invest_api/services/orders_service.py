@@ -1,26 +1,60 @@
 import logging
 
-from tinkoff.invest import Client, OrderDirection, Quotation, OrderType, PostOrderResponse, OrderState
+from tinkoff.invest import OrderDirection, Quotation, OrderType, PostOrderResponse, OrderState
 
+from invest_api.channel_manager import ChannelManager
 from invest_api.utils import generate_order_id
 from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
 
-__all__ = ("OrderService")
+__all__ = ("OrderService", "AsyncOrderService")
 
 logger = logging.getLogger(__name__)
 
 
 class OrderService:
     """
-    The class encapsulate tinkoff order service api
+    The class encapsulate tinkoff order service api (sync wrapper over AsyncOrderService)
+    """
+    def __init__(self, token: str, app_name: str) -> None:
+        self.__channel_manager = ChannelManager.shared(token, app_name)
+        self.__async_service = AsyncOrderService(token, app_name)
+
+    def post_market_order(
+            self,
+            account_id: str,
+            figi: str,
+            count_lots: int,
+            is_buy: bool
+    ) -> PostOrderResponse:
+        """
+        Post market order
+        """
+        return self.__channel_manager.run(
+            self.__async_service.post_market_order(account_id, figi, count_lots, is_buy)
+        )
+
+    def cancel_order(self, account_id: str, order_id: str) -> None:
+        return self.__channel_manager.run(self.__async_service.cancel_order(account_id, order_id))
+
+    def get_order_state(self, account_id: str, order_id: str) -> OrderState:
+        return self.__channel_manager.run(self.__async_service.get_order_state(account_id, order_id))
+
+    def get_orders(self, account_id: str) -> list[OrderState]:
+        return self.__channel_manager.run(self.__async_service.get_orders(account_id))
+
+
+class AsyncOrderService:
+    """
+    The class encapsulate tinkoff order service api (asyncio version)
     """
     def __init__(self, token: str, app_name: str) -> None:
         self.__token = token
         self.__app_name = app_name
+        self.__channel_manager = ChannelManager.shared(token, app_name)
 
     @invest_api_retry()
     @invest_error_logging
-    def __post_order(
+    async def __post_order(
             self,
             account_id: str,
             figi: str,
@@ -30,8 +64,8 @@ class OrderService:
             order_type: OrderType,
             order_id: str
     ) -> PostOrderResponse:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            return client.orders.post_order(
+        async with self.__channel_manager.async_client() as client:
+            return await client.orders.post_order(
                 figi=figi,
                 quantity=count_lots,
                 price=price,
@@ -41,7 +75,7 @@ class OrderService:
                 order_id=order_id
             )
 
-    def post_market_order(
+    async def post_market_order(
             self,
             account_id: str,
             figi: str,
@@ -56,7 +90,7 @@ class OrderService:
             f"figi: {figi}, count_lots: {count_lots}, is_buy: {is_buy}"
         )
 
-        order = self.__post_order(
+        order = await self.__post_order(
             account_id=account_id,
             figi=figi,
             count_lots=count_lots,
@@ -72,18 +106,18 @@ class OrderService:
 
     @invest_api_retry()
     @invest_error_logging
-    def cancel_order(self, account_id: str, order_id: str) -> None:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            client.orders.cancel_order(account_id=account_id, order_id=order_id)
+    async def cancel_order(self, account_id: str, order_id: str) -> None:
+        async with self.__channel_manager.async_client() as client:
+            await client.orders.cancel_order(account_id=account_id, order_id=order_id)
 
     @invest_api_retry()
     @invest_error_logging
-    def get_order_state(self, account_id: str, order_id: str) -> OrderState:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            return client.orders.get_order_state(account_id=account_id, order_id=order_id)
+    async def get_order_state(self, account_id: str, order_id: str) -> OrderState:
+        async with self.__channel_manager.async_client() as client:
+            return await client.orders.get_order_state(account_id=account_id, order_id=order_id)
 
     @invest_api_retry()
     @invest_error_logging
-    def get_orders(self, account_id: str) -> list[OrderState]:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            return client.orders.get_orders(account_id=account_id).orders
+    async def get_orders(self, account_id: str) -> list[OrderState]:
+        async with self.__channel_manager.async_client() as client:
+            return (await client.orders.get_orders(account_id=account_id)).orders
@@ -1,26 +1,43 @@
 import datetime
 import logging
 
-from tinkoff.invest import Client, Quotation, StopOrderDirection, StopOrderExpirationType, StopOrderType, StopOrder
+from tinkoff.invest import Quotation, StopOrderDirection, StopOrderExpirationType, StopOrderType, StopOrder
 
+from invest_api.channel_manager import ChannelManager
 from invest_api.invest_error_decorators import invest_error_logging, invest_api_retry
 
-__all__ = ("StopOrderService")
+__all__ = ("StopOrderService", "AsyncStopOrderService")
 
 logger = logging.getLogger(__name__)
 
 
 class StopOrderService:
     """
-    The class encapsulate tinkoff stop order service api
+    The class encapsulate tinkoff stop order service api (sync wrapper over AsyncStopOrderService)
+    """
+    def __init__(self, token: str, app_name: str) -> None:
+        self.__channel_manager = ChannelManager.shared(token, app_name)
+        self.__async_service = AsyncStopOrderService(token, app_name)
+
+    def get_stop_orders(self, account_id: str) -> list[StopOrder]:
+        return self.__channel_manager.run(self.__async_service.get_stop_orders(account_id))
+
+    def cancel_stop_order(self, account_id: str, stop_order_id: str) -> None:
+        return self.__channel_manager.run(self.__async_service.cancel_stop_order(account_id, stop_order_id))
+
+
+class AsyncStopOrderService:
+    """
+    The class encapsulate tinkoff stop order service api (asyncio version)
     """
     def __init__(self, token: str, app_name: str) -> None:
         self.__token = token
         self.__app_name = app_name
+        self.__channel_manager = ChannelManager.shared(token, app_name)
 
     @invest_api_retry()
     @invest_error_logging
-    def __post_stop_order(
+    async def __post_stop_order(
             self,
             account_id: str,
             figi: str,
@@ -32,10 +49,10 @@ class StopOrderService:
             stop_order_type: StopOrderType,
             expire_date: datetime
     ) -> str:
-        with Client(self.__token, app_name=self.__app_name) as client:
+        async with self.__channel_manager.async_client() as client:
             logger.debug(f"Post stop order for: {account_id}")
 
-            return client.stop_orders.post_stop_order(
+            return (await client.stop_orders.post_stop_order(
                 figi=figi,
                 quantity=count_lots,
                 price=price,
@@ -45,16 +62,16 @@ class StopOrderService:
                 expiration_type=expiration_type,
                 stop_order_type=stop_order_type,
                 expire_date=expire_date
-            ).stop_order_id
+            )).stop_order_id
 
     @invest_api_retry()
     @invest_error_logging
-    def get_stop_orders(self, account_id: str) -> list[StopOrder]:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            return client.stop_orders.get_stop_orders(account_id=account_id).stop_orders
+    async def get_stop_orders(self, account_id: str) -> list[StopOrder]:
+        async with self.__channel_manager.async_client() as client:
+            return (await client.stop_orders.get_stop_orders(account_id=account_id)).stop_orders
 
     @invest_api_retry()
     @invest_error_logging
-    def cancel_stop_order(self, account_id: str, stop_order_id: str) -> None:
-        with Client(self.__token, app_name=self.__app_name) as client:
-            client.stop_orders.cancel_stop_order(account_id=account_id, stop_order_id=stop_order_id)
+    async def cancel_stop_order(self, account_id: str, stop_order_id: str) -> None:
+        async with self.__channel_manager.async_client() as client:
+            await client.stop_orders.cancel_stop_order(account_id=account_id, stop_order_id=stop_order_id)
@@ -0,0 +1,199 @@
+import asyncio
+import datetime
+import logging
+import math
+from typing import AsyncIterator, Optional
+
+import grpc
+from tinkoff.invest import OrderBookInstrument
+from tinkoff.invest.market_data_stream.async_market_data_stream_manager import AsyncMarketDataStreamManager
+
+from configuration.settings import StreamSettings
+from invest_api.book_snapshot import BookSnapshot, DEFAULT_DEPTH
+from invest_api.channel_manager import ChannelManager
+from invest_api.market_data_recorder import MarketDataRecorder
+from invest_api.raw_market_data_stream import RawOrderBookStream
+from invest_api.services.market_data_service import AsyncMarketDataService
+from invest_api.stream_session import StreamSession
+
+__all__ = ("ShardedOrderBookStream")
+
+logger = logging.getLogger(__name__)
+
+# Api limit of subscriptions per one stream connection
+MAX_SUBSCRIPTIONS_PER_STREAM = 300
+MARKET_DATA_STREAM = "MarketDataStreamService/MarketDataStream"
+ORDER_BOOK_DEPTH = DEFAULT_DEPTH
+# Shards wait for consumer if the merged queue is full
+MERGED_QUEUE_SIZE = 10000
+
+
+class ShardedOrderBookStream:
+    """
+    Order books of many instruments are read by several stream connections (shards).
+    Shards are merged into one async iterator. Every shard reconnects independently,
+    so one dropped connection doesn't interrupt other instruments.
+    After reconnect unary order book snapshots are requested for instruments of the shard.
+    """
+    def __init__(
+            self,
+            channel_manager: ChannelManager,
+            stream_settings: StreamSettings,
+            market_data_service: Optional[AsyncMarketDataService] = None,
+            recorder: Optional[MarketDataRecorder] = None
+    ) -> None:
+        self.__channel_manager = channel_manager
+        self.__stream_settings = stream_settings
+        self.__market_data_service = market_data_service
+        self.__recorder = recorder
+
+        self.__sessions: list[StreamSession] = []
+
+    def shards_count(self, figies_count: int) -> int:
+        connections_limit = self.__channel_manager.stream_limit(MARKET_DATA_STREAM)
+        if self.__stream_settings.max_connections:
+            connections_limit = min(connections_limit, self.__stream_settings.max_connections)
+
+        subscriptions_per_stream = min(self.__stream_settings.subscriptions_per_stream, MAX_SUBSCRIPTIONS_PER_STREAM)
+        shards_count = max(1, min(connections_limit, math.ceil(figies_count / subscriptions_per_stream)))
+
+        if figies_count > shards_count * MAX_SUBSCRIPTIONS_PER_STREAM:
+            logger.error(f"Too many instruments for stream connections: {figies_count}, "
+                         f"connections: {shards_count}. Some subscriptions will be rejected by api")
+
+        return shards_count
+
+    async def order_books(
+            self,
+            figies: list[str],
+            trade_before_time: datetime
+    ) -> AsyncIterator[BookSnapshot]:
+        """
+        The method starts shards and return order books of all instruments
+        """
+        shards_count = self.shards_count(len(figies))
+        logger.info(f"Start order book streams: {shards_count}, instruments: {len(figies)}")
+
+        merged_queue: asyncio.Queue = asyncio.Queue(maxsize=MERGED_QUEUE_SIZE)
+        self.__sessions = [
+            self.__new_session(f"OrderBookShard{shard}", figies[shard::shards_count])
+            for shard in range(shards_count)
+        ]
+
+        tasks = [
+            asyncio.create_task(self.__shard_loop(session, trade_before_time, merged_queue), name=session.name)
+            for session in self.__sessions
+        ]
+        active_shards = len(tasks)
+
+        try:
+            while active_shards:
+                item = await merged_queue.get()
+
+                # None means the shard has been completed
+                if item is None:
+                    active_shards -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            for session in self.__sessions:
+                logger.info(f"Stream {session.name} statistics: {session.stats()}")
+
+            # The segment is finished with gzip trailer, records of other streams go into a new segment
+            if self.__recorder:
+                self.__recorder.close()
+
+    async def __shard_loop(
+            self,
+            session: StreamSession,
+            trade_before_time: datetime,
+            merged_queue: asyncio.Queue
+    ) -> None:
+        snapshot_tasks: set[asyncio.Task] = set()
+
+        def on_resubscribe() -> None:
+            if self.__stream_settings.snapshot_after_reconnect and self.__market_data_service:
+                task = asyncio.create_task(self.__put_snapshots(session, merged_queue))
+                snapshot_tasks.add(task)
+                task.add_done_callback(snapshot_tasks.discard)
+
+        try:
+            async for item in session.market_data(trade_before_time, on_resubscribe):
+                if self.__stream_settings.raw_order_books:
+                    await merged_queue.put(item)
+                elif item.orderbook:
+                    # Order book is converted once here and shared by all consumers
+                    await merged_queue.put(BookSnapshot.from_order_book(item.orderbook, ORDER_BOOK_DEPTH))
+
+            await merged_queue.put(None)
+
+        except asyncio.CancelledError:
+            raise
+        except Exception as ex:
+            await merged_queue.put(ex)
+        finally:
+            for task in snapshot_tasks:
+                task.cancel()
+
+    async def __put_snapshots(self, session: StreamSession, merged_queue: asyncio.Queue) -> None:
+        """
+        Unary order books for instruments without data after reconnect,
+        so strategies don't act on stale books during the gap.
+        """
+        figies = session.down_figies()
+        logger.info(f"Stream {session.name} request order book snapshots: {len(figies)}")
+
+        order_books = await asyncio.gather(
+            *[self.__market_data_service.get_order_book(figi, ORDER_BOOK_DEPTH) for figi in figies],
+            return_exceptions=True
+        )
+
+        down_figies = set(session.down_figies())
+        for figi, order_book in zip(figies, order_books):
+            if isinstance(order_book, Exception):
+                logger.error(f"Order book snapshot error {figi}: {repr(order_book)}")
+            # The stream may have already sent newer order book
+            elif figi in down_figies:
+                await merged_queue.put(BookSnapshot.from_order_book(order_book, ORDER_BOOK_DEPTH))
+
+    def __new_session(self, name: str, figies: list[str]) -> StreamSession:
+        if self.__stream_settings.raw_order_books:
+            return StreamSession(
+                name=name,
+                channel_manager=self.__channel_manager,
+                figies=figies,
+                open_stream=lambda channel: RawOrderBookStream(
+                    channel, self.__channel_manager.metadata(), figies, ORDER_BOOK_DEPTH, self.__recorder
+                ),
+                item_figi=lambda book: book.figi
+            )
+
+        def open_stream(channel: grpc.aio.Channel) -> AsyncMarketDataStreamManager:
+            stream = self.__channel_manager.async_services(channel).create_market_data_stream()
+            stream.order_book.subscribe(
+                [
+                    OrderBookInstrument(
+                        instrument_id=figi,
+                        depth=ORDER_BOOK_DEPTH
+                    )
+                    for figi in figies
+                ]
+            )
+
+            return stream
+
+        return StreamSession(
+            name=name,
+            channel_manager=self.__channel_manager,
+            figies=figies,
+            open_stream=open_stream,
+            recorder=self.__recorder
+        )
+
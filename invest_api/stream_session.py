@@ -0,0 +1,164 @@
+import asyncio
+import datetime
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Optional
+
+import grpc
+from tinkoff.invest import AioRequestError, MarketDataResponse
+
+from invest_api.channel_manager import ChannelManager
+from invest_api.invest_error_decorators import RetryPolicy
+from invest_api.market_data_recorder import MarketDataRecorder
+
+__all__ = ("StreamSession", "STREAM_RETRY_POLICY")
+
+logger = logging.getLogger(__name__)
+
+# Streams are resubscribed quickly: the first attempt is almost immediate, the delay grows up to 2 seconds
+STREAM_RETRY_POLICY = RetryPolicy(base_delay=0.01, max_delay=2.0, status_code_delays={})
+
+
+class StreamSession:
+    """
+    Market data stream on dedicated channel. The channel is kept between reconnects:
+    after retryable error only the stream is resubscribed (with backoff), without new TLS and HTTP/2 handshake.
+    Reconnects count and downtime (from error to the first message after resubscribe) are recorded per figi.
+    """
+    def __init__(
+            self,
+            name: str,
+            channel_manager: ChannelManager,
+            figies: list[str],
+            open_stream: Callable[[grpc.aio.Channel], Any],
+            item_figi: Optional[Callable[[Any], str]] = None,
+            retry_policy: RetryPolicy = STREAM_RETRY_POLICY,
+            recorder: Optional[MarketDataRecorder] = None
+    ) -> None:
+        """
+        :param open_stream: Creates subscribed stream on the channel. The stream supports async iteration and stop()
+        (e.g. AsyncMarketDataStreamManager or RawOrderBookStream)
+        :param item_figi: Figi of stream item (MarketDataResponse by default)
+        :param recorder: Records every item of the stream (MarketDataResponse)
+        """
+        self.__name = name
+        self.__channel_manager = channel_manager
+        self.__figies = figies
+        self.__open_stream = open_stream
+        self.__item_figi = item_figi or _market_data_figi
+        self.__retry_policy = retry_policy
+        self.__recorder = recorder
+
+        self.__reconnects = 0
+        self.__messages = 0
+        # figi -> start of downtime (monotonic time)
+        self.__down_since: dict[str, float] = dict()
+        self.__figi_stats: dict[str, dict] = {figi: {"reconnects": 0, "downtime": 0.0} for figi in figies}
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    def down_figies(self) -> list[str]:
+        """
+        :return: Instruments without data since the last reconnect
+        """
+        return list(self.__down_since.keys())
+
+    def stats(self) -> dict:
+        return {
+            "instruments": len(self.__figies),
+            "messages": self.__messages,
+            "reconnects": self.__reconnects,
+            "figies": {figi: {"reconnects": figi_stats["reconnects"], "downtime": round(figi_stats["downtime"], 3)}
+                       for figi, figi_stats in self.__figi_stats.items() if figi_stats["reconnects"]}
+        }
+
+    async def market_data(
+            self,
+            trade_before_time: datetime,
+            on_resubscribe: Optional[Callable[[], None]] = None
+    ) -> AsyncIterator[Any]:
+        """
+        The method reads the stream until trade_before_time.
+        :param on_resubscribe: Called after every successful resubscribe (e.g. to request snapshots of down figies)
+        """
+        async with self.__channel_manager.async_stream_channel() as channel:
+            attempt = 0
+
+            while not _is_time_to_stop(trade_before_time):
+                logger.info(f"Stream {self.__name} subscribe: {self.__figies}")
+                stream = self.__open_stream(channel)
+
+                try:
+
+                    if self.__down_since and on_resubscribe:
+                        on_resubscribe()
+
+                    async for item in stream:
+                        # trading will stop at trade_before_time
+                        if _is_time_to_stop(trade_before_time):
+                            logger.debug(f"Time to stop stream {self.__name}")
+                            return
+
+                        attempt = 0
+                        self.__on_item(item)
+
+                        if self.__recorder:
+                            self.__recorder.record(item)
+
+                        yield item
+
+                    # Server has closed the stream without error (e.g. maintenance), it's resubscribed with backoff too
+                    attempt += 1
+                    delay = self.__retry_policy.delay(attempt)
+
+                except AioRequestError as ex:
+                    logger.error("Stream %s AioRequestError code=%s repr=%s details=%s",
+                                 self.__name, str(ex.code), repr(ex), ex.details)
+
+                    if not self.__retry_policy.is_retryable(ex):
+                        raise
+
+                    attempt += 1
+                    delay = self.__retry_policy.delay(attempt, ex)
+
+                finally:
+                    stream.stop()
+
+                self.__on_disconnect()
+
+                logger.info(f"Stream {self.__name} will be resubscribed in {delay:.3f} s")
+                await asyncio.sleep(delay)
+
+    def __on_item(self, item: Any) -> None:
+        self.__messages += 1
+
+        if self.__down_since:
+            figi = self.__item_figi(item)
+            down_since = self.__down_since.pop(figi, None)
+
+            if down_since is not None:
+                self.__figi_stats[figi]["downtime"] += time.monotonic() - down_since
+
+    def __on_disconnect(self) -> None:
+        self.__reconnects += 1
+
+        now = time.monotonic()
+        for figi in self.__figies:
+            self.__figi_stats[figi]["reconnects"] += 1
+            # Downtime continues if the figi hasn't got data since the previous reconnect
+            self.__down_since.setdefault(figi, now)
+
+
+def _is_time_to_stop(trade_before_time: datetime) -> bool:
+    return datetime.datetime.utcnow().replace(tzinfo=datetime.timezone.utc) >= trade_before_time
+
+
+def _market_data_figi(market_data: MarketDataResponse) -> str:
+    for payload in (market_data.orderbook, market_data.candle, market_data.trade,
+                    market_data.last_price, market_data.trading_status):
+        if payload:
+            return payload.figi
+
+    return ""
@@ -1,13 +1,19 @@
 import datetime
 import uuid
-from decimal import Decimal
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Iterable, Union
 
+import numpy as np
 from grpc import StatusCode
 from tinkoff.invest import MoneyValue, Quotation, Candle, HistoricCandle, TradingDay
-from tinkoff.invest.utils import quotation_to_decimal, decimal_to_quotation
+
+from configuration.settings import InstrumentSettings
 
 __all__ = ()
 
+# Fixed-point prices and money are int nanos: units * NANOS_IN_UNIT + nano (as Quotation and MoneyValue)
+NANOS_IN_UNIT = 1_000_000_000
+
 
 def rub_currency_name() -> str:
     return "rub"
@@ -18,21 +24,108 @@ def moex_exchange_name() -> str:
 
 
 def moneyvalue_to_decimal(money_value: MoneyValue) -> Decimal:
-    return quotation_to_decimal(
-        Quotation(
-            units=money_value.units,
-            nano=money_value.nano
-        )
-    )
+    return nanos_to_decimal(moneyvalue_to_nanos(money_value))
 
 
 def decimal_to_moneyvalue(decimal: Decimal, currency: str = rub_currency_name()) -> MoneyValue:
-    quotation = decimal_to_quotation(decimal)
-    return MoneyValue(
-        currency=currency,
-        units=quotation.units,
-        nano=quotation.nano
-    )
+    return nanos_to_moneyvalue(decimal_to_nanos(decimal), currency)
+
+
+def quotation_to_nanos(quotation: Quotation) -> int:
+    return quotation.units * NANOS_IN_UNIT + quotation.nano
+
+
+def moneyvalue_to_nanos(money_value: MoneyValue) -> int:
+    return money_value.units * NANOS_IN_UNIT + money_value.nano
+
+
+def nanos_to_quotation(nanos: int) -> Quotation:
+    units, nano = _split_nanos(nanos)
+    return Quotation(units=units, nano=nano)
+
+
+def nanos_to_moneyvalue(nanos: int, currency: str = rub_currency_name()) -> MoneyValue:
+    units, nano = _split_nanos(nanos)
+    return MoneyValue(currency=currency, units=units, nano=nano)
+
+
+def quotations_to_nanos(quotations: Iterable[Quotation]) -> np.ndarray:
+    """
+    :return: int64 array of fixed-point prices
+    """
+    return np.fromiter((quotation_to_nanos(x) for x in quotations), dtype=np.int64)
+
+
+def nanos_to_decimal(nanos: int) -> Decimal:
+    """
+    Exact conversion for reporting purposes
+    """
+    return Decimal(int(nanos)).scaleb(-9)
+
+
+def decimal_to_nanos(decimal: Decimal) -> int:
+    """
+    Digits after 9th decimal place are rounded (half to even)
+    """
+    return int((Decimal(decimal) * NANOS_IN_UNIT).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+def nanos_to_float(nanos: Union[int, np.ndarray]) -> Union[float, np.ndarray]:
+    """
+    Works for int and NumPy arrays (vectorized)
+    """
+    return nanos / NANOS_IN_UNIT
+
+
+def round_to_increment(
+        nanos: Union[int, np.ndarray],
+        increment: int
+) -> Union[int, np.ndarray]:
+    """
+    Round fixed-point price to the nearest multiple of minimal price increment (nanos).
+    Works for int and NumPy int64 arrays (vectorized). Zero increment - no rounding.
+    """
+    if not increment:
+        return nanos
+
+    return (nanos + increment // 2) // increment * increment
+
+
+def floor_to_increment(
+        nanos: Union[int, np.ndarray],
+        increment: int
+) -> Union[int, np.ndarray]:
+    """
+    Round fixed-point price down to multiple of minimal price increment (e.g. price of buy limit order)
+    """
+    if not increment:
+        return nanos
+
+    return nanos // increment * increment
+
+
+def ceil_to_increment(
+        nanos: Union[int, np.ndarray],
+        increment: int
+) -> Union[int, np.ndarray]:
+    """
+    Round fixed-point price up to multiple of minimal price increment (e.g. price of sell limit order)
+    """
+    if not increment:
+        return nanos
+
+    return -(-nanos // increment) * increment
+
+
+def _split_nanos(nanos: int) -> (int, int):
+    # units and nano have the same sign as in tinkoff api: -1.5 -> units=-1, nano=-500000000
+    nanos = int(nanos)
+    units, nano = divmod(abs(nanos), NANOS_IN_UNIT)
+
+    if nanos < 0:
+        return -units, -nano
+
+    return units, nano
 
 
 def generate_order_id() -> str:
@@ -51,6 +144,16 @@ def candle_to_historiccandle(candle: Candle) -> HistoricCandle:
     )
 
 
+def is_trading_available(instrument: InstrumentSettings) -> bool:
+    """
+    Instrument can be traded by api: not OTC, buy and sell are available
+    """
+    return (not instrument.otc_flag) \
+        and instrument.buy_available_flag \
+        and instrument.sell_available_flag \
+        and instrument.api_trade_available_flag
+
+
 def invest_api_retry_status_codes() -> set[StatusCode]:
     return {StatusCode.CANCELLED, StatusCode.DEADLINE_EXCEEDED, StatusCode.RESOURCE_EXHAUSTED,
             StatusCode.FAILED_PRECONDITION, StatusCode.ABORTED, StatusCode.INTERNAL,
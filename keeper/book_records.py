@@ -0,0 +1,101 @@
+import datetime
+import enum
+import logging
+import struct
+
+from invest_api.book_snapshot import BookSnapshot, DEFAULT_DEPTH
+from invest_api.utils import nanos_to_float
+
+__all__ = ("BookLayout", "BookRecordLayout")
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+# Length of ticker in packed record
+TICKER_LENGTH = struct.Struct("<B")
+
+
+@enum.unique
+class BookLayout(str, enum.Enum):
+    # Column per level: bid_price_1..N, bid_qty_1..N, ask_price_1..N, ask_qty_1..N
+    WIDE = "wide"
+    # Array column per side: bid_prices, bid_qtys, ask_prices, ask_qtys
+    ARRAY = "array"
+
+
+class BookRecordLayout:
+    """
+    Rows of order book table for COPY: ticker, datetime and levels up to configured depth.
+    """
+    def __init__(self, depth: int, layout: str) -> None:
+        self.__depth = max(1, min(depth, DEFAULT_DEPTH))
+        self.__layout = BookLayout(layout)
+        # Packed record after ticker: datetime (microseconds since epoch), bid prices, bid quantities,
+        # ask prices and ask quantities up to depth
+        self.__levels_struct = struct.Struct(f"<q{self.__depth}d{self.__depth}q{self.__depth}d{self.__depth}q")
+
+        if self.__depth != depth:
+            logger.warning(f"Order book depth {depth} isn't supported. Depth {self.__depth} will be used")
+
+    @property
+    def depth(self) -> int:
+        return self.__depth
+
+    @property
+    def layout(self) -> BookLayout:
+        return self.__layout
+
+    def columns(self) -> list[str]:
+        if self.__layout == BookLayout.ARRAY:
+            return ["ticker", "datetime", "bid_prices", "bid_qtys", "ask_prices", "ask_qtys"]
+
+        levels = range(1, self.__depth + 1)
+        return ["ticker", "datetime"] + \
+            [f"bid_price_{x}" for x in levels] + \
+            [f"bid_qty_{x}" for x in levels] + \
+            [f"ask_price_{x}" for x in levels] + \
+            [f"ask_qty_{x}" for x in levels]
+
+    def record(self, book: BookSnapshot, ticker: str) -> tuple:
+        depth = self.__depth
+
+        # Vectorized conversion of fixed-point prices, tolist() gives python types for asyncpg encoders
+        bid_prices = nanos_to_float(book.bid_prices[:depth]).tolist()
+        bid_quantities = book.bid_quantities[:depth].tolist()
+        ask_prices = nanos_to_float(book.ask_prices[:depth]).tolist()
+        ask_quantities = book.ask_quantities[:depth].tolist()
+
+        if self.__layout == BookLayout.ARRAY:
+            return ticker, book.time, bid_prices, bid_quantities, ask_prices, ask_quantities
+
+        return (ticker, book.time, *bid_prices, *bid_quantities, *ask_prices, *ask_quantities)
+
+    def pack(self, record: tuple) -> bytes:
+        """
+        :return: Record in binary form of fixed layout (e.g. for write-ahead log)
+        """
+        ticker = record[0].encode()
+        time_us = (record[1] - EPOCH) // datetime.timedelta(microseconds=1)
+
+        if self.__layout == BookLayout.ARRAY:
+            levels = [value for values in record[2:] for value in values]
+        else:
+            levels = record[2:]
+
+        return TICKER_LENGTH.pack(len(ticker)) + ticker + self.__levels_struct.pack(time_us, *levels)
+
+    def unpack(self, data: bytes) -> tuple:
+        """
+        :return: Record from binary form made by pack
+        """
+        ticker_end = TICKER_LENGTH.size + TICKER_LENGTH.unpack_from(data)[0]
+        ticker = data[TICKER_LENGTH.size:ticker_end].decode()
+
+        time_us, *levels = self.__levels_struct.unpack_from(data, ticker_end)
+        time = EPOCH + datetime.timedelta(microseconds=time_us)
+
+        if self.__layout == BookLayout.ARRAY:
+            depth = self.__depth
+            return ticker, time, *(levels[x:x + depth] for x in range(0, len(levels), depth))
+
+        return ticker, time, *levels
@@ -1,77 +1,355 @@
 import asyncio
 import logging
+import random
+import time
 import traceback
-import asyncpg
+from typing import Optional
 
 from configuration.settings import KeepSettings
+from keeper.book_records import BookRecordLayout
+from keeper.segment_log import SegmentLog
+from keeper.spill_file import SpillFile
+from keeper.storages.base_storage import IStorage
+from keeper.storages.storage_factory import StorageFactory
 
 __all__ = ("KeepWorker")
 
 logger = logging.getLogger(__name__)
 
-BATCH_SIZE = 100
+MIN_BATCH_SIZE = 10
+# Batch size is adapted to observed COPY speed, so one COPY takes about this time
+TARGET_FLUSH_SECONDS = 0.25
 STOP_SIGNAL = None
+# The batch waits longer than max latency
+LATENCY_SIGNAL = object()
+# Backoff between attempts to save the same batch
+RETRY_BASE_DELAY = 0.1
+RETRY_MAX_DELAY = 30.0
+# Spilled chunk of storage which isn't durable on save has this count of batches
+SPILL_CHUNK_BATCHES = 100
+
 
 class KeepWorker:
     """
     Class is represent worker (coroutine) for asyncio task.
     Checks available data in queue and save they asynchronously into DB.
+    A batch is saved when it's full or when its oldest record waits longer than max latency.
+    Batches are saved into storage (PostgreSQL or columnar files) by several writers concurrently.
+    A batch is retried with backoff until it is saved (at-least-once delivery).
+    Batches which haven't been saved when the worker is stopped are appended into spill file and saved by the next run.
+    Stop signal (end of trading day) flushes the batch and spilled records.
+    With write-ahead log records come from sealed segments of the log, a segment is removed after its records are saved.
+    Segments and spilled chunks are acknowledged only when their records are durable: after save for PostgreSQL,
+    after sync (end of trading day) for file storages.
+    Segments and spilled chunks with rejected batches (non-retryable errors) are moved into dead letter directory.
     """
     def __init__(
         self,
         keep_settings: KeepSettings,
-        data_queue: asyncio.Queue
+        data_queue: asyncio.Queue,
+        spill_file: SpillFile,
+        segment_log: Optional[SegmentLog] = None
     ) -> None:
         self.__data_queue = data_queue
+        self.__spill_file = spill_file
+        self.__segment_log = segment_log
+        self.__writers = max(1, keep_settings.writers)
+
+        self.__storage = StorageFactory.new_factory(
+            keep_settings.storage, keep_settings, BookRecordLayout(keep_settings.depth, keep_settings.layout)
+        )
+        if not self.__storage:
+            raise ValueError(f"Unknown keeper storage: {keep_settings.storage}")
+
+        self.__max_batch_size = max(MIN_BATCH_SIZE, keep_settings.max_batch_size)
+        self.__max_latency = keep_settings.max_latency_ms / 1000
+        self.__batch_size = self.__max_batch_size
+        # Segments of write-ahead log which have been saved, but aren't durable until sync of storage
+        self.__unsynced_segments: list[str] = []
+        self.__replay_lock = asyncio.Lock()
 
+        # Full batches wait for a free writer, so the data queue gets backpressure from database
+        self.__batch_queue: asyncio.Queue = asyncio.Queue(maxsize=self.__writers * 2)
+
+        self.__stats = {
+            "rows": 0,
+            "batches": 0,
+            "retries": 0,
+            "failed_rows": 0,
+            "replayed_segments": 0,
+            "dead_letter_segments": 0,
+            "dead_letter_chunks": 0,
+            "spilled_on_close": 0,
+            "flush_time": 0.0,
+            "max_flush_time": 0.0,
+            "max_queue_depth": 0
+        }
 
     async def worker(self) -> None:
-        conn = await asyncpg.connect("postgres://juman@127.0.0.1:5432/mystery")
+        await self.__storage.open()
+        writers = [
+            asyncio.create_task(self.__writer(self.__storage), name=f"KeepWriter{writer}")
+            for writer in range(self.__writers)
+        ]
+        if self.__segment_log:
+            writers.append(asyncio.create_task(self.__replayer(), name="KeepReplayer"))
+
+        batch: list[tuple] = []
         try:
-            batch: list[tuple] = []
+            batch_started_at = 0.0
             while True:
-                data = await self.__data_queue.get()
-                logger.debug(f"Get data from queue (size: {self.__data_queue.qsize()}): {data}")
+                data = await self.__next_data(batch_started_at if batch else None)
+                self.__stats["max_queue_depth"] = max(self.__stats["max_queue_depth"], self.__data_queue.qsize())
+
+                if data is LATENCY_SIGNAL:
+                    logger.debug(f"Batch max latency has been reached: {len(batch)}")
+                    await self.__flush(batch)
+                    batch = []
+                    continue
 
                 if data is STOP_SIGNAL:
                     logger.info("Stop signal has been received.")
-                    if batch:
-                        await self.__save_batch(conn, batch)
-                    self.__data_queue.task_done()
-                    break
+                    await self.__flush(batch)
+                    batch = []
+                    await self.__drain_spill_file()
+                    if self.__segment_log:
+                        # Records of the trading day are saved without waiting for the replayer
+                        self.__segment_log.seal()
+                        await self.__replay_segments()
+                    # All batches of the trading day are saved before statistics
+                    await self.__batch_queue.join()
+                    await self.__sync()
+                    logger.info(f"KeepWorker statistics: {self.stats()}")
+                    continue
 
+                if not batch:
+                    batch_started_at = time.monotonic()
                 batch.append(data)
-                self.__data_queue.task_done()
 
-                if len(batch) >= BATCH_SIZE:
-                    await self.__save_batch(conn, batch)
+                if len(batch) >= self.__batch_size:
+                    await self.__flush(batch)
                     batch = []
-            
-            logger.info("The Keeper has completed its work.")
+
         except Exception as ex:
-            logger.error(f"Error saving the data to the database: {repr(ex)}") 
+            logger.error(f"Error saving the data to the database: {repr(ex)}")
             logger.error(traceback.format_exc())
         finally:
-            await conn.close()
-            
+            for writer in writers:
+                writer.cancel()
+            await asyncio.gather(*writers, return_exceptions=True)
 
-    async def __save_batch(self, conn: asyncpg.Connection, batch: list[tuple]) -> None:
-        try:
-            logger.debug(f"Try copy batch: {str(batch)}")
-            await conn.copy_records_to_table(
-                "order_book",
-                records=batch,
-                columns=[
-                    'ticker',
-                    'datetime',
-                    'bid_price_1',
-                    'bid_qty_1',
-                    'ask_price_1',
-                    'ask_qty_1'
-                ]
-            )
-            logger.debug(f"Batch saved")
-        except Exception as ex:
-            logger.error(f"Error COPY the data to the database: {repr(ex)}") 
-            logger.error(traceback.format_exc())
-                
\ No newline at end of file
+            # Batches which haven't been saved are saved from spill file by the next run
+            self.__spill_unsaved(batch)
+            while not self.__batch_queue.empty():
+                queued_batch, saved = self.__batch_queue.get_nowait()
+                self.__batch_queue.task_done()
+                if saved is None:
+                    self.__spill_unsaved(queued_batch)
+            while not self.__data_queue.empty():
+                data = self.__data_queue.get_nowait()
+                self.__data_queue.task_done()
+                if data is not STOP_SIGNAL:
+                    self.__spill_unsaved([data])
+
+            await self.__storage.close()
+            self.__remove_unsynced_segments()
+
+            self.__spill_file.close()
+
+            if self.__segment_log:
+                self.__segment_log.close()
+
+    def stats(self) -> dict:
+        batches = self.__stats["batches"]
+        return {
+            **self.__stats,
+            "flush_time": round(self.__stats["flush_time"], 3),
+            "max_flush_time": round(self.__stats["max_flush_time"], 3),
+            "avg_flush_time": round(self.__stats["flush_time"] / batches, 3) if batches else 0.0,
+            "batch_size": self.__batch_size,
+            "writers": self.__writers,
+            "queue_depth": self.__data_queue.qsize(),
+            "batch_queue_depth": self.__batch_queue.qsize(),
+            "spill_pending": self.__spill_file.pending,
+            "write_ahead_log": self.__segment_log.stats() if self.__segment_log else None
+        }
+
+    async def __next_data(self, batch_started_at: Optional[float]):
+        """
+        :return: Next record from the queue or LATENCY_SIGNAL if the batch has to be flushed
+        """
+        if not self.__data_queue.empty():
+            data = self.__data_queue.get_nowait()
+        elif batch_started_at is None:
+            data = await self.__data_queue.get()
+        else:
+            try:
+                timeout = max(0.0, self.__max_latency - (time.monotonic() - batch_started_at))
+                data = await asyncio.wait_for(self.__data_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return LATENCY_SIGNAL
+
+        self.__data_queue.task_done()
+        return data
+
+    async def __flush(self, batch: list[tuple]) -> None:
+        if not batch:
+            return None
+
+        # Waits for a free place if all writers are busy
+        await self.__batch_queue.put((batch, None))
+
+        # Spilled records are saved by chunks when the database catches up with the queue
+        if self.__spill_file.pending and self.__data_queue.qsize() < self.__data_queue.maxsize // 2:
+            await self.__drain_spill_file(max_chunks=1)
+
+    async def __drain_spill_file(self, max_chunks: Optional[int] = None) -> None:
+        """
+        Saves spilled records by chunks. A chunk is removed from the spill file only after it's durable.
+        """
+        # Every chunk of not durable storage is synced, so its chunks are bigger
+        chunk_size = self.__max_batch_size * (1 if self.__storage.is_durable_on_save() else SPILL_CHUNK_BATCHES)
+
+        chunks = 0
+        while max_chunks is None or chunks < max_chunks:
+            records = self.__spill_file.read_chunk(chunk_size)
+            if not records:
+                break
+
+            if await self.__save_records(records):
+                if not self.__storage.is_durable_on_save():
+                    await self.__storage.sync()
+                self.__spill_file.commit_chunk()
+            else:
+                self.__spill_file.move_chunk_to_dead_letter(records)
+                self.__stats["dead_letter_chunks"] += 1
+            chunks += 1
+
+    async def __replayer(self) -> None:
+        """
+        Saves sealed segments of write-ahead log into DB and removes them.
+        The active segment is sealed when it's older than max latency.
+        """
+        while True:
+            if self.__segment_log.active_age() >= self.__max_latency:
+                self.__segment_log.seal()
+
+            await self.__replay_segments()
+            await asyncio.sleep(self.__max_latency)
+
+    async def __replay_segments(self) -> None:
+        """
+        Saves all sealed segments (the replayer and stop signal don't replay the same segment twice)
+        """
+        async with self.__replay_lock:
+            for file_name in self.__segment_log.sealed_segments():
+                if file_name in self.__unsynced_segments:
+                    continue
+
+                # The segment is removed only when all its batches are committed
+                if await self.__save_records(self.__segment_log.read_segment(file_name)):
+                    if self.__storage.is_durable_on_save():
+                        self.__segment_log.remove_segment(file_name)
+                    else:
+                        self.__unsynced_segments.append(file_name)
+                    self.__stats["replayed_segments"] += 1
+                else:
+                    # Rejected records stay on disk (committed batches of the segment are saved again on replay)
+                    self.__segment_log.move_to_dead_letter(file_name)
+                    self.__stats["dead_letter_segments"] += 1
+
+    async def __save_records(self, records: list[tuple]) -> bool:
+        """
+        Saves records from disk (segment or spilled chunk) by batches
+        :return: True if all batches have been committed
+        """
+        saved = []
+        for start in range(0, len(records), self.__max_batch_size):
+            saved.append(asyncio.get_running_loop().create_future())
+            await self.__batch_queue.put((records[start:start + self.__max_batch_size], saved[-1]))
+
+        return all(await asyncio.gather(*saved))
+
+    async def __sync(self) -> None:
+        await self.__storage.sync()
+        self.__remove_unsynced_segments()
+
+    def __remove_unsynced_segments(self) -> None:
+        # Records of the segments are durable after sync of storage
+        for file_name in self.__unsynced_segments:
+            self.__segment_log.remove_segment(file_name)
+        self.__unsynced_segments.clear()
+
+    async def __writer(self, storage: IStorage) -> None:
+        while True:
+            batch, saved = await self.__batch_queue.get()
+            try:
+                committed = await self.__save_batch(storage, batch)
+            except asyncio.CancelledError:
+                # Records of segment or spilled chunk stay on disk, records from the queue are spilled
+                if saved is None:
+                    self.__spill_unsaved(batch)
+                raise
+            finally:
+                self.__batch_queue.task_done()
+
+            # The future gets False if the batch has been rejected
+            if saved and not saved.done():
+                saved.set_result(committed)
+
+    def __spill_unsaved(self, batch: list[tuple]) -> None:
+        for record in batch:
+            self.__spill_file.append(record)
+        self.__stats["spilled_on_close"] += len(batch)
+
+    async def __save_batch(self, storage: IStorage, batch: list[tuple]) -> bool:
+        """
+        :return: True if the batch has been committed, False if it has been rejected by non-retryable error
+        """
+        attempt = 0
+        while True:
+            try:
+                logger.debug(f"Try save batch: {len(batch)}")
+                started_at = time.monotonic()
+
+                await storage.save_batch(batch)
+
+                self.__on_saved(len(batch), time.monotonic() - started_at)
+                logger.debug(f"Batch saved")
+                return True
+
+            except Exception as ex:
+                if not storage.is_retryable(ex):
+                    # Data or schema errors can't be fixed by retry
+                    self.__stats["failed_rows"] += len(batch)
+
+                    logger.error(f"Error saving the batch, batch is rejected: {repr(ex)}")
+                    logger.error(traceback.format_exc())
+                    return False
+
+                attempt += 1
+                self.__stats["retries"] += 1
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)) * (1 - 0.5 * random.random())
+
+                logger.error(f"Error saving the batch (attempt {attempt}, "
+                             f"retry in {delay:.3f} s): {repr(ex)}")
+                await asyncio.sleep(delay)
+
+    def __on_saved(self, rows: int, flush_time: float) -> None:
+        self.__stats["rows"] += rows
+        self.__stats["batches"] += 1
+        self.__stats["flush_time"] += flush_time
+        self.__stats["max_flush_time"] = max(self.__stats["max_flush_time"], flush_time)
+
+        self.__adapt_batch_size(rows, flush_time)
+
+    def __adapt_batch_size(self, rows: int, flush_time: float) -> None:
+        if flush_time <= 0:
+            return None
+
+        target_batch_size = int(rows / flush_time * TARGET_FLUSH_SECONDS)
+        # Smooth changes between batches
+        self.__batch_size = max(
+            MIN_BATCH_SIZE,
+            min(self.__max_batch_size, (self.__batch_size + target_batch_size) // 2)
+        )
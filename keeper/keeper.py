@@ -1,65 +1,151 @@
 import asyncio
 import logging
 import traceback
+from typing import Optional
 
-from tinkoff.invest import OrderBook
-from tinkoff.invest.utils import quotation_to_decimal
+import numpy as np
+
+from configuration.settings import KeepSettings
+from invest_api.book_snapshot import BookSnapshot
+from invest_api.instrument_registry import InstrumentRegistry
+from keeper.book_records import BookRecordLayout
+from keeper.keep_worker import STOP_SIGNAL
+from keeper.segment_log import SegmentLog
+from keeper.spill_file import SpillFile
 
 __all__ = ("Keeper")
 
 logger = logging.getLogger(__name__)
 
+
 class Keeper:
     """
     Class sends data to db queue.
+    Policies for full queue: block - wait for free place (market data stream waits too),
+    drop_oldest - drop the oldest record, spill - write record into local spill file (KeepWorker saves it later).
+    With write-ahead log all records are appended into the log and the queue is used only for stop signal,
+    so market data stream never waits for DB.
+    With deduplication a book is saved only if its levels up to saved depth differ from the previous saved book
+    of the instrument (the exchange resends books with unchanged top levels).
     """
-    def __init__(self, data_queue: asyncio.Queue) -> None:
+    def __init__(
+            self,
+            keep_settings: KeepSettings,
+            data_queue: asyncio.Queue,
+            instrument_registry: InstrumentRegistry,
+            spill_file: SpillFile,
+            segment_log: Optional[SegmentLog] = None
+    ) -> None:
         self.__data_queue = data_queue
+        self.__instrument_registry = instrument_registry
+        self.__record_layout = BookRecordLayout(keep_settings.depth, keep_settings.layout)
+        self.__overflow_policy = keep_settings.overflow_policy
+        self.__spill_file = spill_file
+        self.__segment_log = segment_log
+        self.__deduplicate = keep_settings.deduplicate
+        # instrument id -> levels of the last saved book
+        self.__saved_levels: dict[int, np.ndarray] = dict()
+
+        self.__records = 0
+        self.__suppressed = 0
+        self.__dropped = 0
+        self.__spilled = 0
+        self.__max_queue_depth = 0
 
-    def save_data(self, data: OrderBook, ticker: str = '') -> None:
+    async def save_data(self, data: BookSnapshot, ticker: str = '') -> None:
         try:
             logger.debug(f"Put data to db queue {str(data)}")
-            book = data
-            if book:
-                book = self.__flatten_order_book(data, ticker)
-            self.__data_queue.put_nowait(book)
+
+            if data is STOP_SIGNAL:
+                # Every trading day starts with full books
+                self.__saved_levels.clear()
+
+                if self.__segment_log:
+                    # Records of the trading day are replayed without waiting for max latency
+                    self.__segment_log.seal()
+
+                # Stop signal is never dropped
+                await self.__data_queue.put(STOP_SIGNAL)
+                return None
+
+            # Empty or one-sided books are saved too
+            if data is not None and not self.__is_duplicate(data):
+                await self.__put(self.__record_layout.record(data, ticker or self.__instrument_registry.ticker(data.figi)))
         except Exception as ex:
             logger.error(f"Error put data to db queue {repr(ex)}")
             logger.error(traceback.format_exc())
-            
-
-    def __flatten_order_book(self, order_book: OrderBook, ticker: str, depth:int = 10) -> tuple:
-        # Извлекаем цены и количества для bids
-        bid_prices = []
-        bid_quantities = []
-        for i, bid in enumerate(order_book.bids[:depth]):
-            bid_prices.append(float(quotation_to_decimal(bid.price)))
-            bid_quantities.append(bid.quantity)
-        
-        # Дополняем нулями, если стаканов меньше depth
-        while len(bid_prices) < depth:
-            bid_prices.append(0.0)
-            bid_quantities.append(0)
-        
-        # Извлекаем цены и количества для asks
-        ask_prices = []
-        ask_quantities = []
-        for i, ask in enumerate(order_book.asks[:depth]):
-            ask_prices.append(float(quotation_to_decimal(ask.price)))
-            ask_quantities.append(ask.quantity)
-        
-        # Дополняем нулями, если стаканов меньше depth
-        while len(ask_prices) < depth:
-            ask_prices.append(0.0)
-            ask_quantities.append(0)
-        
-        # Собираем все в один кортеж
-        return (
-            ticker,
-            order_book.time,
-            bid_prices[0],  # Распаковываем bid_price_1..bid_price_N
-            bid_quantities[0],  # Распаковываем bid_qty_1..bid_qty_N
-            ask_prices[0],  # Распаковываем ask_price_1..ask_price_N
-            ask_quantities[0]  # Распаковываем ask_qty_1..ask_qty_N
-            
-        )
\ No newline at end of file
+
+    def stats(self) -> dict:
+        return {
+            "records": self.__records,
+            "suppressed": self.__suppressed,
+            "dropped": self.__dropped,
+            "spilled": self.__spilled,
+            "queue_depth": self.__data_queue.qsize(),
+            "max_queue_depth": self.__max_queue_depth
+        }
+
+    def __is_duplicate(self, book: BookSnapshot) -> bool:
+        if not self.__deduplicate:
+            return False
+
+        levels = book.levels[:, :self.__record_layout.depth]
+        saved_levels = self.__saved_levels.get(book.instrument_id, None)
+
+        if saved_levels is not None and np.array_equal(levels, saved_levels):
+            self.__suppressed += 1
+            return True
+
+        # Copy, so the saved levels don't depend on the book
+        self.__saved_levels[book.instrument_id] = levels.copy()
+        return False
+
+    async def __put(self, record: tuple) -> None:
+        self.__records += 1
+
+        if self.__segment_log:
+            self.__segment_log.append(record)
+            return None
+
+        self.__max_queue_depth = max(self.__max_queue_depth, self.__data_queue.qsize())
+
+        if not self.__data_queue.full():
+            self.__data_queue.put_nowait(record)
+            return None
+
+        match self.__overflow_policy:
+            case "drop_oldest":
+                oldest = self.__data_queue.get_nowait()
+                self.__data_queue.task_done()
+                self.__dropped += 1
+
+                if oldest is STOP_SIGNAL:
+                    # Stop signal mustn't be lost or moved behind records of the next day
+                    self.__drop_oldest_record(record)
+                else:
+                    self.__data_queue.put_nowait(record)
+
+            case "spill":
+                self.__spill_file.append(record)
+                self.__spilled += 1
+
+            case _:
+                await self.__data_queue.put(record)
+
+    def __drop_oldest_record(self, record: tuple) -> None:
+        """
+        Drops the oldest record after stop signal at the head of the queue. Order of the queue is kept.
+        """
+        items = [STOP_SIGNAL]
+        while not self.__data_queue.empty():
+            items.append(self.__data_queue.get_nowait())
+            self.__data_queue.task_done()
+
+        oldest_record = next((i for i, x in enumerate(items) if x is not STOP_SIGNAL), None)
+        if oldest_record is not None:
+            del items[oldest_record]
+            items.append(record)
+
+        # Without records in the queue (only stop signals) the new record is dropped
+        for item in items:
+            self.__data_queue.put_nowait(item)
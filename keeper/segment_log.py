@@ -0,0 +1,201 @@
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from typing import Optional
+
+from keeper.book_records import BookRecordLayout
+
+__all__ = ("SegmentLog")
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".seg"
+# Segments with records rejected by database
+DEAD_LETTER_DIR = "dead_letter"
+# Record header: payload length and crc32 of payload. Zero length marks the end of segment data
+RECORD_HEADER = struct.Struct("<II")
+
+
+class SegmentLog:
+    """
+    Local append-only write-ahead log of keeper records.
+    Records are packed into fixed binary layout (BookRecordLayout.pack) and appended into preallocated memory-mapped
+    segment files, so data survives process crash and database outage without growing process memory.
+    The active segment is sealed when it's full (or by request), sealed segments are replayed into DB and removed.
+    Segments of previous run are sealed at start.
+    """
+    def __init__(self, log_dir: str, segment_size: int, record_layout: BookRecordLayout) -> None:
+        self.__log_dir = log_dir
+        self.__record_layout = record_layout
+        self.__segment_size = max(segment_size, mmap.PAGESIZE)
+
+        if log_dir and not os.path.exists(log_dir):
+            os.makedirs(log_dir)
+
+        self.__sealed: list[str] = sorted(
+            os.path.join(log_dir, x) for x in os.listdir(log_dir or ".") if x.endswith(SEGMENT_SUFFIX)
+        )
+        # Numbers of segments in dead letter directory aren't reused, so they are never overwritten
+        dead_letter_dir = os.path.join(log_dir, DEAD_LETTER_DIR)
+        dead_letters = [
+            x for x in os.listdir(dead_letter_dir) if x.endswith(SEGMENT_SUFFIX)
+        ] if os.path.isdir(dead_letter_dir) else []
+        self.__next_number = max(
+            (_segment_number(x) + 1 for x in self.__sealed + dead_letters if _is_segment_number(x)), default=0
+        )
+
+        self.__file_name = ""
+        self.__map: Optional[mmap.mmap] = None
+        self.__position = 0
+        self.__opened_at = 0.0
+
+        self.__records = 0
+        self.__bytes = 0
+        self.__segments = 0
+
+        if self.__sealed:
+            logger.info(f"Segments of write-ahead log from previous run: {len(self.__sealed)}")
+
+    def append(self, record: tuple) -> None:
+        payload = self.__record_layout.pack(record)
+        size = RECORD_HEADER.size + len(payload)
+
+        # The last header of segment must stay zero (end mark)
+        if self.__map and self.__position + size + RECORD_HEADER.size > self.__segment_size:
+            self.seal()
+
+        if not self.__map:
+            if size + RECORD_HEADER.size > self.__segment_size:
+                logger.error(f"Record is bigger than segment of write-ahead log: {size}")
+                return None
+
+            self.__open_segment()
+
+        RECORD_HEADER.pack_into(self.__map, self.__position, len(payload), zlib.crc32(payload))
+        self.__map[self.__position + RECORD_HEADER.size:self.__position + size] = payload
+        self.__position += size
+
+        self.__records += 1
+        self.__bytes += size
+
+    def seal(self) -> None:
+        """
+        Closes the active segment, so it can be replayed. The next record opens a new segment.
+        """
+        if not self.__map:
+            return None
+
+        self.__map.flush()
+        self.__map.close()
+        self.__map = None
+
+        self.__sealed.append(self.__file_name)
+        logger.debug(f"Segment has been sealed: {self.__file_name}, bytes: {self.__position}")
+
+    def active_age(self) -> float:
+        """
+        :return: Seconds since the active segment has been opened (0 without active segment)
+        """
+        return time.monotonic() - self.__opened_at if self.__map else 0.0
+
+    def sealed_segments(self) -> list[str]:
+        return list(self.__sealed)
+
+    def read_segment(self, file_name: str) -> list[tuple]:
+        """
+        :return: Records of the segment. Reading stops at the end mark or at the first broken record (crash).
+        """
+        records = []
+        with open(file_name, "rb") as segment_file:
+            if not os.fstat(segment_file.fileno()).st_size:
+                return records
+
+            # Only pages with records are read from preallocated file
+            data = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        position = 0
+        while position + RECORD_HEADER.size <= len(data):
+            length, crc = RECORD_HEADER.unpack_from(data, position)
+            if not length:
+                break
+
+            payload = data[position + RECORD_HEADER.size:position + RECORD_HEADER.size + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                logger.error(f"Broken record in segment {file_name} at {position}, the rest is skipped")
+                break
+
+            try:
+                records.append(self.__record_layout.unpack(payload))
+            except (struct.error, UnicodeDecodeError) as ex:
+                # e.g. the segment has been written with another depth or layout
+                logger.error(f"Record in segment {file_name} at {position} can't be unpacked, the rest is skipped: "
+                             f"{repr(ex)}")
+                break
+
+            position += RECORD_HEADER.size + length
+
+        data.close()
+        return records
+
+    def remove_segment(self, file_name: str) -> None:
+        """
+        Removes sealed segment after its records have been committed
+        """
+        self.__sealed.remove(file_name)
+        os.remove(file_name)
+
+    def move_to_dead_letter(self, file_name: str) -> None:
+        """
+        Moves sealed segment with rejected records into dead letter directory (it isn't replayed any more)
+        """
+        dead_letter_dir = os.path.join(self.__log_dir, DEAD_LETTER_DIR)
+        os.makedirs(dead_letter_dir, exist_ok=True)
+
+        self.__sealed.remove(file_name)
+
+        # Dead letter segment with the same name (e.g. of a log directory restored from backup) is kept
+        base_name = os.path.basename(file_name)[:-len(SEGMENT_SUFFIX)]
+        dead_letter_name = os.path.join(dead_letter_dir, base_name + SEGMENT_SUFFIX)
+        duplicate = 0
+        while os.path.exists(dead_letter_name):
+            duplicate += 1
+            dead_letter_name = os.path.join(dead_letter_dir, f"{base_name}-{duplicate}{SEGMENT_SUFFIX}")
+
+        os.rename(file_name, dead_letter_name)
+
+        logger.error(f"Segment has been moved into dead letter directory: {file_name}")
+
+    def close(self) -> None:
+        self.seal()
+
+    def stats(self) -> dict:
+        return {
+            "records": self.__records,
+            "bytes": self.__bytes,
+            "segments": self.__segments,
+            "sealed_segments": len(self.__sealed)
+        }
+
+    def __open_segment(self) -> None:
+        self.__file_name = os.path.join(self.__log_dir, f"{self.__next_number:012d}{SEGMENT_SUFFIX}")
+        self.__next_number += 1
+
+        with open(self.__file_name, "w+b") as segment_file:
+            # Preallocated file is filled by zeros, so unwritten tail is read as the end mark
+            segment_file.truncate(self.__segment_size)
+            self.__map = mmap.mmap(segment_file.fileno(), self.__segment_size)
+
+        self.__position = 0
+        self.__opened_at = time.monotonic()
+        self.__segments += 1
+
+
+def _segment_number(file_name: str) -> int:
+    return int(os.path.basename(file_name)[:-len(SEGMENT_SUFFIX)])
+
+
+def _is_segment_number(file_name: str) -> bool:
+    return os.path.basename(file_name)[:-len(SEGMENT_SUFFIX)].isdigit()
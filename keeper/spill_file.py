@@ -0,0 +1,182 @@
+import logging
+import os
+import pickle
+import struct
+from typing import Optional, BinaryIO
+
+__all__ = ("SpillFile")
+
+logger = logging.getLogger(__name__)
+
+DRAIN_SUFFIX = ".drain"
+# Chunks with records rejected by database
+DEAD_LETTER_DIR = "dead_letter"
+# File header: offset of the first record which hasn't been committed yet
+HEADER = struct.Struct("<Q")
+
+
+class SpillFile:
+    """
+    Local file for records which don't fit into full data queue.
+    Keeper appends records, KeepWorker reads them back by chunks when the database catches up.
+    Before reading the file is renamed (new records go to a new file), a chunk stays in the file until it's committed,
+    so records survive database errors and restarts. The file is removed after its last chunk is committed.
+    """
+    def __init__(self, spill_dir: str) -> None:
+        self.__file_name = os.path.join(spill_dir, "order_book.spill")
+        self.__dead_letter_dir = os.path.join(spill_dir, DEAD_LETTER_DIR)
+        self.__drain_file_name = self.__file_name + DRAIN_SUFFIX
+        self.__file: Optional[BinaryIO] = None
+        self.__drain_file: Optional[BinaryIO] = None
+        # End offset and size of the read chunk which waits for commit
+        self.__chunk_end = 0
+        self.__chunk_size = 0
+        self.__chunk_is_last = False
+        self.__pending = 0
+
+        if spill_dir and not os.path.exists(spill_dir):
+            os.makedirs(spill_dir)
+
+        # Records of previous run
+        for file_name in (self.__drain_file_name, self.__file_name):
+            if os.path.exists(file_name):
+                self.__pending += _count_records(file_name)
+
+        if self.__pending:
+            logger.info(f"Spilled records from previous run: {self.__pending}")
+
+    @property
+    def pending(self) -> int:
+        """
+        :return: Count of records in the files which haven't been committed
+        """
+        return self.__pending
+
+    def append(self, record: tuple) -> None:
+        if not self.__file:
+            self.__file = open(self.__file_name, "ab")
+            if not self.__file.tell():
+                self.__file.write(HEADER.pack(HEADER.size))
+
+        pickle.dump(record, self.__file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.__pending += 1
+
+    def read_chunk(self, max_records: int) -> list[tuple]:
+        """
+        :return: The next records (up to max_records). The same records are returned until commit_chunk().
+        Empty list if all records have been committed.
+        """
+        if not self.__drain_file and not self.__open_drain_file():
+            return []
+
+        self.__drain_file.seek(self.__committed_offset())
+
+        records = []
+        self.__chunk_is_last = False
+        try:
+            while len(records) < max_records:
+                records.append(pickle.load(self.__drain_file))
+        except EOFError:
+            self.__chunk_is_last = True
+        except Exception as ex:
+            # The last record may be incomplete after crash
+            logger.error(f"Read spill file error, the rest of file is skipped: {repr(ex)}")
+            self.__chunk_is_last = True
+
+        self.__chunk_end = self.__drain_file.tell()
+        self.__chunk_size = len(records)
+
+        if not records:
+            self.__remove_drain_file()
+            return self.read_chunk(max_records)
+
+        return records
+
+    def commit_chunk(self) -> None:
+        """
+        Marks records of the last read chunk as saved. The file is removed after its last chunk.
+        """
+        if not self.__drain_file:
+            return None
+
+        self.__pending = max(0, self.__pending - self.__chunk_size)
+        self.__chunk_size = 0
+
+        if self.__chunk_is_last:
+            self.__remove_drain_file()
+            return None
+
+        self.__drain_file.seek(0)
+        self.__drain_file.write(HEADER.pack(self.__chunk_end))
+        self.__drain_file.flush()
+
+    def move_chunk_to_dead_letter(self, records: list[tuple]) -> None:
+        """
+        Appends rejected records of the last read chunk into dead letter file and commits the chunk
+        """
+        os.makedirs(self.__dead_letter_dir, exist_ok=True)
+
+        with open(os.path.join(self.__dead_letter_dir, os.path.basename(self.__file_name)), "ab") as dead_letter_file:
+            for record in records:
+                pickle.dump(record, dead_letter_file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        logger.error(f"Spilled records have been moved into dead letter file: {len(records)}")
+        self.commit_chunk()
+
+    def close(self) -> None:
+        for spill_file in (self.__file, self.__drain_file):
+            if spill_file:
+                spill_file.close()
+
+        self.__file = None
+        self.__drain_file = None
+
+    def __open_drain_file(self) -> bool:
+        if not os.path.exists(self.__drain_file_name):
+            if not os.path.exists(self.__file_name):
+                return False
+
+            # New records are appended into a new file while this one is drained
+            if self.__file:
+                self.__file.close()
+                self.__file = None
+            os.replace(self.__file_name, self.__drain_file_name)
+
+        self.__drain_file = open(self.__drain_file_name, "r+b")
+        return True
+
+    def __committed_offset(self) -> int:
+        self.__drain_file.seek(0)
+        header = self.__drain_file.read(HEADER.size)
+
+        return HEADER.unpack(header)[0] if len(header) == HEADER.size else HEADER.size
+
+    def __remove_drain_file(self) -> None:
+        self.__drain_file.close()
+        self.__drain_file = None
+        os.remove(self.__drain_file_name)
+
+        logger.info("Spill file has been drained")
+
+
+def _count_records(file_name: str) -> int:
+    """
+    :return: Count of records after the committed offset (records are read one by one, not kept in memory)
+    """
+    count = 0
+    with open(file_name, "rb") as spill_file:
+        header = spill_file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return count
+
+        spill_file.seek(HEADER.unpack(header)[0])
+        try:
+            while True:
+                pickle.load(spill_file)
+                count += 1
+        except EOFError:
+            pass
+        except Exception as ex:
+            logger.error(f"Read spill file error: {repr(ex)}")
+
+    return count
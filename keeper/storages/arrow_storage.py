@@ -0,0 +1,19 @@
+import pyarrow as pa
+
+from keeper.storages.file_storage import FileStorage
+
+__all__ = ("ArrowStorage")
+
+
+class ArrowStorage(FileStorage):
+    """
+    Uncompressed Arrow IPC files. A file is memory-mapped on read and columns are used without parsing or copy.
+    """
+    FILE_EXTENSION = ".arrow"
+
+    @classmethod
+    def _read_table(cls, file_name: str) -> pa.Table:
+        return pa.ipc.open_file(pa.memory_map(file_name)).read_all()
+
+    def _new_writer(self, file_name: str) -> pa.ipc.RecordBatchFileWriter:
+        return pa.ipc.new_file(file_name, self.schema)
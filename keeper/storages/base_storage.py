@@ -0,0 +1,41 @@
+import abc
+
+__all__ = ("IStorage")
+
+
+class IStorage(abc.ABC):
+    """
+    Storage of order book rows (tuples of BookRecordLayout) used by KeepWorker.
+    save_batch is called by several writers concurrently.
+    """
+    @abc.abstractmethod
+    async def open(self) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def save_batch(self, batch: list[tuple]) -> None:
+        pass
+
+    @abc.abstractmethod
+    def is_retryable(self, ex: Exception) -> bool:
+        """
+        :return: True if the batch can be saved by the next attempt (e.g. connection error)
+        """
+        pass
+
+    def is_durable_on_save(self) -> bool:
+        """
+        :return: True if a batch is durable when save_batch returns, otherwise saved rows are durable after sync
+        """
+        return True
+
+    @abc.abstractmethod
+    async def sync(self) -> None:
+        """
+        Makes saved rows durable and readable (e.g. at the end of trading day)
+        """
+        pass
+
+    @abc.abstractmethod
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,180 @@
+import abc
+import asyncio
+import datetime
+import logging
+import os
+
+import numpy as np
+import pyarrow as pa
+
+from configuration.settings import KeepSettings
+from keeper.book_records import BookLayout, BookRecordLayout
+from keeper.storages.base_storage import IStorage
+
+__all__ = ("FileStorage")
+
+logger = logging.getLogger(__name__)
+
+
+class FileStorage(IStorage):
+    """
+    Rows are saved into columnar files partitioned by ticker and day: <storage_dir>/<ticker>/<YYYY-MM-DD>/part-N.
+    Every saved batch is appended into the open part of its ticker and day as a new row group (record batch).
+    The part is written into a temporary file and renamed when it's finished: by size, by sync (end of trading day)
+    or by close. Saved rows are durable and readable after sync, parts being written are never read.
+    Partitions are locked separately, so concurrent writers (and partitions of one batch) are written in parallel threads.
+    """
+    FILE_EXTENSION = ""
+    TEMP_EXTENSION = ".tmp"
+    # The part is finished when it has this count of rows
+    MAX_PART_ROWS = 1_000_000
+
+    def __init__(self, keep_settings: KeepSettings, record_layout: BookRecordLayout) -> None:
+        self.__storage_dir = keep_settings.storage_dir
+        self.__schema = _schema(record_layout)
+
+        # (ticker, day) -> opened part
+        self.__parts: dict[tuple[str, datetime.date], _Part] = dict()
+        # Writers of pyarrow aren't thread-safe, a part is written by one thread at time
+        self.__locks: dict[tuple[str, datetime.date], asyncio.Lock] = dict()
+
+    @property
+    def schema(self) -> pa.Schema:
+        return self.__schema
+
+    async def open(self) -> None:
+        if not os.path.exists(self.__storage_dir):
+            os.makedirs(self.__storage_dir)
+
+    async def save_batch(self, batch: list[tuple]) -> None:
+        partitions: dict[tuple[str, datetime.date], list[tuple]] = dict()
+        for row in batch:
+            partitions.setdefault((row[0], row[1].date()), []).append(row)
+
+        await asyncio.gather(*(self.__save_partition(partition, rows) for partition, rows in partitions.items()))
+
+    def is_retryable(self, ex: Exception) -> bool:
+        # e.g. the disk is full
+        return isinstance(ex, OSError)
+
+    def is_durable_on_save(self) -> bool:
+        return False
+
+    async def sync(self) -> None:
+        # Locks aren't removed: a writer may wait for the lock of the partition
+        for partition, lock in list(self.__locks.items()):
+            async with lock:
+                part = self.__parts.pop(partition, None)
+                if part:
+                    await asyncio.to_thread(part.finish)
+
+    async def close(self) -> None:
+        await self.sync()
+
+    @classmethod
+    def read_ticker_day(cls, storage_dir: str, ticker: str, day: datetime.date) -> dict[str, np.ndarray]:
+        """
+        Reads all finished parts of the ticker and day (rows of the open part are readable after sync).
+        :return: Columns as NumPy arrays (datetime64 for datetime, 2d arrays for array layout). Ticker isn't returned.
+        """
+        day_dir = os.path.join(storage_dir, ticker, day.isoformat())
+        if not os.path.exists(day_dir):
+            return dict()
+
+        tables = [
+            cls._read_table(os.path.join(day_dir, file_name))
+            for file_name in sorted(os.listdir(day_dir)) if file_name.endswith(cls.FILE_EXTENSION)
+        ]
+        if not tables:
+            return dict()
+
+        table = pa.concat_tables(tables).combine_chunks() if len(tables) > 1 else tables[0]
+
+        columns = dict()
+        for name in table.column_names[1:]:
+            column = table.column(name)
+            if pa.types.is_list(column.type):
+                values = column.combine_chunks()
+                columns[name] = values.flatten().to_numpy().reshape(len(values), -1)
+            else:
+                columns[name] = column.to_numpy()
+
+        return columns
+
+    @classmethod
+    @abc.abstractmethod
+    def _read_table(cls, file_name: str) -> pa.Table:
+        pass
+
+    @abc.abstractmethod
+    def _new_writer(self, file_name: str):
+        pass
+
+    async def __save_partition(self, partition: tuple[str, datetime.date], rows: list[tuple]) -> None:
+        lock = self.__locks.setdefault(partition, asyncio.Lock())
+        async with lock:
+            # Encoding and writing don't block the event loop
+            await asyncio.to_thread(self.__write_partition, partition, rows)
+
+    def __write_partition(self, partition: tuple[str, datetime.date], rows: list[tuple]) -> None:
+        part = self.__parts.get(partition, None)
+        if not part:
+            file_name = self.__new_file_name(*partition)
+            part = _Part(self._new_writer(file_name + self.TEMP_EXTENSION), file_name)
+            self.__parts[partition] = part
+
+        part.write(self.__table(rows))
+
+        if part.rows >= self.MAX_PART_ROWS:
+            del self.__parts[partition]
+            part.finish()
+
+    def __table(self, rows: list[tuple]) -> pa.Table:
+        return pa.Table.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(zip(*rows), self.__schema)],
+            schema=self.__schema
+        )
+
+    def __new_file_name(self, ticker: str, day: datetime.date) -> str:
+        day_dir = os.path.join(self.__storage_dir, ticker, day.isoformat())
+        if not os.path.exists(day_dir):
+            os.makedirs(day_dir)
+
+        # Files of previous runs of the day (and unfinished parts of crashed run) are kept
+        part = len([x for x in os.listdir(day_dir) if x.startswith("part-")])
+        return os.path.join(day_dir, f"part-{part:06d}{self.FILE_EXTENSION}")
+
+
+class _Part:
+    """
+    Part being written into temporary file, it's renamed to the file name when it's finished
+    """
+    def __init__(self, writer, file_name: str) -> None:
+        self.__writer = writer
+        self.__file_name = file_name
+        self.rows = 0
+
+    def write(self, table: pa.Table) -> None:
+        self.__writer.write_table(table)
+        self.rows += table.num_rows
+
+    def finish(self) -> None:
+        self.__writer.close()
+        os.replace(self.__file_name + FileStorage.TEMP_EXTENSION, self.__file_name)
+
+
+def _schema(record_layout: BookRecordLayout) -> pa.Schema:
+    fields = [
+        # Ticker is the same for all rows of a file, dictionary keeps it once
+        pa.field("ticker", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("datetime", pa.timestamp("us", tz="UTC"))
+    ]
+
+    for column in record_layout.columns()[2:]:
+        value_type = pa.float64() if "price" in column else pa.int64()
+        if record_layout.layout == BookLayout.ARRAY:
+            value_type = pa.list_(value_type)
+
+        fields.append(pa.field(column, value_type))
+
+    return pa.schema(fields)
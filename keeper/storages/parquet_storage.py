@@ -0,0 +1,34 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from keeper.storages.file_storage import FileStorage
+
+__all__ = ("ParquetStorage")
+
+
+class ParquetStorage(FileStorage):
+    """
+    Parquet files: dictionary encoding for ticker, delta encoding for time and quantities,
+    byte stream split for prices (compressed well, decoded on read).
+    """
+    FILE_EXTENSION = ".parquet"
+
+    @classmethod
+    def _read_table(cls, file_name: str) -> pa.Table:
+        return pq.read_table(file_name, memory_map=True)
+
+    def _new_writer(self, file_name: str) -> pq.ParquetWriter:
+        column_encoding = dict()
+        for field in self.schema:
+            if pa.types.is_timestamp(field.type) or pa.types.is_int64(field.type):
+                column_encoding[field.name] = "DELTA_BINARY_PACKED"
+            elif pa.types.is_float64(field.type):
+                column_encoding[field.name] = "BYTE_STREAM_SPLIT"
+
+        return pq.ParquetWriter(
+            file_name,
+            self.schema,
+            use_dictionary=["ticker"],
+            column_encoding=column_encoding,
+            compression="zstd"
+        )
@@ -0,0 +1,221 @@
+import asyncio
+import datetime
+import logging
+from typing import Optional
+
+import asyncpg
+
+from configuration.settings import KeepSettings
+from keeper.book_records import BookRecordLayout
+from keeper.storages.base_storage import IStorage
+
+__all__ = ("PostgresStorage")
+
+logger = logging.getLogger(__name__)
+
+# Errors of connection or database availability, the batch is saved again after reconnect
+TRANSIENT_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.OperatorInterventionError,
+    asyncpg.InsufficientResourcesError
+)
+
+
+class PostgresStorage(IStorage):
+    """
+    Rows are saved into PostgreSQL table by binary COPY on connections of pool (connection per writer).
+    With partitions the table has to be partitioned by range of datetime. Partitions for trading days
+    (UTC dates) are created ahead, partitions older than retention are detached (they can be archived or dropped).
+    Day partitions can be sub-partitioned by hash of ticker.
+    """
+    def __init__(self, keep_settings: KeepSettings, record_layout: BookRecordLayout) -> None:
+        self.__conn_string = keep_settings.conn_string
+        # Table name may be qualified by schema (schema.table), partitions are created in the same schema
+        self.__schema_name, _, self.__table_name = keep_settings.table_name.rpartition(".")
+        self.__writers = max(1, keep_settings.writers)
+        self.__columns = record_layout.columns()
+
+        self.__partitions = keep_settings.partitions
+        self.__partitions_ahead = keep_settings.partitions_ahead
+        self.__retention_days = keep_settings.partitions_retention_days
+        self.__ticker_partitions = keep_settings.ticker_partitions
+
+        self.__pool: Optional[asyncpg.Pool] = None
+        # Days with ready partitions
+        self.__partition_days: set[datetime.date] = set()
+        # Partitions detached by this process for maintenance, only they are attached back
+        self.__detached_partitions: set[str] = set()
+        self.__partitions_lock = asyncio.Lock()
+
+    async def open(self) -> None:
+        # Connections are opened by writers on demand, so unavailable database doesn't stop the worker
+        self.__pool = await asyncpg.create_pool(self.__conn_string, min_size=0, max_size=self.__writers)
+
+        if self.__partitions:
+            try:
+                await self.__maintain_partitions()
+            except Exception as ex:
+                # Partitions are created again before the first batch
+                logger.error(f"Partitions maintenance error: {repr(ex)}")
+
+    async def save_batch(self, batch: list[tuple]) -> None:
+        if self.__partitions:
+            batch = self.__skip_expired_rows(batch)
+            if not batch:
+                return None
+
+            await self.__prepare_partitions({row[1].date() for row in batch})
+
+        # Broken connection is closed by the pool and a new one is opened on the next acquire
+        async with self.__pool.acquire() as conn:
+            # asyncpg sends records in binary COPY format
+            await conn.copy_records_to_table(
+                self.__table_name,
+                records=batch,
+                columns=self.__columns,
+                schema_name=self.__schema_name or None
+            )
+
+    def is_retryable(self, ex: Exception) -> bool:
+        return isinstance(ex, TRANSIENT_ERRORS)
+
+    async def sync(self) -> None:
+        # Every COPY is committed by itself. Partitions for the next trading days are created before the session
+        if self.__partitions:
+            async with self.__partitions_lock:
+                await self.__maintain_partitions()
+
+    async def close(self) -> None:
+        if self.__pool:
+            await self.__pool.close()
+            self.__pool = None
+
+    async def __prepare_partitions(self, days: set[datetime.date]) -> None:
+        """
+        Creates partitions for days of the batch (e.g. a day after midnight or replay of old segments)
+        """
+        if days <= self.__partition_days:
+            return None
+
+        async with self.__partitions_lock:
+            if datetime.datetime.now(datetime.timezone.utc).date() not in self.__partition_days:
+                await self.__maintain_partitions()
+
+            for day in days - self.__partition_days:
+                async with self.__pool.acquire() as conn:
+                    if await self.__create_partition(conn, day):
+                        self.__partition_days.add(day)
+
+    async def __maintain_partitions(self) -> None:
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+
+        async with self.__pool.acquire() as conn:
+            for day in (today + datetime.timedelta(days=x) for x in range(self.__partitions_ahead + 1)):
+                if await self.__create_partition(conn, day):
+                    self.__partition_days.add(day)
+
+            if self.__retention_days:
+                await self.__detach_partitions(conn, today - datetime.timedelta(days=self.__retention_days))
+
+    def __skip_expired_rows(self, batch: list[tuple]) -> list[tuple]:
+        """
+        Rows older than retention (e.g. replay of old spill file or segments) don't bring detached partitions back
+        """
+        if not self.__retention_days:
+            return batch
+
+        horizon = datetime.datetime.now(datetime.timezone.utc).date() \
+            - datetime.timedelta(days=self.__retention_days)
+        rows = [row for row in batch if row[1].date() >= horizon]
+
+        if len(rows) < len(batch):
+            logger.warning(f"Skip {len(batch) - len(rows)} rows older than retention ({horizon})")
+
+        return rows
+
+    async def __create_partition(self, conn: asyncpg.Connection, day: datetime.date) -> bool:
+        """
+        :return: True if the partition is attached to the table
+        """
+        name = self.__partition_name(day)
+        attached = await self.__attached_partitions(conn)
+
+        if name in attached:
+            return True
+
+        bounds = f"FOR VALUES FROM ('{day.isoformat()} 00:00:00+00') " \
+                 f"TO ('{(day + datetime.timedelta(days=1)).isoformat()} 00:00:00+00')"
+
+        if await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", self.__quote(name)):
+            if name not in self.__detached_partitions:
+                # The table was detached by retention of another run or by hand, rows of the day are rejected
+                logger.error(f"Table {name} exists but isn't attached, it isn't attached back")
+                return False
+
+            logger.info(f"Attach partition {name}")
+            await conn.execute(
+                f"ALTER TABLE {self.__quote(self.__table_name)} ATTACH PARTITION {self.__quote(name)} {bounds}"
+            )
+            self.__detached_partitions.discard(name)
+            return True
+
+        logger.info(f"Create partition {name}")
+        async with conn.transaction():
+            sub_partitions = " PARTITION BY HASH (ticker)" if self.__ticker_partitions else ""
+            await conn.execute(
+                f"CREATE TABLE {self.__quote(name)} PARTITION OF {self.__quote(self.__table_name)} "
+                f"{bounds}{sub_partitions}"
+            )
+
+            for remainder in range(self.__ticker_partitions):
+                await conn.execute(
+                    f"CREATE TABLE {self.__quote(f'{name}_{remainder}')} PARTITION OF {self.__quote(name)} "
+                    f"FOR VALUES WITH (MODULUS {self.__ticker_partitions}, REMAINDER {remainder})"
+                )
+
+        return True
+
+    async def __detach_partitions(self, conn: asyncpg.Connection, before_day: datetime.date) -> None:
+        for name in await self.__attached_partitions(conn):
+            day = self.__partition_day(name)
+
+            if day and day < before_day:
+                logger.info(f"Detach partition {name}")
+                await conn.execute(
+                    f"ALTER TABLE {self.__quote(self.__table_name)} DETACH PARTITION {self.__quote(name)}"
+                )
+                self.__partition_days.discard(day)
+                self.__detached_partitions.add(name)
+
+    async def __attached_partitions(self, conn: asyncpg.Connection) -> set[str]:
+        rows = await conn.fetch(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass($1)",
+            self.__quote(self.__table_name)
+        )
+        return {row["relname"] for row in rows}
+
+    def __quote(self, name: str) -> str:
+        """
+        :return: Quoted name of table qualified by schema of the order book table
+        """
+        return _quote(f"{self.__schema_name}.{name}" if self.__schema_name else name)
+
+    def __partition_name(self, day: datetime.date) -> str:
+        return f"{self.__table_name}_{day:%Y%m%d}"
+
+    def __partition_day(self, name: str) -> Optional[datetime.date]:
+        try:
+            return datetime.datetime.strptime(name[len(self.__table_name) + 1:], "%Y%m%d").date()
+        except ValueError:
+            return None
+
+
+def _quote(identifier: str) -> str:
+    """
+    :return: Quoted identifier, every part of qualified name (schema.table) is quoted separately
+    """
+    return ".".join('"' + part.replace('"', '""') + '"' for part in identifier.split("."))
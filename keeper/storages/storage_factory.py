@@ -0,0 +1,28 @@
+from typing import Optional
+
+from configuration.settings import KeepSettings
+from keeper.book_records import BookRecordLayout
+from keeper.storages.base_storage import IStorage
+
+__all__ = ("StorageFactory")
+
+
+class StorageFactory:
+    """
+    Fabric for storages of keeper. Put here new storage.
+    Storages are imported on demand, so only dependencies of the configured storage are required.
+    """
+    @staticmethod
+    def new_factory(storage_name: str, keep_settings: KeepSettings, record_layout: BookRecordLayout) -> Optional[IStorage]:
+        match storage_name:
+            case "postgres":
+                from keeper.storages.postgres_storage import PostgresStorage
+                return PostgresStorage(keep_settings, record_layout)
+            case "parquet":
+                from keeper.storages.parquet_storage import ParquetStorage
+                return ParquetStorage(keep_settings, record_layout)
+            case "arrow":
+                from keeper.storages.arrow_storage import ArrowStorage
+                return ArrowStorage(keep_settings, record_layout)
+            case _:
+                return None
@@ -7,19 +7,24 @@ from logging.handlers import RotatingFileHandler
 from blog.blog_worker import BlogWorker
 from blog.blogger import Blogger
 
+from keeper.book_records import BookRecordLayout
 from keeper.keep_worker import KeepWorker
 from keeper.keeper import Keeper
+from keeper.segment_log import SegmentLog
+from keeper.spill_file import SpillFile
 
 from configuration.configuration import ProgramConfiguration
-from invest_api.services.accounts_service import AccountService
-from invest_api.services.client_service import ClientService
-from invest_api.services.instruments_service import InstrumentService
-from invest_api.services.market_data_service import MarketDataService
-from invest_api.services.operations_service import OperationService
-from invest_api.services.orders_service import OrderService
+from invest_api.instrument_registry import InstrumentRegistry
+from invest_api.services.accounts_service import AccountService, AsyncAccountService
+from invest_api.services.client_service import AsyncClientService
+from invest_api.services.instruments_service import AsyncInstrumentService
+from invest_api.services.market_data_service import AsyncMarketDataService
+from invest_api.services.operations_service import AsyncOperationService
+from invest_api.services.orders_service import AsyncOrderService
 from invest_api.services.market_data_stream_service import MarketDataStreamService
 from trade_system.strategies.strategy_factory import StrategyFactory
 from trading.trade_service import TradeService
+from trading.universe_builder import UniverseBuilder
 
 # the configuration file name
 CONFIG_FILE = "conf/settings.ini"
@@ -67,12 +72,16 @@ if __name__ == "__main__":
         logger.critical("Load configuration error: %s", repr(ex))
     else:
         account_service = AccountService(config.tinkoff_token, config.tinkoff_app_name)
-        client_service = ClientService(config.tinkoff_token, config.tinkoff_app_name)
-        instrument_service = InstrumentService(config.tinkoff_token, config.tinkoff_app_name)
-        operation_service = OperationService(config.tinkoff_token, config.tinkoff_app_name)
-        order_service = OrderService(config.tinkoff_token, config.tinkoff_app_name)
-        stream_service = MarketDataStreamService(config.tinkoff_token, config.tinkoff_app_name)
-        market_data_service = MarketDataService(config.tinkoff_token, config.tinkoff_app_name)
+        # Trading works in asyncio loop, so async versions of services are used to avoid blocking the loop
+        async_account_service = AsyncAccountService(config.tinkoff_token, config.tinkoff_app_name)
+        client_service = AsyncClientService(config.tinkoff_token, config.tinkoff_app_name)
+        instrument_service = AsyncInstrumentService(config.tinkoff_token, config.tinkoff_app_name)
+        operation_service = AsyncOperationService(config.tinkoff_token, config.tinkoff_app_name)
+        order_service = AsyncOrderService(config.tinkoff_token, config.tinkoff_app_name)
+        stream_service = MarketDataStreamService(
+            config.tinkoff_token, config.tinkoff_app_name, config.stream_settings
+        )
+        market_data_service = AsyncMarketDataService(config.tinkoff_token, config.tinkoff_app_name)
 
         if account_service.verify_token():
             logger.info(f"Blog settings: {config.blog_settings}")
@@ -80,30 +89,48 @@ if __name__ == "__main__":
             trade_strategies = \
                 [StrategyFactory.new_factory(x.name, x) for x in config.trade_strategy_settings]
 
+            # Instruments settings cache is shared by trading, blog and keeper
+            instrument_registry = InstrumentRegistry(instrument_service, config.registry_settings)
+
             # Queue to keep messages for TG. TradeService(via Blogger) produce, BlogWorker consume (send)
             messages_queue = asyncio.Queue()
 
             # Queue to keep marketdata to DB. TradeService (via Kepper) produce, KeepWorker consume (save)
-            data_queue = asyncio.Queue()
+            data_queue = asyncio.Queue(maxsize=config.keep_settings.queue_size)
+            # Rows which don't fit into full data queue (overflow policy "spill")
+            spill_file = SpillFile(config.keep_settings.spill_dir)
+            # Local write-ahead log, KeepWorker replays it into DB
+            segment_log = SegmentLog(
+                config.keep_settings.wal_dir,
+                config.keep_settings.wal_segment_size_mb * 1024 * 1024,
+                BookRecordLayout(config.keep_settings.depth, config.keep_settings.layout)
+            ) if config.keep_settings.write_ahead_log else None
 
             blog_worker = BlogWorker(config.blog_settings, messages_queue)
-            keep_worker = KeepWorker(config.keep_settings, data_queue)
+            keep_worker = KeepWorker(config.keep_settings, data_queue, spill_file, segment_log)
             trade_service = TradeService(
-                account_service=account_service,
+                account_service=async_account_service,
                 client_service=client_service,
                 instrument_service=instrument_service,
                 operation_service=operation_service,
                 order_service=order_service,
                 stream_service=stream_service,
                 market_data_service=market_data_service,
-                blogger=Blogger(config.blog_settings, config.trade_strategy_settings, messages_queue),
-                keeper=Keeper(data_queue),
+                blogger=Blogger(
+                    config.blog_settings, config.trade_strategy_settings, messages_queue, instrument_registry
+                ),
+                keeper=Keeper(config.keep_settings, data_queue, instrument_registry, spill_file, segment_log),
+                instrument_registry=instrument_registry,
+                universe_builder=UniverseBuilder(instrument_registry, config.universe_settings),
                 account_settings=config.account_settings,
                 trading_settings=config.trading_settings,
                 strategies=trade_strategies
             )
 
-            asyncio.run(start_asyncio_trading(blog_worker, keep_worker, trade_service))
+            try:
+                asyncio.run(start_asyncio_trading(blog_worker, keep_worker, trade_service))
+            finally:
+                stream_service.close()
 
         else:
             logger.critical("Client verification has been failed")
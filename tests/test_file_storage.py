@@ -0,0 +1,86 @@
+import asyncio
+import datetime
+
+import pytest
+
+from configuration.settings import KeepSettings
+from keeper.book_records import BookRecordLayout
+from keeper.storages.arrow_storage import ArrowStorage
+from keeper.storages.parquet_storage import ParquetStorage
+
+DAY = datetime.date(2026, 10, 16)
+
+
+def _batch(ticker: str, start: int, count: int) -> list[tuple]:
+    start_time = datetime.datetime(2026, 10, 16, 7, tzinfo=datetime.timezone.utc)
+    return [
+        (ticker, start_time + datetime.timedelta(seconds=start + x), 100.0 + x, 10, 100.5 + x, 20)
+        for x in range(count)
+    ]
+
+
+@pytest.mark.parametrize("storage_class", [ParquetStorage, ArrowStorage])
+def test_concurrent_writers(tmp_path, storage_class):
+    async def run():
+        storage = storage_class(KeepSettings(conn_string="", storage_dir=str(tmp_path)), BookRecordLayout(1, "wide"))
+        await storage.open()
+        # Batches of the same ticker are appended in order, batches of different tickers are written in parallel
+        await asyncio.gather(*(
+            storage.save_batch(_batch("AAA", x * 10, 10) + _batch(f"B{x % 2}", x * 10, 10)) for x in range(6)
+        ))
+        await storage.close()
+
+    asyncio.run(run())
+
+    aaa = storage_class.read_ticker_day(str(tmp_path), "AAA", DAY)
+    assert len(aaa["datetime"]) == 60
+    assert (aaa["datetime"][1:] > aaa["datetime"][:-1]).all()
+
+    for ticker in ("B0", "B1"):
+        assert len(storage_class.read_ticker_day(str(tmp_path), ticker, DAY)["datetime"]) == 30
+
+
+@pytest.mark.parametrize("storage_class", [ParquetStorage, ArrowStorage])
+def test_batches_are_appended_into_one_part(tmp_path, storage_class):
+    storage = storage_class(KeepSettings(conn_string="", storage_dir=str(tmp_path)), BookRecordLayout(1, "wide"))
+    day_dir = tmp_path / "AAA" / DAY.isoformat()
+
+    async def run():
+        await storage.open()
+        for start in range(0, 50, 10):
+            await storage.save_batch(_batch("AAA", start, 10))
+
+        # The open part isn't read
+        assert storage_class.read_ticker_day(str(tmp_path), "AAA", DAY) == dict()
+
+        await storage.sync()
+
+        assert [x.name for x in day_dir.iterdir()] == [f"part-000000{storage_class.FILE_EXTENSION}"]
+        aaa = storage_class.read_ticker_day(str(tmp_path), "AAA", DAY)
+        assert len(aaa["datetime"]) == 50
+        assert aaa["bid_price_1"].tolist() == [100.0 + x % 10 for x in range(50)]
+
+        # The next batch after sync starts a new part
+        await storage.save_batch(_batch("AAA", 50, 10))
+        await storage.close()
+
+    asyncio.run(run())
+
+    assert len(list(day_dir.iterdir())) == 2
+    assert len(storage_class.read_ticker_day(str(tmp_path), "AAA", DAY)["datetime"]) == 60
+
+
+@pytest.mark.parametrize("storage_class", [ParquetStorage, ArrowStorage])
+def test_part_is_finished_by_size(tmp_path, storage_class, monkeypatch):
+    monkeypatch.setattr(storage_class, "MAX_PART_ROWS", 20)
+    storage = storage_class(KeepSettings(conn_string="", storage_dir=str(tmp_path)), BookRecordLayout(1, "wide"))
+
+    async def run():
+        await storage.open()
+        for start in range(0, 50, 10):
+            await storage.save_batch(_batch("AAA", start, 10))
+
+    asyncio.run(run())
+
+    # Two finished parts, the last batch is in the open part
+    assert len(storage_class.read_ticker_day(str(tmp_path), "AAA", DAY)["datetime"]) == 40
@@ -0,0 +1,70 @@
+import numpy as np
+
+from backtest.book_arrays import BookArrays
+from backtest.get_book_backtest import GetBookBacktest
+from configuration.settings import StrategySettings
+from trade_system.strategies.get_book_strategy import GetBookStrategy
+
+FUTURE_FIGI = "FUTURE_FIGI"
+BASIC_FIGI = "BASIC_FIGI"
+
+
+def _settings(**strategy_settings) -> StrategySettings:
+    return StrategySettings(
+        name="GetBooks",
+        figi=FUTURE_FIGI,
+        ticker="FUTURE",
+        settings={
+            "SIGNAL_VOLUME": "100",
+            "SIGNAL_MIN_TICKS": "20",
+            "SIGNAL_MIN_TAIL": "0.2",
+            "LONG_TAKE": "1.01",
+            "LONG_STOP": "0.985",
+            "SHORT_TAKE": "0.99",
+            "SHORT_STOP": "1.015",
+            **strategy_settings
+        },
+        basic_asset_figi=BASIC_FIGI
+    )
+
+
+def _books(count: int = 2000) -> tuple[BookArrays, BookArrays]:
+    random = np.random.default_rng(1)
+
+    def arrays(start_ns: int, prices: np.ndarray) -> BookArrays:
+        bid = np.round(prices, 2)
+        return BookArrays(start_ns + np.arange(count) * 1_000_000, bid, bid + 0.01,
+                          np.full(count, 10), np.full(count, 10))
+
+    basic = 100 + np.cumsum(random.normal(0, 0.05, count))
+    return arrays(0, basic + random.normal(0, 0.1, count)), arrays(500_000, basic)
+
+
+def _merged_books(future: BookArrays, basic: BookArrays) -> list:
+    books = future.to_snapshots(FUTURE_FIGI) + basic.to_snapshots(BASIC_FIGI)
+    return sorted(books, key=lambda x: x.time_ns)
+
+
+def test_live_signals_are_disabled_by_default():
+    books = _merged_books(*_books())
+    strategy = GetBookStrategy(_settings())
+    detector = GetBookStrategy(_settings())
+
+    assert not any(strategy.analyze_books(x) for x in books)
+    assert any(detector.detect_signal(x) for x in books)
+
+
+def test_live_signals_opt_in():
+    books = _merged_books(*_books())
+    strategy = GetBookStrategy(_settings(LIVE_SIGNALS="1"))
+    detector = GetBookStrategy(_settings())
+
+    signals = [strategy.analyze_books(x) for x in books]
+    detected = [detector.detect_signal(x) for x in books]
+
+    assert any(signals)
+    assert [x and x.signal_type for x in signals] == [x and x.signal_type for x in detected]
+
+
+def test_backtest_matches_strategy():
+    assert GetBookBacktest(_settings()).verify(*_books())
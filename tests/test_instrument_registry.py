@@ -0,0 +1,33 @@
+import asyncio
+from decimal import Decimal
+
+from configuration.settings import CurrencySettings, FutureSettings, RegistrySettings, ShareSettings
+from invest_api.instrument_registry import InstrumentRegistry
+
+
+class FakeInstrumentService:
+    async def futures(self) -> list[FutureSettings]:
+        return [FutureSettings(ticker="Si", figi="SI_FIGI", basic_asset="USD000UTSTOM",
+                               basic_asset_size=Decimal(1000), basic_asset_position_uid="USD_POSITION")]
+
+    async def shares(self) -> list[ShareSettings]:
+        return [ShareSettings(ticker="SBER", figi="SBER_FIGI", position_uid="SBER_POSITION")]
+
+    async def currencies(self) -> list[CurrencySettings]:
+        return [CurrencySettings(ticker="USD000UTSTOM", figi="USD_FIGI", position_uid="USD_POSITION")]
+
+
+def test_currency_basic_asset_resolved(tmp_path):
+    settings = RegistrySettings(snapshot_file=str(tmp_path / "instruments.json"))
+    registry = InstrumentRegistry(FakeInstrumentService(), settings)
+
+    asyncio.run(registry.refresh())
+
+    future = registry.future("SI_FIGI")
+    assert registry.by_position_uid(future.basic_asset_position_uid).figi == "USD_FIGI"
+
+    # Currencies are kept in snapshot
+    loaded = InstrumentRegistry(FakeInstrumentService(), settings)
+    assert not loaded.is_expired()
+    assert [x.figi for x in loaded.currencies()] == ["USD_FIGI"]
+    assert loaded.by_position_uid("USD_POSITION").ticker == "USD000UTSTOM"
@@ -0,0 +1,137 @@
+import asyncio
+import types
+
+import pytest
+from grpc import StatusCode
+from tinkoff.invest import RequestError
+
+from invest_api import invest_error_decorators
+from invest_api.invest_error_decorators import invest_api_retry, RetryPolicy, CircuitBreakerOpenError, \
+    CircuitBreakerState, circuit_breakers
+
+# One attempt per call, so tests don't wait for backoff
+NO_RETRY = RetryPolicy(retry_count=1)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """
+    Monotonic time of circuit breakers controlled by tests
+    """
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(
+        invest_error_decorators,
+        "time",
+        types.SimpleNamespace(monotonic=lambda: clock.now, sleep=lambda x: None)
+    )
+    return clock
+
+
+def _breaker(name: str):
+    return next(x for x in circuit_breakers() if x.name == name)
+
+
+def _open_breaker(method) -> None:
+    for _ in range(10):
+        with pytest.raises(RequestError):
+            method(StatusCode.UNAVAILABLE)
+
+    with pytest.raises(CircuitBreakerOpenError):
+        method(None)
+
+
+class Service:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    @invest_api_retry(policy=NO_RETRY, breaker_name="TestNonRetryable")
+    def non_retryable(self, code):
+        self.calls += 1
+        if code:
+            raise RequestError(code, "", None)
+        return "ok"
+
+    @invest_api_retry(policy=NO_RETRY, breaker_name="TestRetryable")
+    def retryable(self, code):
+        self.calls += 1
+        if code:
+            raise RequestError(code, "", None)
+        return "ok"
+
+    @invest_api_retry(policy=NO_RETRY, breaker_name="TestCancelled")
+    async def cancelled(self, code):
+        self.calls += 1
+        if code == StatusCode.CANCELLED:
+            raise asyncio.CancelledError()
+        if code:
+            raise RequestError(code, "", None)
+        return "ok"
+
+    @invest_api_retry(policy=NO_RETRY, breaker_name="TestCache", cache_fallback=True, cache_size=2)
+    def cached(self, value, code=None):
+        if code:
+            raise RequestError(code, "", None)
+        return value
+
+
+def test_non_retryable_trial_error_closes_breaker(clock):
+    service = Service()
+    _open_breaker(service.non_retryable)
+
+    clock.now += 31
+    with pytest.raises(RequestError):
+        service.non_retryable(StatusCode.NOT_FOUND)
+
+    assert _breaker("TestNonRetryable").state == CircuitBreakerState.CLOSED
+    assert service.non_retryable(None) == "ok"
+
+
+def test_retryable_trial_error_opens_breaker(clock):
+    service = Service()
+    _open_breaker(service.retryable)
+
+    clock.now += 31
+    with pytest.raises(RequestError):
+        service.retryable(StatusCode.UNAVAILABLE)
+
+    assert _breaker("TestRetryable").state == CircuitBreakerState.OPEN
+    with pytest.raises(CircuitBreakerOpenError):
+        service.retryable(None)
+
+    clock.now += 31
+    assert service.retryable(None) == "ok"
+    assert _breaker("TestRetryable").state == CircuitBreakerState.CLOSED
+
+
+def test_cancelled_trial_opens_breaker(clock):
+    service = Service()
+
+    async def call(code):
+        return await service.cancelled(code)
+
+    _open_breaker(lambda code: asyncio.run(call(code)))
+
+    clock.now += 31
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(call(StatusCode.CANCELLED))
+
+    assert _breaker("TestCancelled").state == CircuitBreakerState.OPEN
+
+    clock.now += 31
+    assert asyncio.run(call(None)) == "ok"
+    assert _breaker("TestCancelled").state == CircuitBreakerState.CLOSED
+
+
+def test_cache_fallback_keeps_last_results(clock):
+    service = Service()
+    for value in ("a", "b", "c"):
+        assert service.cached(value) == value
+
+    for _ in range(10):
+        with pytest.raises(RequestError):
+            service.cached("x", StatusCode.UNAVAILABLE)
+
+    assert service.cached("b") == "b"
+    assert service.cached("c") == "c"
+    with pytest.raises(CircuitBreakerOpenError):
+        service.cached("a")
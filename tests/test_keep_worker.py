@@ -0,0 +1,226 @@
+import asyncio
+import datetime
+import os
+from typing import Optional
+
+import pytest
+
+from configuration.settings import KeepSettings
+from keeper.book_records import BookRecordLayout
+from keeper import keep_worker
+from keeper.keep_worker import KeepWorker, STOP_SIGNAL
+from keeper.segment_log import SegmentLog, DEAD_LETTER_DIR
+from keeper.spill_file import SpillFile
+from keeper.storages.base_storage import IStorage
+
+
+class RejectingStorage(IStorage):
+    """
+    Rejects batches with ticker BAD by non-retryable error
+    """
+    def __init__(self) -> None:
+        self.rows = []
+        # Count of rows at the last sync
+        self.synced_rows = 0
+
+    async def open(self) -> None:
+        pass
+
+    async def save_batch(self, batch: list[tuple]) -> None:
+        if any(row[0] == "BAD" for row in batch):
+            raise ValueError("Bad row")
+        self.rows.extend(batch)
+
+    def is_retryable(self, ex: Exception) -> bool:
+        return False
+
+    async def sync(self) -> None:
+        self.synced_rows = len(self.rows)
+
+    async def close(self) -> None:
+        pass
+
+
+class SyncedStorage(RejectingStorage):
+    """
+    Saved rows are durable only after sync (like file storages)
+    """
+    def is_durable_on_save(self) -> bool:
+        return False
+
+
+class FlakyStorage(RejectingStorage):
+    """
+    Fails the first attempts to save a batch by retryable error
+    """
+    def __init__(self, failures: int) -> None:
+        super().__init__()
+        self.failures = failures
+
+    async def save_batch(self, batch: list[tuple]) -> None:
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionResetError("Connection lost")
+        await super().save_batch(batch)
+
+    def is_retryable(self, ex: Exception) -> bool:
+        return isinstance(ex, OSError)
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    storage = RejectingStorage()
+    monkeypatch.setattr(keep_worker.StorageFactory, "new_factory", lambda *args: storage)
+    return storage
+
+
+RECORD_LAYOUT = BookRecordLayout(1, "wide")
+
+
+def _settings(max_latency_ms: int = 10) -> KeepSettings:
+    return KeepSettings(conn_string="", max_batch_size=10, max_latency_ms=max_latency_ms, queue_size=100)
+
+
+def _record(ticker: str, second: int) -> tuple:
+    return ticker, datetime.datetime(2026, 10, 16, 7, 0, second, tzinfo=datetime.timezone.utc), 100.0, 1, 100.5, 2
+
+
+async def _run_worker(worker: KeepWorker, data_queue: asyncio.Queue, task: Optional[asyncio.Task] = None) -> None:
+    task = task or asyncio.create_task(worker.worker())
+    await data_queue.put(STOP_SIGNAL)
+    await data_queue.join()
+    await asyncio.sleep(0.1)
+
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_rejected_segment_is_moved_to_dead_letter(tmp_path, storage):
+    segment_log = SegmentLog(str(tmp_path / "wal"), 4096, RECORD_LAYOUT)
+    segment_log.append(_record("GOOD", 1))
+    segment_log.seal()
+    segment_log.append(_record("BAD", 2))
+    segment_log.seal()
+
+    data_queue = asyncio.Queue(maxsize=100)
+    worker = KeepWorker(_settings(), data_queue, SpillFile(str(tmp_path / "spill")), segment_log)
+    asyncio.run(_run_worker(worker, data_queue))
+
+    assert storage.rows == [_record("GOOD", 1)]
+    assert worker.stats()["replayed_segments"] == 1
+    assert worker.stats()["dead_letter_segments"] == 1
+    assert os.listdir(tmp_path / "wal" / DEAD_LETTER_DIR) == ["000000000001.seg"]
+    assert not segment_log.sealed_segments()
+
+
+def test_stop_signal_saves_write_ahead_log(tmp_path, storage):
+    # The replayer waits for max latency, stop signal doesn't wait for it
+    segment_log = SegmentLog(str(tmp_path / "wal"), 4096, RECORD_LAYOUT)
+    data_queue = asyncio.Queue(maxsize=100)
+    worker = KeepWorker(_settings(max_latency_ms=60000), data_queue, SpillFile(str(tmp_path / "spill")), segment_log)
+
+    async def run():
+        task = asyncio.create_task(worker.worker())
+        await asyncio.sleep(0.05)
+        for second in range(5):
+            segment_log.append(_record("GOOD", second))
+        await _run_worker(worker, data_queue, task)
+
+    asyncio.run(run())
+
+    assert storage.rows == [_record("GOOD", x) for x in range(5)]
+    assert storage.synced_rows == 5
+    assert not segment_log.sealed_segments()
+
+
+def test_segments_of_not_durable_storage_are_removed_after_sync(tmp_path, monkeypatch):
+    storage = SyncedStorage()
+    monkeypatch.setattr(keep_worker.StorageFactory, "new_factory", lambda *args: storage)
+
+    segment_log = SegmentLog(str(tmp_path / "wal"), 4096, RECORD_LAYOUT)
+    segment_log.append(_record("GOOD", 1))
+    segment_log.seal()
+
+    data_queue = asyncio.Queue(maxsize=100)
+    worker = KeepWorker(_settings(), data_queue, SpillFile(str(tmp_path / "spill")), segment_log)
+
+    async def run():
+        task = asyncio.create_task(worker.worker())
+        await asyncio.sleep(0.05)
+        # The segment is saved, but kept till sync
+        sealed = segment_log.sealed_segments()
+        await _run_worker(worker, data_queue, task)
+        return sealed
+
+    assert len(asyncio.run(run())) == 1
+    assert storage.rows == [_record("GOOD", 1)]
+    assert storage.synced_rows == 1
+    assert not segment_log.sealed_segments()
+    assert worker.stats()["replayed_segments"] == 1
+
+
+def test_rejected_spill_chunk_is_moved_to_dead_letter(tmp_path, storage):
+    spill_file = SpillFile(str(tmp_path))
+    for x in range(10):
+        spill_file.append(("GOOD", x))
+    spill_file.append(("BAD", 10))
+
+    data_queue = asyncio.Queue(maxsize=100)
+    worker = KeepWorker(_settings(), data_queue, spill_file)
+    asyncio.run(_run_worker(worker, data_queue))
+
+    assert storage.rows == [("GOOD", x) for x in range(10)]
+    assert worker.stats()["dead_letter_chunks"] == 1
+    assert spill_file.pending == 0
+    assert os.listdir(tmp_path / DEAD_LETTER_DIR) == ["order_book.spill"]
+
+
+def test_batch_is_retried_until_saved(tmp_path, monkeypatch):
+    storage = FlakyStorage(3)
+    monkeypatch.setattr(keep_worker.StorageFactory, "new_factory", lambda *args: storage)
+    monkeypatch.setattr(keep_worker, "RETRY_BASE_DELAY", 0.001)
+
+    data_queue = asyncio.Queue(maxsize=100)
+    for x in range(5):
+        data_queue.put_nowait(("GOOD", x))
+
+    worker = KeepWorker(_settings(), data_queue, SpillFile(str(tmp_path)))
+    asyncio.run(_run_worker(worker, data_queue))
+
+    assert storage.rows == [("GOOD", x) for x in range(5)]
+    assert worker.stats()["retries"] == 3
+    assert worker.stats()["batches"] == 1
+    assert worker.stats()["failed_rows"] == 0
+
+
+class HangingStorage(RejectingStorage):
+    """
+    Never finishes saving (e.g. database hangs)
+    """
+    async def save_batch(self, batch: list[tuple]) -> None:
+        await asyncio.Event().wait()
+
+
+def test_unsaved_batches_are_spilled_on_close(tmp_path, monkeypatch):
+    storage = HangingStorage()
+    monkeypatch.setattr(keep_worker.StorageFactory, "new_factory", lambda *args: storage)
+
+    data_queue = asyncio.Queue(maxsize=100)
+    worker = KeepWorker(_settings(max_latency_ms=60000), data_queue, SpillFile(str(tmp_path)))
+
+    async def run():
+        task = asyncio.create_task(worker.worker())
+        # Batches in progress, waiting in batch queue and the batch being collected
+        for x in range(95):
+            await data_queue.put(("GOOD", x))
+        await asyncio.sleep(0.1)
+
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+
+    assert worker.stats()["spilled_on_close"] == 95
+    spill_file = SpillFile(str(tmp_path))
+    assert spill_file.pending == 95
+    assert sorted(spill_file.read_chunk(100)) == [("GOOD", x) for x in range(95)]
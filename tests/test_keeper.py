@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+
+from invest_api.book_snapshot import BookSnapshot, instrument_ids, DEFAULT_DEPTH
+from keeper.keep_worker import STOP_SIGNAL
+from keeper.keeper import Keeper
+
+
+def _book(time_ns: int, bid_quantity: int = 0, second_bid_quantity: int = 0) -> BookSnapshot:
+    levels = np.zeros((4, DEFAULT_DEPTH), dtype=np.int64)
+    levels[BookSnapshot.BID_QUANTITIES, 0] = bid_quantity
+    levels[BookSnapshot.BID_QUANTITIES, 1] = second_bid_quantity
+    return BookSnapshot(instrument_ids.id("FIGI"), time_ns, True, levels)
+
+
+def _keeper(queue: asyncio.Queue, overflow_policy: str = "block", deduplicate: bool = False) -> Keeper:
+    settings = SimpleNamespace(depth=1, layout="wide", overflow_policy=overflow_policy, deduplicate=deduplicate)
+    return Keeper(settings, queue, None, None)
+
+
+def _times(queue: asyncio.Queue) -> list:
+    items = []
+    while not queue.empty():
+        item = queue.get_nowait()
+        items.append(item if item is STOP_SIGNAL else item[1].timestamp())
+
+    return items
+
+
+def test_empty_book_is_saved():
+    async def run():
+        queue = asyncio.Queue()
+        await _keeper(queue).save_data(_book(1_000_000_000), "TICKER")
+        return _times(queue)
+
+    assert asyncio.run(run()) == [1.0]
+
+
+def test_drop_oldest_keeps_stop_signal_first():
+    async def run():
+        queue = asyncio.Queue(maxsize=3)
+        keeper = _keeper(queue, "drop_oldest")
+
+        await keeper.save_data(STOP_SIGNAL)
+        for second in range(1, 5):
+            await keeper.save_data(_book(second * 1_000_000_000, 1), "TICKER")
+
+        return _times(queue), keeper.stats()["dropped"]
+
+    items, dropped = asyncio.run(run())
+
+    assert items == [STOP_SIGNAL, 3.0, 4.0]
+    assert dropped == 2
+
+
+def test_deduplicate_books_up_to_depth():
+    async def run():
+        queue = asyncio.Queue()
+        keeper = _keeper(queue, deduplicate=True)
+
+        await keeper.save_data(_book(1_000_000_000, 1), "TICKER")
+        # The same levels
+        await keeper.save_data(_book(2_000_000_000, 1), "TICKER")
+        # Change below saved depth
+        await keeper.save_data(_book(3_000_000_000, 1, 5), "TICKER")
+        # Change within saved depth
+        await keeper.save_data(_book(4_000_000_000, 2, 5), "TICKER")
+
+        return _times(queue), keeper.stats()
+
+    items, stats = asyncio.run(run())
+
+    assert items == [1.0, 4.0]
+    assert stats["suppressed"] == 2
+    assert stats["records"] == 2
+
+
+def test_stop_signal_resets_saved_levels():
+    async def run():
+        queue = asyncio.Queue()
+        keeper = _keeper(queue, deduplicate=True)
+
+        await keeper.save_data(_book(1_000_000_000, 1), "TICKER")
+        await keeper.save_data(STOP_SIGNAL)
+        # The next trading day starts with full books
+        await keeper.save_data(_book(2_000_000_000, 1), "TICKER")
+
+        return _times(queue), keeper.stats()["suppressed"]
+
+    items, suppressed = asyncio.run(run())
+
+    assert items == [1.0, STOP_SIGNAL, 2.0]
+    assert suppressed == 0
@@ -0,0 +1,79 @@
+import asyncio
+import gzip
+import io
+import time
+from types import SimpleNamespace
+
+from tinkoff.invest.grpc import common_pb2, marketdata_pb2
+
+from invest_api import market_data_recorder
+from invest_api.market_data_recorder import MarketDataRecorder, RECORD_FRAME, RECORD_SUFFIX
+from invest_api.market_data_replay import MarketDataReplay
+from invest_api.utils import NANOS_IN_UNIT
+
+# 2026-10-16 07:00:00 UTC
+START_NS = 1_792_134_000 * NANOS_IN_UNIT
+
+
+def _book_response(figi: str, bid_units: int) -> marketdata_pb2.MarketDataResponse:
+    return marketdata_pb2.MarketDataResponse(orderbook=marketdata_pb2.OrderBook(
+        figi=figi,
+        depth=1,
+        is_consistent=True,
+        bids=[marketdata_pb2.Order(price=common_pb2.Quotation(units=bid_units), quantity=1)],
+        asks=[marketdata_pb2.Order(price=common_pb2.Quotation(units=bid_units + 1), quantity=1)]
+    ))
+
+
+def _record(monkeypatch, record_dir: str, responses: list, step_ns: int = NANOS_IN_UNIT) -> MarketDataRecorder:
+    times = iter(range(START_NS, START_NS + step_ns * len(responses), step_ns))
+    monkeypatch.setattr(market_data_recorder, "time", SimpleNamespace(time_ns=lambda: next(times)))
+
+    recorder = MarketDataRecorder(record_dir)
+    for response in responses:
+        recorder.record(response)
+
+    monkeypatch.undo()
+    return recorder
+
+
+def _best_bids(replay: MarketDataReplay, figies: list[str]) -> list[int]:
+    async def run():
+        return [book.best_bid // NANOS_IN_UNIT async for book in replay.order_books(figies)]
+
+    return asyncio.run(run())
+
+
+def test_record_and_replay(tmp_path, monkeypatch):
+    candle = marketdata_pb2.MarketDataResponse(candle=marketdata_pb2.Candle(figi="FIGI1"))
+    responses = [_book_response("FIGI1", 100), candle, _book_response("FIGI2", 200), _book_response("FIGI1", 101)]
+    _record(monkeypatch, str(tmp_path), responses).close()
+
+    assert _best_bids(MarketDataReplay(str(tmp_path), speed=0), ["FIGI1"]) == [100, 101]
+    assert _best_bids(MarketDataReplay(str(tmp_path), speed=0), ["FIGI1", "FIGI2"]) == [100, 200, 101]
+
+
+def test_replay_speed(tmp_path, monkeypatch):
+    # Messages have been recorded 1 second apart, speed 10 replays them 0.1 second apart
+    _record(monkeypatch, str(tmp_path), [_book_response("FIGI1", 100 + x) for x in range(3)]).close()
+
+    started_at = time.monotonic()
+    assert _best_bids(MarketDataReplay(str(tmp_path), speed=10), ["FIGI1"]) == [100, 101, 102]
+    assert 0.18 <= time.monotonic() - started_at < 1.0
+
+
+def test_replay_of_truncated_file(tmp_path, monkeypatch):
+    # The first segment of crashed recorder has no gzip trailer and ends with incomplete frame
+    frames = [_book_response("FIGI1", 100 + x).SerializeToString() for x in range(3)]
+    buffer = io.BytesIO()
+    segment = gzip.GzipFile(fileobj=buffer, mode="wb")
+    for number, data in enumerate(frames):
+        segment.write(RECORD_FRAME.pack(START_NS + number, len(data)) + data)
+    segment.write(RECORD_FRAME.pack(START_NS + 3, len(frames[0])) + frames[0][:len(frames[0]) // 2])
+    segment.flush()
+    (tmp_path / f"20261016-000000{RECORD_SUFFIX}").write_bytes(buffer.getvalue())
+
+    # The next segment is replayed after the truncated one
+    _record(monkeypatch, str(tmp_path), [_book_response("FIGI1", 200)]).close()
+
+    assert _best_bids(MarketDataReplay(str(tmp_path), speed=0), ["FIGI1"]) == [100, 101, 102, 200]
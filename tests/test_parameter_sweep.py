@@ -0,0 +1,118 @@
+import os
+from decimal import Decimal
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+from backtest import parameter_sweep
+from backtest.book_arrays import BookArrays
+from backtest.get_book_backtest import GetBookBacktest
+from backtest.parameter_sweep import ParameterSweep, SharedBooks
+from configuration.configuration import ProgramConfiguration
+from configuration.settings import StrategySettings
+
+GRID = {"SIGNAL_MIN_TICKS": ["10", "20"], "LONG_TAKE": ["1.005", "1.01"]}
+
+
+def _settings(**strategy_settings) -> StrategySettings:
+    return StrategySettings(
+        name="GetBooks",
+        figi="FUTURE_FIGI",
+        ticker="FUTURE",
+        max_lots_per_order=1,
+        settings={
+            "SIGNAL_VOLUME": "100",
+            "SIGNAL_MIN_TICKS": "20",
+            "SIGNAL_MIN_TAIL": "0.2",
+            "LONG_TAKE": "1.01",
+            "LONG_STOP": "0.985",
+            "SHORT_TAKE": "0.99",
+            "SHORT_STOP": "1.015",
+            **strategy_settings
+        },
+        basic_asset_figi="BASIC_FIGI",
+        basic_asset_size=Decimal(10)
+    )
+
+
+def _books(count: int = 2000) -> tuple[BookArrays, BookArrays]:
+    random = np.random.default_rng(1)
+
+    def arrays(start_ns: int, prices: np.ndarray) -> BookArrays:
+        bid = np.round(prices, 2)
+        return BookArrays(start_ns + np.arange(count) * 1_000_000, bid, bid + 0.01,
+                          np.full(count, 10), np.full(count, 10))
+
+    basic = 100 + np.cumsum(random.normal(0, 0.05, count))
+    return arrays(0, basic + random.normal(0, 0.1, count)), arrays(500_000, basic)
+
+
+def test_shared_books_attach_and_unlink():
+    future, basic = _books(100)
+    shared_books = SharedBooks(future, basic)
+    name = shared_books.spec[0]
+
+    memory, shared_future, shared_basic = SharedBooks.attach(shared_books.spec)
+    for books, shared in ((future, shared_future), (basic, shared_basic)):
+        for array_name in parameter_sweep.BOOK_ARRAYS:
+            assert np.array_equal(getattr(books, array_name), getattr(shared, array_name))
+            assert getattr(shared, array_name).dtype == getattr(books, array_name).dtype
+
+    del shared_future, shared_basic
+    memory.close()
+    shared_books.close()
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+def test_sweep_ranks_grid(monkeypatch):
+    specs = []
+
+    class TrackedSharedBooks(SharedBooks):
+        @property
+        def spec(self) -> tuple[str, list]:
+            specs.append(super().spec)
+            return specs[-1]
+
+    monkeypatch.setattr(parameter_sweep, "SharedBooks", TrackedSharedBooks)
+
+    books = _books()
+    sweep = ParameterSweep(_settings(), GRID, workers=1)
+    results = sweep.run(*books)
+
+    # Every combination is checked, the best one is the same as direct backtest
+    direct = [GetBookBacktest(_settings(**x)).run(*books).summary() for x in sweep.combinations()]
+    assert sorted(str(x) for x, _ in results) == sorted(str(x) for x in sweep.combinations())
+    assert results[0][1] == max(direct, key=lambda x: (x["pnl"], -x["trades"]))
+
+    best_parameters, best_summary = results[0]
+    assert GetBookBacktest(_settings(**best_parameters)).run(*books).summary() == best_summary
+
+    sections = sweep.settings_sections(best_parameters)
+    assert sections.startswith("[STRATEGY_FUTURE]\nSTRATEGY_NAME=GetBooks\n")
+    assert "[STRATEGY_FUTURE_SETTINGS]\n" in sections
+    for key, value in best_parameters.items():
+        assert f"{key}={value}\n" in sections
+
+    # Shared memory is released after the sweep
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=specs[0][0])
+
+
+def test_settings_sections_read_by_configuration(tmp_path):
+    sweep = ParameterSweep(_settings(), GRID, workers=1)
+    sections = sweep.settings_sections({"SIGNAL_MIN_TICKS": "10"})
+
+    settings_file = tmp_path / "settings.ini"
+    with open(os.path.join(os.path.dirname(__file__), "..", "settings.ini"), encoding="utf-8") as repo_settings:
+        settings_file.write_text(repo_settings.read() + "\n" + sections, encoding="utf-8")
+
+    settings = next(x for x in ProgramConfiguration(str(settings_file)).trade_strategy_settings
+                    if x.figi == "FUTURE_FIGI")
+
+    expected = _settings(SIGNAL_MIN_TICKS="10")
+    for name in ("name", "ticker", "max_lots_per_order", "short_enabled_flag", "basic_asset_figi", "basic_asset_size"):
+        assert getattr(settings, name) == getattr(expected, name)
+    assert dict(settings.settings) == {key.lower(): value for key, value in expected.settings.items()}
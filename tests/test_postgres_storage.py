@@ -0,0 +1,134 @@
+import asyncio
+import datetime
+
+from configuration.settings import KeepSettings
+from keeper.book_records import BookRecordLayout
+from keeper.storages import postgres_storage
+from keeper.storages.postgres_storage import PostgresStorage, _quote
+
+DAY = datetime.date(2026, 10, 16)
+
+
+class FakeConnection:
+    """
+    Records statements, there are no tables in database
+    """
+    def __init__(self) -> None:
+        self.statements = []
+        self.copies = []
+
+    async def fetch(self, query, *args):
+        self.statements.append((query, args))
+        return []
+
+    async def fetchval(self, query, *args):
+        self.statements.append((query, args))
+        return False
+
+    async def execute(self, query, *args):
+        self.statements.append((query, args))
+
+    async def copy_records_to_table(self, table_name, **kwargs):
+        self.copies.append((table_name, kwargs))
+
+    def transaction(self):
+        return FakeContext(None)
+
+    def acquire(self):
+        return FakeContext(self)
+
+
+class FakeContext:
+    def __init__(self, value) -> None:
+        self.__value = value
+
+    async def __aenter__(self):
+        return self.__value
+
+    async def __aexit__(self, *args):
+        return False
+
+
+def test_quote():
+    assert _quote("order_book") == '"order_book"'
+    assert _quote("market.order_book") == '"market"."order_book"'
+    assert _quote('Order "Book"') == '"Order ""Book"""'
+
+
+def test_table_qualified_by_schema(monkeypatch):
+    conn = FakeConnection()
+
+    async def create_pool(*args, **kwargs):
+        return conn
+
+    monkeypatch.setattr(postgres_storage.asyncpg, "create_pool", create_pool)
+
+    async def run():
+        storage = PostgresStorage(
+            KeepSettings(conn_string="", table_name="market.order_book", partitions=True, partitions_ahead=0),
+            BookRecordLayout(1, "wide")
+        )
+        await storage.open()
+        await storage.save_batch([("TICKER", datetime.datetime(2026, 10, 15, 7, tzinfo=datetime.timezone.utc),
+                                   100.0, 1, 100.5, 2)])
+
+    asyncio.run(run())
+
+    statements = [query for query, _ in conn.statements]
+    assert 'CREATE TABLE "market"."order_book_20261015" PARTITION OF "market"."order_book" ' \
+           "FOR VALUES FROM ('2026-10-15 00:00:00+00') TO ('2026-10-16 00:00:00+00')" in statements
+    assert "market.order_book" not in str(conn.statements)
+    assert conn.copies[0][0] == "order_book"
+    assert conn.copies[0][1]["schema_name"] == "market"
+
+
+class DetachedTablesConnection(FakeConnection):
+    """
+    Tables of all days exist, but they aren't attached to the order book table
+    """
+    async def fetchval(self, query, *args):
+        self.statements.append((query, args))
+        return True
+
+
+def _save_batch(monkeypatch, conn: FakeConnection, batch: list[tuple]) -> None:
+    async def create_pool(*args, **kwargs):
+        return conn
+
+    monkeypatch.setattr(postgres_storage.asyncpg, "create_pool", create_pool)
+
+    async def run():
+        storage = PostgresStorage(
+            KeepSettings(conn_string="", table_name="order_book", partitions=True, partitions_ahead=0,
+                         partitions_retention_days=3),
+            BookRecordLayout(1, "wide")
+        )
+        await storage.open()
+        await storage.save_batch(batch)
+
+    asyncio.run(run())
+
+
+def _row(day: datetime.date) -> tuple:
+    return "TICKER", datetime.datetime.combine(day, datetime.time(7), datetime.timezone.utc), 100.0, 1, 100.5, 2
+
+
+def test_rows_older_than_retention_skipped(monkeypatch):
+    conn = FakeConnection()
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+    old_day = today - datetime.timedelta(days=10)
+
+    _save_batch(monkeypatch, conn, [_row(old_day), _row(today)])
+
+    assert f"order_book_{old_day:%Y%m%d}" not in str(conn.statements)
+    assert conn.copies[0][1]["records"] == [_row(today)]
+
+
+def test_detached_table_not_attached_back(monkeypatch):
+    conn = DetachedTablesConnection()
+    today = datetime.datetime.now(datetime.timezone.utc).date()
+
+    _save_batch(monkeypatch, conn, [_row(today)])
+
+    statements = [query for query, _ in conn.statements]
+    assert not [x for x in statements if "ATTACH PARTITION" in x or x.startswith("CREATE TABLE")]
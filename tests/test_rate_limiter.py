@@ -0,0 +1,121 @@
+import asyncio
+import types
+
+import pytest
+
+from invest_api import rate_limiter
+from invest_api.rate_limiter import (
+    BURST_SECONDS, AsyncRateLimitInterceptor, RateLimiter, RateLimitInterceptor, TokenBucket
+)
+
+METHOD = "tinkoff.public.invest.api.contract.v1.OrdersService/PostOrder"
+
+
+class FakeClock:
+    """
+    Time moves only by sleeps and by hand
+    """
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def async_sleep(self, seconds: float) -> None:
+        self.sleep(seconds)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(rate_limiter.time, "sleep", clock.sleep)
+    monkeypatch.setattr(rate_limiter.asyncio, "sleep", clock.async_sleep)
+    return clock
+
+
+def _rate_limiter(limit_per_minute: int) -> RateLimiter:
+    limiter = RateLimiter()
+    limiter.configure([types.SimpleNamespace(limit_per_minute=limit_per_minute, methods=[METHOD])])
+    return limiter
+
+
+def test_burst_cap(clock):
+    # 1 token per second
+    bucket = TokenBucket("orders", 60)
+
+    assert [bucket.reserve() for _ in range(BURST_SECONDS)] == [0.0] * BURST_SECONDS
+    assert bucket.reserve() == pytest.approx(1.0)
+
+    # Idle time doesn't add tokens above the burst
+    clock.now += 100
+    assert [bucket.reserve() for _ in range(BURST_SECONDS)] == [0.0] * BURST_SECONDS
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_refill(clock):
+    # 2 tokens per second
+    bucket = TokenBucket("orders", 120)
+    for _ in range(2 * BURST_SECONDS):
+        bucket.reserve()
+
+    clock.now += 1.5
+    assert [bucket.reserve() for _ in range(3)] == [0.0] * 3
+    assert bucket.reserve() == pytest.approx(0.5)
+
+
+def test_reservations_wait_in_order(clock):
+    bucket = TokenBucket("orders", 120)
+    for _ in range(2 * BURST_SECONDS):
+        bucket.reserve()
+
+    # Every request of empty bucket reserves the next token
+    assert [bucket.reserve() for _ in range(3)] == pytest.approx([0.5, 1.0, 1.5])
+    assert bucket.stats() == {
+        "requests": 2 * BURST_SECONDS + 3,
+        "waits": 3,
+        "wait_time": 3.0,
+        "max_wait_time": 1.5
+    }
+
+
+def test_interceptor_waits_for_token(clock):
+    limiter = _rate_limiter(60)
+    interceptor = RateLimitInterceptor(limiter)
+    calls = []
+
+    def continuation(client_call_details, request):
+        calls.append((clock.now, request))
+        return "response"
+
+    details = types.SimpleNamespace(method=f"/{METHOD}".encode())
+    responses = [interceptor.intercept_unary_unary(continuation, details, x) for x in range(BURST_SECONDS + 2)]
+
+    assert responses == ["response"] * (BURST_SECONDS + 2)
+    assert clock.sleeps == pytest.approx([1.0, 1.0])
+    assert [request for _, request in calls] == list(range(BURST_SECONDS + 2))
+
+    # Methods without limit aren't delayed
+    interceptor.intercept_unary_unary(continuation, types.SimpleNamespace(method=b"/UsersService/GetInfo"), None)
+    assert len(clock.sleeps) == 2
+
+
+def test_async_interceptor_waits_for_token(clock):
+    limiter = _rate_limiter(60)
+    interceptor = AsyncRateLimitInterceptor(limiter)
+
+    async def continuation(client_call_details, request):
+        return request
+
+    async def run():
+        details = types.SimpleNamespace(method=f"/{METHOD}")
+        return [await interceptor.intercept_unary_unary(continuation, details, x) for x in range(BURST_SECONDS + 1)]
+
+    assert asyncio.run(run()) == list(range(BURST_SECONDS + 1))
+    assert clock.sleeps == pytest.approx([1.0])
+    assert list(limiter.stats().values())[0]["waits"] == 1
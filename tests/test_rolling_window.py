@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from trade_system import rolling_window
+from trade_system.rolling_window import RollingWindow
+
+
+def _values(count: int) -> np.ndarray:
+    return 100 + np.cumsum(np.random.default_rng(1).normal(0, 0.5, count))
+
+
+@pytest.mark.parametrize("size, ddof", [(20, 0), (50, 1), (1500, 1)])
+def test_count_window(size, ddof):
+    values = _values(3000)
+    window = RollingWindow(size=size, ddof=ddof)
+
+    for x, value in enumerate(values):
+        window.append(value)
+        expected = values[max(0, x + 1 - size):x + 1]
+
+        assert len(window) == len(expected)
+        assert np.array_equal(window.values(), expected)
+        assert window.mean == pytest.approx(np.mean(expected))
+        if len(expected) > ddof:
+            assert window.std == pytest.approx(np.std(expected, ddof=ddof))
+
+    assert window.is_full()
+
+
+@pytest.mark.parametrize("duration_ns", [50_000_000, 2_000_000_000])
+def test_time_window(duration_ns):
+    values = _values(3000)
+    # Irregular intervals between values (0-2 ms), the longer window keeps more than initial capacity
+    times = np.cumsum(np.random.default_rng(2).integers(0, 2_000_000, len(values)))
+    window = RollingWindow(duration_ns=duration_ns, ddof=1)
+
+    max_length = 0
+    for x, (value, time_ns) in enumerate(zip(values, times)):
+        window.append(value, int(time_ns))
+        expected = values[:x + 1][times[:x + 1] >= time_ns - duration_ns]
+        max_length = max(max_length, len(expected))
+
+        assert len(window) == len(expected)
+        assert np.array_equal(window.values(), expected)
+        assert window.mean == pytest.approx(np.mean(expected))
+        if len(expected) > 1:
+            assert window.std == pytest.approx(np.std(expected, ddof=1))
+
+    assert not window.is_full()
+    if duration_ns > 1_000_000_000:
+        assert max_length > 1024
+
+
+def test_clear_restarts_recalculation(monkeypatch):
+    monkeypatch.setattr(rolling_window, "RECALCULATE_EVERY", 10)
+    recalculations = []
+    recalculate = RollingWindow._RollingWindow__recalculate
+
+    def counted_recalculate(self):
+        recalculations.append(len(self))
+        recalculate(self)
+
+    monkeypatch.setattr(RollingWindow, "_RollingWindow__recalculate", counted_recalculate)
+
+    window = RollingWindow(size=5)
+    for value in _values(7):
+        window.append(value)
+    window.clear()
+
+    # Updates before clear aren't counted
+    for value in _values(9):
+        window.append(value)
+    assert not recalculations
+
+    window.append(100.0)
+    assert recalculations == [5]
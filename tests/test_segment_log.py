@@ -0,0 +1,66 @@
+import datetime
+import os
+
+import pytest
+
+from keeper.book_records import BookRecordLayout
+from keeper.segment_log import SegmentLog, DEAD_LETTER_DIR
+
+START_TIME = datetime.datetime(2026, 10, 16, 7, 0, 0, 123456, tzinfo=datetime.timezone.utc)
+
+
+def _record(ticker: str, second: int) -> tuple:
+    return ticker, START_TIME + datetime.timedelta(seconds=second), 100.0, 1, 100.5, 2
+
+
+def _reject(log_dir: str, record: tuple) -> None:
+    segment_log = SegmentLog(log_dir, 4096, BookRecordLayout(1, "wide"))
+    segment_log.append(record)
+    segment_log.seal()
+    segment_log.move_to_dead_letter(segment_log.sealed_segments()[0])
+    segment_log.close()
+
+
+def test_dead_letter_is_kept_after_restart(tmp_path):
+    log_dir = str(tmp_path / "wal")
+    _reject(log_dir, _record("BAD", 1))
+    # Restart with empty log directory
+    _reject(log_dir, _record("BAD", 2))
+
+    dead_letter_dir = os.path.join(log_dir, DEAD_LETTER_DIR)
+    segment_log = SegmentLog(log_dir, 4096, BookRecordLayout(1, "wide"))
+    records = [
+        segment_log.read_segment(os.path.join(dead_letter_dir, x)) for x in sorted(os.listdir(dead_letter_dir))
+    ]
+    assert records == [[_record("BAD", 1)], [_record("BAD", 2)]]
+
+
+def test_dead_letter_with_the_same_name_isnt_overwritten(tmp_path):
+    log_dir = str(tmp_path / "wal")
+    dead_letter_dir = os.path.join(log_dir, DEAD_LETTER_DIR)
+    _reject(log_dir, _record("BAD", 1))
+
+    # The same segment name is reused, e.g. dead letter directory has been moved away and back
+    os.rename(dead_letter_dir, str(tmp_path / "moved"))
+    _reject(log_dir, _record("BAD", 2))
+    for file_name in os.listdir(str(tmp_path / "moved")):
+        os.rename(os.path.join(str(tmp_path / "moved"), file_name), os.path.join(log_dir, file_name))
+    segment_log = SegmentLog(log_dir, 4096, BookRecordLayout(1, "wide"))
+    segment_log.move_to_dead_letter(segment_log.sealed_segments()[0])
+
+    assert sorted(
+        segment_log.read_segment(os.path.join(dead_letter_dir, x)) for x in os.listdir(dead_letter_dir)
+    ) == [[_record("BAD", 1)], [_record("BAD", 2)]]
+
+
+@pytest.mark.parametrize("layout, depth, records", [
+    ("wide", 1, [("AAA", START_TIME, 100.25, 7, 100.5, 9), ("ТИКЕР", START_TIME, 0.0, 0, 0.0, 0)]),
+    ("array", 2, [("AAA", START_TIME, [100.25, 100.0], [7, 8], [100.5, 100.75], [9, 10])])
+])
+def test_records_are_packed(tmp_path, layout, depth, records):
+    segment_log = SegmentLog(str(tmp_path), 4096, BookRecordLayout(depth, layout))
+    for record in records:
+        segment_log.append(record)
+    segment_log.seal()
+
+    assert segment_log.read_segment(segment_log.sealed_segments()[0]) == records
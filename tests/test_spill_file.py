@@ -0,0 +1,74 @@
+from keeper.spill_file import SpillFile
+
+
+def _spill(tmp_path, count: int) -> SpillFile:
+    spill_file = SpillFile(str(tmp_path))
+    for x in range(count):
+        spill_file.append(("TICKER", x))
+
+    return spill_file
+
+
+def test_drain_by_chunks(tmp_path):
+    spill_file = _spill(tmp_path, 5)
+
+    assert spill_file.read_chunk(2) == [("TICKER", 0), ("TICKER", 1)]
+    spill_file.commit_chunk()
+    assert spill_file.read_chunk(2) == [("TICKER", 2), ("TICKER", 3)]
+    spill_file.commit_chunk()
+    assert spill_file.read_chunk(2) == [("TICKER", 4)]
+    spill_file.commit_chunk()
+
+    assert spill_file.read_chunk(2) == []
+    assert spill_file.pending == 0
+    assert not list(tmp_path.iterdir())
+
+
+def test_chunk_is_kept_until_commit(tmp_path):
+    spill_file = _spill(tmp_path, 3)
+
+    assert spill_file.read_chunk(2) == [("TICKER", 0), ("TICKER", 1)]
+    assert spill_file.read_chunk(2) == [("TICKER", 0), ("TICKER", 1)]
+    assert spill_file.pending == 3
+
+
+def test_records_appended_while_draining(tmp_path):
+    spill_file = _spill(tmp_path, 2)
+
+    assert spill_file.read_chunk(10) == [("TICKER", 0), ("TICKER", 1)]
+    spill_file.append(("TICKER", 2))
+    spill_file.commit_chunk()
+
+    assert spill_file.pending == 1
+    assert spill_file.read_chunk(10) == [("TICKER", 2)]
+
+
+def test_restart(tmp_path):
+    spill_file = _spill(tmp_path, 5)
+    spill_file.read_chunk(2)
+    spill_file.commit_chunk()
+    # Read, but not committed chunk
+    spill_file.read_chunk(2)
+    spill_file.append(("TICKER", 5))
+    spill_file.close()
+
+    spill_file = SpillFile(str(tmp_path))
+
+    assert spill_file.pending == 4
+    assert spill_file.read_chunk(10) == [("TICKER", 2), ("TICKER", 3), ("TICKER", 4)]
+    spill_file.commit_chunk()
+    assert spill_file.read_chunk(10) == [("TICKER", 5)]
+
+
+def test_broken_tail(tmp_path):
+    spill_file = _spill(tmp_path, 2)
+    spill_file.close()
+    with open(tmp_path / "order_book.spill", "ab") as file:
+        file.write(b"\x80\x05broken")
+
+    spill_file = SpillFile(str(tmp_path))
+
+    assert spill_file.pending == 2
+    assert spill_file.read_chunk(10) == [("TICKER", 0), ("TICKER", 1)]
+    spill_file.commit_chunk()
+    assert spill_file.read_chunk(10) == []
@@ -0,0 +1,59 @@
+import asyncio
+import contextlib
+import datetime
+
+from invest_api import stream_session
+from invest_api.invest_error_decorators import RetryPolicy
+from invest_api.stream_session import StreamSession
+
+
+class ClosedStream:
+    """
+    Stream which is closed by server without items
+    """
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        raise StopAsyncIteration
+
+    def stop(self) -> None:
+        pass
+
+
+class FakeChannelManager:
+    @contextlib.asynccontextmanager
+    async def async_stream_channel(self):
+        yield None
+
+
+def test_closed_stream_is_resubscribed_with_backoff(monkeypatch):
+    delays = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+        if len(delays) == 5:
+            raise asyncio.CancelledError()
+
+    monkeypatch.setattr(stream_session.asyncio, "sleep", sleep)
+
+    session = StreamSession(
+        name="Test",
+        channel_manager=FakeChannelManager(),
+        figies=["FIGI"],
+        open_stream=lambda channel: ClosedStream(),
+        retry_policy=RetryPolicy(base_delay=0.01, max_delay=1.0, jitter=0.0)
+    )
+
+    async def run():
+        trade_before_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
+        async for _ in session.market_data(trade_before_time):
+            pass
+
+    try:
+        asyncio.run(run())
+    except asyncio.CancelledError:
+        pass
+
+    assert delays == [0.01, 0.02, 0.04, 0.08, 0.16]
+    assert session.stats()["reconnects"] == 5
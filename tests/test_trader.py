@@ -0,0 +1,125 @@
+import asyncio
+import datetime
+import time
+from decimal import Decimal
+from types import SimpleNamespace
+
+import numpy as np
+from tinkoff.invest import OrderExecutionReportStatus
+
+from invest_api.book_snapshot import BookSnapshot, instrument_ids, DEFAULT_DEPTH
+from trade_system.signal import Signal, SignalType
+from trading.trader import Trader
+
+FIGI = "FUTURE_FIGI"
+ORDER_TIME = 0.05
+
+
+def _book(price: int) -> BookSnapshot:
+    levels = np.zeros((4, DEFAULT_DEPTH), dtype=np.int64)
+    levels[:, 0] = [price * 1_000_000_000, 10, (price + 1) * 1_000_000_000, 10]
+    return BookSnapshot(instrument_ids.id(FIGI), time.time_ns(), True, levels)
+
+
+class FakeStrategy:
+    settings = SimpleNamespace(figi=FIGI, ticker="FUTURE", name="Fake", lot_size=1, max_lots_per_order=1)
+
+    def __init__(self) -> None:
+        self.books = 0
+
+    def analyze_books(self, book):
+        self.books += 1
+        if self.books == 1:
+            return Signal(figi=FIGI, signal_type=SignalType.LONG,
+                          take_profit_level=Decimal(110), stop_loss_level=Decimal(90))
+        return None
+
+    def stats(self) -> dict:
+        return {}
+
+
+class FakeStream:
+    """
+    Books of 100 while the position is opened, then books of the take level
+    """
+    def __init__(self) -> None:
+        self.yield_times = []
+
+    async def start_async_orderbook_stream(self, figies, end_time):
+        for price, pause in [(100, 0)] * 6 + [(110, ORDER_TIME * 2)] + [(110, 0)] * 5:
+            await asyncio.sleep(pause)
+            self.yield_times.append(time.monotonic())
+            yield _book(price)
+
+
+class FakeOrderService:
+    def __init__(self) -> None:
+        self.orders = []
+        self.finish_times = []
+
+    async def post_market_order(self, account_id, figi, count_lots, is_buy):
+        self.orders.append((figi, count_lots, is_buy))
+        await asyncio.sleep(ORDER_TIME)
+        self.finish_times.append(time.monotonic())
+
+        return SimpleNamespace(
+            order_id=f"order{len(self.orders)}",
+            execution_report_status=OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL
+        )
+
+
+class FakeOperationService:
+    async def available_rub_on_account(self, account_id):
+        return Decimal(1_000_000)
+
+    async def open_positions(self, account_id):
+        # Futures positions (PositionsFutures)
+        return [SimpleNamespace(figi=FIGI, balance=1)]
+
+
+class FakeMarketDataService:
+    async def is_stock_ready_for_trading(self, figi):
+        return True
+
+
+class FakeKeeper:
+    async def save_data(self, data, ticker=""):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class FakeBlogger:
+    def __init__(self) -> None:
+        self.messages = []
+
+    def open_position_message(self, trade_order):
+        self.messages.append(("open", trade_order.open_order_id))
+
+    def close_position_message(self, trade_order):
+        self.messages.append(("close", trade_order.close_order_id))
+
+
+def test_orders_do_not_block_books():
+    stream, orders, blogger = FakeStream(), FakeOrderService(), FakeBlogger()
+
+    async def run():
+        trader = Trader(None, None, FakeOperationService(), orders, stream, FakeMarketDataService(), blogger,
+                        FakeKeeper(), None, 1)
+        await trader._Trader__trading_orderbook(
+            "account",
+            SimpleNamespace(stop_signals_before_close=0),
+            {FIGI: [FakeStrategy()]},
+            datetime.datetime.now(datetime.UTC) + datetime.timedelta(hours=1)
+        )
+
+    asyncio.run(run())
+
+    # Open by the signal and one close of the futures position, though all books of take level reach it
+    assert orders.orders == [(FIGI, 1, True), (FIGI, 1, False)]
+    assert blogger.messages == [("open", "order1"), ("close", "order2")]
+
+    # Books are read while orders are executed
+    assert stream.yield_times[5] < orders.finish_times[0]
+    assert stream.yield_times[-1] < orders.finish_times[1]
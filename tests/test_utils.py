@@ -0,0 +1,117 @@
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from tinkoff.invest import MoneyValue, Quotation
+
+from invest_api.utils import NANOS_IN_UNIT, quotation_to_nanos, nanos_to_quotation, moneyvalue_to_nanos, \
+    nanos_to_moneyvalue, moneyvalue_to_decimal, decimal_to_moneyvalue, quotations_to_nanos, nanos_to_decimal, \
+    decimal_to_nanos, nanos_to_float, round_to_increment, floor_to_increment, ceil_to_increment
+
+PRICES = [
+    # (units, nano, nanos)
+    (0, 0, 0),
+    (1, 500_000_000, 1_500_000_000),
+    (30125, 1, 30125 * NANOS_IN_UNIT + 1),
+    # units and nano have the same sign in tinkoff api
+    (-1, -500_000_000, -1_500_000_000),
+    (0, -1, -1),
+    (-30125, -999_999_999, -30125 * NANOS_IN_UNIT - 999_999_999),
+    (2 ** 31, 999_999_999, 2 ** 31 * NANOS_IN_UNIT + 999_999_999),
+]
+
+
+@pytest.mark.parametrize("units, nano, nanos", PRICES)
+def test_quotation_round_trip(units, nano, nanos):
+    assert quotation_to_nanos(Quotation(units=units, nano=nano)) == nanos
+    assert nanos_to_quotation(nanos) == Quotation(units=units, nano=nano)
+
+
+@pytest.mark.parametrize("units, nano, nanos", PRICES)
+def test_moneyvalue_round_trip(units, nano, nanos):
+    money = MoneyValue(currency="usd", units=units, nano=nano)
+
+    assert moneyvalue_to_nanos(money) == nanos
+    assert nanos_to_moneyvalue(nanos, "usd") == money
+    assert decimal_to_moneyvalue(moneyvalue_to_decimal(money), "usd") == money
+
+
+@pytest.mark.parametrize("units, nano, nanos", PRICES)
+def test_decimal_is_exact(units, nano, nanos):
+    decimal = nanos_to_decimal(nanos)
+
+    assert decimal == Decimal(units) + Decimal(nano) / NANOS_IN_UNIT
+    assert decimal_to_nanos(decimal) == nanos
+
+
+def test_nanos_to_moneyvalue_default_currency():
+    assert nanos_to_moneyvalue(1).currency == "rub"
+
+
+@pytest.mark.parametrize("decimal, nanos", [
+    # Digits after 9th decimal place are rounded half to even
+    ("0.0000000005", 0),
+    ("0.0000000015", 2),
+    ("0.00000000151", 2),
+    ("-0.0000000005", 0),
+    ("-0.0000000015", -2),
+    ("1.2345678904", 1_234_567_890),
+    ("1.2345678906", 1_234_567_891),
+])
+def test_decimal_rounding(decimal, nanos):
+    assert decimal_to_nanos(Decimal(decimal)) == nanos
+
+
+@pytest.mark.parametrize("decimal, quotation", [
+    # Rounded nano carries into units
+    ("1.9999999996", Quotation(units=2, nano=0)),
+    ("-1.9999999996", Quotation(units=-2, nano=0)),
+    ("0.9999999995", Quotation(units=1, nano=0)),
+    ("0.9999999985", Quotation(units=0, nano=999_999_998)),
+])
+def test_nano_carry(decimal, quotation):
+    assert nanos_to_quotation(decimal_to_nanos(Decimal(decimal))) == quotation
+
+
+def test_quotations_to_nanos():
+    nanos = quotations_to_nanos(Quotation(units=units, nano=nano) for units, nano, _ in PRICES)
+
+    assert nanos.dtype == np.int64
+    assert nanos.tolist() == [x for _, _, x in PRICES]
+
+
+def test_nanos_to_float():
+    assert nanos_to_float(1_500_000_000) == 1.5
+    assert nanos_to_float(np.array([1_500_000_000, -250_000_000])).tolist() == [1.5, -0.25]
+
+
+INCREMENT = 250_000_000
+
+
+@pytest.mark.parametrize("nanos, nearest, floor, ceil", [
+    (1_000_000_000, 1_000_000_000, 1_000_000_000, 1_000_000_000),
+    (1_100_000_000, 1_000_000_000, 1_000_000_000, 1_250_000_000),
+    (1_125_000_000, 1_250_000_000, 1_000_000_000, 1_250_000_000),
+    (1_200_000_000, 1_250_000_000, 1_000_000_000, 1_250_000_000),
+    (-1_100_000_000, -1_000_000_000, -1_250_000_000, -1_000_000_000),
+    (-1_200_000_000, -1_250_000_000, -1_250_000_000, -1_000_000_000),
+])
+def test_round_to_increment(nanos, nearest, floor, ceil):
+    assert round_to_increment(nanos, INCREMENT) == nearest
+    assert floor_to_increment(nanos, INCREMENT) == floor
+    assert ceil_to_increment(nanos, INCREMENT) == ceil
+
+
+def test_round_to_increment_arrays():
+    nanos = np.array([1_000_000_000, 1_100_000_000, 1_125_000_000, -1_100_000_000, -1_200_000_000], dtype=np.int64)
+
+    for function in (round_to_increment, floor_to_increment, ceil_to_increment):
+        result = function(nanos, INCREMENT)
+
+        assert result.dtype == np.int64
+        assert result.tolist() == [function(int(x), INCREMENT) for x in nanos]
+
+
+def test_zero_increment():
+    for function in (round_to_increment, floor_to_increment, ceil_to_increment):
+        assert function(1_234_567_891, 0) == 1_234_567_891
@@ -0,0 +1,84 @@
+import logging
+from typing import Optional, Union
+
+from invest_api.book_snapshot import BookSnapshot, instrument_ids
+
+__all__ = ("PairSynchronizer")
+
+logger = logging.getLogger(__name__)
+
+
+class PairSynchronizer:
+    """
+    As-of join of books of several instruments (legs), e.g. a future and its basic asset or a basket.
+    Every leg keeps its latest book by exchange time. After update of any leg the set of books is emitted
+    only if all legs have books not older than max age of the leg relative to the newest book.
+    Books older than the current book of their leg (e.g. snapshot after reconnect) are ignored.
+    """
+    def __init__(self, figies: list[str], max_age_ns: Union[int, list[int]] = 0) -> None:
+        """
+        :param max_age_ns: Maximum age of book per leg (or the same for all legs). 0 - not limited
+        """
+        self.__figies = figies
+        self.__max_ages = max_age_ns if isinstance(max_age_ns, list) else [max_age_ns] * len(figies)
+
+        # instrument id -> position of the leg
+        self.__legs = {instrument_ids.id(figi): leg for leg, figi in enumerate(figies)}
+        self.__books: list[Optional[BookSnapshot]] = [None] * len(figies)
+        self.__time_ns = 0
+
+        self.__stats = {
+            "updates": 0,
+            "emitted": 0,
+            "missing_legs": 0,
+            "dropped_stale": 0,
+            "dropped_out_of_order": 0,
+            "unknown": 0
+        }
+
+    @property
+    def figies(self) -> list[str]:
+        return self.__figies
+
+    def has_leg(self, figi: str) -> bool:
+        return instrument_ids.id(figi) in self.__legs
+
+    def update(self, book: BookSnapshot) -> bool:
+        """
+        :return: True if books of all legs are fresh (books() can be used)
+        """
+        self.__stats["updates"] += 1
+
+        leg = self.__legs.get(book.instrument_id, None)
+        if leg is None:
+            self.__stats["unknown"] += 1
+            return False
+
+        current_book = self.__books[leg]
+        if current_book and book.time_ns < current_book.time_ns:
+            self.__stats["dropped_out_of_order"] += 1
+            return False
+
+        self.__books[leg] = book
+        self.__time_ns = max(self.__time_ns, book.time_ns)
+
+        for leg_book, max_age_ns in zip(self.__books, self.__max_ages):
+            if not leg_book:
+                self.__stats["missing_legs"] += 1
+                return False
+
+            if max_age_ns and self.__time_ns - leg_book.time_ns > max_age_ns:
+                self.__stats["dropped_stale"] += 1
+                return False
+
+        self.__stats["emitted"] += 1
+        return True
+
+    def books(self) -> list[BookSnapshot]:
+        """
+        :return: The latest books in order of legs
+        """
+        return list(self.__books)
+
+    def stats(self) -> dict:
+        return dict(self.__stats)
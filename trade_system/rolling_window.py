@@ -0,0 +1,151 @@
+import math
+
+import numpy as np
+
+__all__ = ("RollingWindow")
+
+# Streaming sums are recalculated from the buffer after this count of updates, so float errors don't accumulate
+RECALCULATE_EVERY = 100000
+
+
+class RollingWindow:
+    """
+    Rolling window of float values in preallocated ring buffer with streaming mean and variance (Welford).
+    Every append costs O(1) regardless of window length.
+    The window keeps the last `size` values (tick window) and/or values not older than `duration_ns` (time window).
+    """
+    def __init__(self, size: int = 0, duration_ns: int = 0, ddof: int = 0, capacity: int = 1024) -> None:
+        """
+        :param size: Maximum count of values. 0 - not limited by count
+        :param duration_ns: Maximum age of values relative to the last value. 0 - not limited by time
+        :param ddof: Delta degrees of freedom of variance (as numpy.std)
+        :param capacity: Initial capacity of the buffer for time window (it grows if needed)
+        """
+        if not size and not duration_ns:
+            raise ValueError("Size or duration of rolling window is required")
+
+        self.__size = size
+        self.__duration_ns = duration_ns
+        self.__ddof = ddof
+
+        capacity = size or capacity
+        self.__values = np.zeros(capacity, dtype=np.float64)
+        self.__times = np.zeros(capacity, dtype=np.int64)
+        # Position of the oldest value and count of values
+        self.__start = 0
+        self.__count = 0
+
+        self.__mean = 0.0
+        self.__m2 = 0.0
+        self.__updates = 0
+
+    def __len__(self) -> int:
+        return self.__count
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def last(self) -> float:
+        return float(self.__values[(self.__start + self.__count - 1) % len(self.__values)])
+
+    @property
+    def mean(self) -> float:
+        return self.__mean if self.__count else math.nan
+
+    @property
+    def variance(self) -> float:
+        degrees = self.__count - self.__ddof
+        if degrees <= 0:
+            return math.inf if self.__count else math.nan
+
+        return max(self.__m2, 0.0) / degrees
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def is_full(self) -> bool:
+        return bool(self.__size) and self.__count == self.__size
+
+    def values(self) -> np.ndarray:
+        """
+        :return: Copy of values from the oldest to the last
+        """
+        return np.roll(self.__values, -self.__start)[:self.__count] if self.__count else np.empty(0)
+
+    def append(self, value: float, time_ns: int = 0) -> None:
+        if self.__duration_ns:
+            self.__remove_older(time_ns - self.__duration_ns)
+
+        if self.is_full():
+            self.__replace_oldest(value, time_ns)
+        else:
+            if self.__count == len(self.__values):
+                self.__grow()
+
+            position = (self.__start + self.__count) % len(self.__values)
+            self.__values[position] = value
+            self.__times[position] = time_ns
+            self.__count += 1
+
+            delta = value - self.__mean
+            self.__mean += delta / self.__count
+            self.__m2 += delta * (value - self.__mean)
+
+        self.__updates += 1
+        if self.__updates >= RECALCULATE_EVERY:
+            self.__recalculate()
+
+    def clear(self) -> None:
+        self.__start = 0
+        self.__count = 0
+        self.__mean = 0.0
+        self.__m2 = 0.0
+        self.__updates = 0
+
+    def __replace_oldest(self, value: float, time_ns: int) -> None:
+        oldest = float(self.__values[self.__start])
+
+        self.__values[self.__start] = value
+        self.__times[self.__start] = time_ns
+        self.__start = (self.__start + 1) % len(self.__values)
+
+        # Welford update for removal of the oldest and addition of the new value with the same count
+        mean = self.__mean + (value - oldest) / self.__count
+        self.__m2 += (value - oldest) * (value - mean + oldest - self.__mean)
+        self.__mean = mean
+
+    def __remove_older(self, min_time_ns: int) -> None:
+        while self.__count and self.__times[self.__start] < min_time_ns:
+            oldest = float(self.__values[self.__start])
+            self.__start = (self.__start + 1) % len(self.__values)
+            self.__count -= 1
+
+            if not self.__count:
+                self.__mean = 0.0
+                self.__m2 = 0.0
+            else:
+                delta = oldest - self.__mean
+                self.__mean -= delta / self.__count
+                self.__m2 -= delta * (oldest - self.__mean)
+
+    def __grow(self) -> None:
+        # Only time window grows, count window has fixed capacity
+        values = self.values()
+        times = np.roll(self.__times, -self.__start)[:self.__count]
+
+        self.__values = np.zeros(len(self.__values) * 2, dtype=np.float64)
+        self.__times = np.zeros(len(self.__times) * 2, dtype=np.int64)
+        self.__values[:self.__count] = values
+        self.__times[:self.__count] = times
+        self.__start = 0
+
+    def __recalculate(self) -> None:
+        self.__updates = 0
+
+        if self.__count:
+            values = self.values()
+            self.__mean = float(values.mean())
+            self.__m2 = float(((values - self.__mean) ** 2).sum())
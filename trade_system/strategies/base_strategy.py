@@ -2,9 +2,10 @@ import abc
 import logging
 from typing import Optional
 
-from tinkoff.invest import HistoricCandle, OrderBook
+from tinkoff.invest import HistoricCandle
 
 from configuration.settings import StrategySettings
+from invest_api.book_snapshot import BookSnapshot
 from trade_system.signal import Signal
 
 __all__ = ("IStrategy")
@@ -23,7 +24,7 @@ class IStrategy(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def analyze_books(self, book: OrderBook) -> Optional[Signal]:
+    def analyze_books(self, book: BookSnapshot) -> Optional[Signal]:
         pass
         
     @abc.abstractmethod
@@ -33,3 +34,9 @@ class IStrategy(abc.ABC):
     @abc.abstractmethod
     def update_short_status(self, status: bool) -> None:
         pass
+
+    def stats(self) -> dict:
+        """
+        :return: Counters of strategy for the end of trading day log
+        """
+        return dict()
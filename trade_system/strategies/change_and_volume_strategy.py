@@ -6,6 +6,7 @@ from tinkoff.invest import HistoricCandle
 from tinkoff.invest.utils import quotation_to_decimal
 
 from configuration.settings import StrategySettings
+from invest_api.book_snapshot import BookSnapshot
 from trade_system.signal import Signal, SignalType
 from trade_system.strategies.base_strategy import IStrategy
 
@@ -77,24 +78,10 @@ class ChangeAndVolumeStrategy(IStrategy):
 
         return None
 
-    def analyze_books(self, books: list[HistoricBook]) -> Optional[Signal]:
+    def analyze_books(self, book: BookSnapshot) -> Optional[Signal]:
         """
-        The method analyzes books and returns his decision.
+        The strategy works with candles only.
         """
-        logger.debug(f"Start analyze books for {self.settings.figi} strategy {__name__}. "
-                     f"Books count: {len(candles)}")
-
-        if not self.__update_recent_candles(candles):
-            return None
-
-        if self.__is_match_long():
-            logger.info(f"Signal (LONG) {self.settings.figi} has been found.")
-            return self.__make_signal(SignalType.LONG, self.__long_take, self.__long_stop)
-
-        if self.settings.short_enabled_flag and self.__is_match_short():
-            logger.info(f"Signal (SHORT) {self.settings.figi} has been found.")
-            return self.__make_signal(SignalType.SHORT, self.__short_take, self.__short_stop)
-
         return None
 
     def __update_recent_candles(self, candles: list[HistoricCandle]) -> bool:
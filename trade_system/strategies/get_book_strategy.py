@@ -1,13 +1,15 @@
 import logging
-import numpy as np
 from decimal import Decimal
 from typing import Optional
 
 
-from tinkoff.invest import OrderBook, Order, HistoricCandle
-from tinkoff.invest.utils import quotation_to_decimal
+from tinkoff.invest import HistoricCandle
 
 from configuration.settings import StrategySettings
+from invest_api.book_snapshot import BookSnapshot
+from invest_api.utils import nanos_to_decimal, nanos_to_float
+from trade_system.pair_synchronizer import PairSynchronizer
+from trade_system.rolling_window import RollingWindow
 from trade_system.signal import Signal, SignalType
 from trade_system.strategies.base_strategy import IStrategy
 
@@ -30,6 +32,8 @@ class GetBookStrategy(IStrategy):
     __SHORT_TAKE_NAME = "SHORT_TAKE"
     __SHORT_STOP_NAME = "SHORT_STOP"
     __SIGNAL_MIN_TAIL_NAME = "SIGNAL_MIN_TAIL"
+    __MAX_BOOK_AGE_MS_NAME = "MAX_BOOK_AGE_MS"
+    __LIVE_SIGNALS_NAME = "LIVE_SIGNALS"
 
     def __init__(self, settings: StrategySettings) -> None:
         self.__settings = settings
@@ -43,12 +47,19 @@ class GetBookStrategy(IStrategy):
 
         self.__short_take = Decimal(settings.settings[self.__SHORT_TAKE_NAME])
         self.__short_stop = Decimal(settings.settings[self.__SHORT_STOP_NAME])
+
+        # Optional, 0 - books of the future and the basic asset are paired regardless of their age
+        self.__max_book_age_ns = int(settings.settings.get(self.__MAX_BOOK_AGE_MS_NAME, "0")) * 1_000_000
+        # Optional, signals of analyze_books are disabled by default (the strategy is only an example)
+        self.__live_signals = settings.settings.get(self.__LIVE_SIGNALS_NAME, "0") == "1"
         
         self.__recent_candles = []
         self.__last_book = None
         self.__last_paired_book = None
-        self.__long_spreads = []
-        self.__short_spreads = []
+        self.__synchronizer = self.__new_synchronizer()
+        # Spreads are kept in ring buffers with streaming mean and std, so a tick costs O(1)
+        self.__long_spreads = RollingWindow(size=self.__signal_min_ticks, ddof=3)
+        self.__short_spreads = RollingWindow(size=self.__signal_min_ticks, ddof=3)
 
         
 
@@ -64,6 +75,7 @@ class GetBookStrategy(IStrategy):
 
     def update_basic_asset_figi(self, figi: str) -> None:
         self.__settings.basic_asset_figi = figi
+        self.__synchronizer = self.__new_synchronizer()
         
     def update_basic_asset_size(self, size: int) -> None:
         logger.debug(f"update_basic_asset_size {str(size)}")
@@ -71,105 +83,120 @@ class GetBookStrategy(IStrategy):
 
     
 
-    def analyze_books(self, book: OrderBook) -> Optional[Signal]:
+    def analyze_books(self, book: BookSnapshot) -> Optional[Signal]:
         """
         The method analyzes books and returns his decision.
+        Without LIVE_SIGNALS=1 books aren't analyzed and signals aren't returned.
         """
         logger.debug(f"Start analyze books for {self.settings.figi} strategy {__name__}. ")
+
+        if not self.__live_signals:
+            return None
+
+        return self.detect_signal(book)
+
+    def detect_signal(self, book: BookSnapshot) -> Optional[Signal]:
+        """
+        Updates spreads by the book and returns signal if the last spread is out of band.
+        Used by analyze_books (LIVE_SIGNALS=1) and by backtest regardless of LIVE_SIGNALS.
         """
         if not self.__update_recent_books(book):
             return None
 
         if self.__is_match_long():
-            logger.info(f"Long signal detected {self.settings.figi}, ask = {str(self.__last_book.asks[0].price)}, qty = {str(self.__last_book.asks[0].quantity)}")
-            #return self.__make_signal(SignalType.LONG, self.__long_take, self.__long_stop)
+            logger.info(f"Long signal detected {self.settings.figi}, ask = {str(self.__last_book.best_ask)}, qty = {str(self.__last_book.ask_quantities[0])}")
+            return self.__make_signal(SignalType.LONG, self.__long_take, self.__long_stop)
 
         if self.settings.short_enabled_flag and self.__is_match_short():
-            logger.info(f"Short signal detected {self.settings.figi}, bid = {str(self.__last_book.bids[0].price)}, qty = {str(self.__last_book.bids[0].quantity)}")
-            #return self.__make_signal(SignalType.SHORT, self.__short_take, self.__short_stop)
-        """
+            logger.info(f"Short signal detected {self.settings.figi}, bid = {str(self.__last_book.best_bid)}, qty = {str(self.__last_book.bid_quantities[0])}")
+            return self.__make_signal(SignalType.SHORT, self.__short_take, self.__short_stop)
+
         return None
 
-    def __add_spread(self, dest: list, value: Decimal) -> tuple[list, bool]:
-        if dest and dest[-1] == value:
-            return (dest, False)
-        
-        dest.append(value)
+    def stats(self) -> dict:
+        """
+        :return: Counters of paired books (emitted, dropped stale etc.)
+        """
+        return self.__synchronizer.stats()
 
-        spread_len = len(dest)
-        
-        if spread_len < self.__signal_min_ticks:
-            logger.debug(f"Spreads in cache are low than required: {str(self.__signal_min_ticks)}")
-            return (dest, False)
+    def __new_synchronizer(self) -> PairSynchronizer:
+        self.__last_book = None
+        self.__last_paired_book = None
+
+        figies = [self.__settings.figi]
+        if self.__settings.basic_asset_figi:
+            figies.append(self.__settings.basic_asset_figi)
 
-        #sorted(dest, key=lambda x: x.time)
+        return PairSynchronizer(figies, self.__max_book_age_ns)
+
+    def __add_spread(self, dest: RollingWindow, value: float) -> bool:
+        # Only changed spreads are kept
+        if len(dest) and dest.last == value:
+            return False
 
-        # keep only __signal_min_ticks candles in cache
-        if spread_len > self.__signal_min_ticks:
-            dest = dest[spread_len - self.__signal_min_ticks:]
+        # The window keeps only __signal_min_ticks spreads
+        dest.append(value)
+
+        if len(dest) < self.__signal_min_ticks:
+            logger.debug(f"Spreads in cache are low than required: {str(self.__signal_min_ticks)}")
+            return False
 
-        return (dest, True)
+        return True
         
     
     def __update_spread(self) -> bool:
         if not self.__last_book or not self.__last_paired_book:
             return False
        
-        bid = quotation_to_decimal(self.__last_book.bids[0].price)
-        ask = quotation_to_decimal(self.__last_book.asks[0].price)
+        # Prices of books are fixed-point (nanos)
+        bid = nanos_to_float(self.__last_book.best_bid)
+        ask = nanos_to_float(self.__last_book.best_ask)
 
-        base_bid = quotation_to_decimal(self.__last_paired_book.bids[0].price) * self.__settings.basic_asset_size
-        base_ask = quotation_to_decimal(self.__last_paired_book.asks[0].price) * self.__settings.basic_asset_size
+        base_bid = nanos_to_float(self.__last_paired_book.best_bid) * float(self.__settings.basic_asset_size)
+        base_ask = nanos_to_float(self.__last_paired_book.best_ask) * float(self.__settings.basic_asset_size)
 
         base_price = (base_bid + base_ask) / 2
         
         long_spread = ask - base_price
         short_spread = bid - base_price
 
-        self.__long_spreads, is_long_spread_ready = self.__add_spread(self.__long_spreads, long_spread)
-        self.__short_spreads, is_short_spread_ready = self.__add_spread(self.__short_spreads, short_spread)
+        is_long_spread_ready = self.__add_spread(self.__long_spreads, long_spread)
+        is_short_spread_ready = self.__add_spread(self.__short_spreads, short_spread)
         
-        logger.debug(f"long_spread = {str(self.__long_spreads)}")
-        logger.debug(f"short_spread = {str(self.__short_spreads)}")
+        logger.debug(f"long_spread = {long_spread}, mean = {self.__long_spreads.mean}")
+        logger.debug(f"short_spread = {short_spread}, mean = {self.__short_spreads.mean}")
         
         return is_long_spread_ready and is_short_spread_ready
         
         
-    def __update_recent_books(self, book) -> bool:
-        if not (book and book.bids and book.asks):
+    def __update_recent_books(self, book: BookSnapshot) -> bool:
+        if not (book and book.has_bids_and_asks()):
             logger.error(f"Book without bids or asks: {str(book)}")
             return False
         
-        if book.figi == self.settings.figi:
-            self.__last_book = book
-            return self.__update_spread()
-        elif book.figi == self.settings.basic_asset_figi:
-            self.__last_paired_book = book            
-            return self.__update_spread()
-        else:
+        if not self.__synchronizer.has_leg(book.figi):
             logger.error(f"Unknown book: {str(book)}")
             return False
 
+        # Spread is calculated only when books of both legs are fresh
+        if len(self.__synchronizer.figies) < 2 or not self.__synchronizer.update(book):
+            return False
+
+        self.__last_book, self.__last_paired_book = self.__synchronizer.books()
+        return self.__update_spread()
+
     def __is_match_long(self) -> bool:
         """
         Check for LONG signal.
         """
-        mean = np.average(self.__long_spreads)
-        dev = np.std(self.__long_spreads, ddof=3)
-        last = self.__long_spreads[-1]
-
-        return last < mean - dev
+        return self.__long_spreads.last < self.__long_spreads.mean - self.__long_spreads.std
         
 
     def __is_match_short(self) -> bool:
         """
         Check for SHORT signal. 
         """
-        mean = np.average(self.__short_spreads)
-        dev = np.std(self.__short_spreads, ddof=3)
-        last = self.__short_spreads[-1]
-
-        return last > mean + dev
+        return self.__short_spreads.last > self.__short_spreads.mean + self.__short_spreads.std
         
 
     def __make_signal(
@@ -178,14 +205,16 @@ class GetBookStrategy(IStrategy):
             profit_multy: Decimal,
             stop_multy: Decimal
     ) -> Signal:
-        # take and stop based on configuration by close price level (close for last price)
-        last_candle = self.__recent_candles[len(self.__recent_candles) - 1]
+        # take and stop based on configuration by price of the last book (ask for long, bid for short)
+        price = nanos_to_decimal(
+            self.__last_book.best_ask if signal_type == SignalType.LONG else self.__last_book.best_bid
+        )
 
         signal = Signal(
             figi=self.settings.figi,
             signal_type=signal_type,
-            take_profit_level=quotation_to_decimal(last_candle.close) * profit_multy,
-            stop_loss_level=quotation_to_decimal(last_candle.close) * stop_multy
+            take_profit_level=price * profit_multy,
+            stop_loss_level=price * stop_multy
         )
 
         logger.info(f"Make Signal: {signal}")
@@ -0,0 +1,86 @@
+import collections
+import logging
+import time
+import traceback
+
+from invest_api.book_snapshot import BookSnapshot, instrument_ids
+from trade_system.signal import Signal
+from trade_system.strategies.base_strategy import IStrategy
+
+__all__ = ("StrategyDispatcher")
+
+logger = logging.getLogger(__name__)
+
+
+class StrategyDispatcher:
+    """
+    Routes every book to all strategies interested in its instrument (a future and its basic asset legs).
+    Books are decoded once by the stream and the same BookSnapshot is passed to every strategy.
+    Evaluation time, books and signals are counted per strategy.
+    """
+    def __init__(self, strategies: dict[str, list[IStrategy]]) -> None:
+        """
+        :param strategies: Figi -> strategies which analyze books of the figi
+        """
+        # Instrument id -> strategies (dispatch table)
+        self.__table: dict[int, list[IStrategy]] = dict()
+        for figi, figi_strategies in strategies.items():
+            self.__table[instrument_ids.id(figi)] = list(dict.fromkeys(figi_strategies))
+
+        self.__stats: dict[IStrategy, dict] = collections.defaultdict(lambda: {
+            "books": 0,
+            "signals": 0,
+            "errors": 0,
+            "total_time_ms": 0.0,
+            "max_time_ms": 0.0
+        })
+
+    def figies(self) -> list[str]:
+        return [instrument_ids.figi(x) for x in self.__table.keys()]
+
+    def dispatch(self, book: BookSnapshot) -> list[tuple[IStrategy, Signal]]:
+        """
+        :return: Signals of strategies for the book
+        """
+        signals = []
+
+        for strategy in self.__table.get(book.instrument_id, ()):
+            strategy_stats = self.__stats[strategy]
+
+            start_time = time.perf_counter()
+            try:
+                signal = strategy.analyze_books(book)
+            except Exception as ex:
+                # Error of one strategy doesn't stop others
+                strategy_stats["errors"] += 1
+                logger.error(f"Strategy {strategy.settings.ticker} error: {repr(ex)}")
+                logger.debug(traceback.format_exc())
+                signal = None
+
+            elapsed_ms = (time.perf_counter() - start_time) * 1000
+            strategy_stats["books"] += 1
+            strategy_stats["total_time_ms"] += elapsed_ms
+            strategy_stats["max_time_ms"] = max(strategy_stats["max_time_ms"], elapsed_ms)
+
+            if signal:
+                strategy_stats["signals"] += 1
+                signals.append((strategy, signal))
+
+        return signals
+
+    def stats(self) -> list[tuple[str, dict]]:
+        """
+        :return: Statistics by strategy (ticker and name of strategy, several strategies may have the same name)
+        """
+        return [
+            (
+                f"{strategy.settings.ticker} {strategy.settings.name}",
+                {
+                    **strategy_stats,
+                    "mean_time_ms": strategy_stats["total_time_ms"] / strategy_stats["books"]
+                    if strategy_stats["books"] else 0.0,
+                    **strategy.stats()
+                }
+            )
+            for strategy, strategy_stats in self.__stats.items()
+        ]
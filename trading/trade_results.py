@@ -1,3 +1,4 @@
+import time
 from dataclasses import dataclass
 
 from trade_system.signal import Signal
@@ -10,6 +11,10 @@ class TradeOrder:
     open_order_id: str
     signal: Signal
     close_order_id: str = ""
+    # Close order has been requested and its result is unknown yet
+    is_closing: bool = False
+    # Monotonic time of the next close attempt after failed one
+    close_retry_time: float = 0.0
 
 
 class TradeResults:
@@ -46,6 +51,29 @@ class TradeResults:
 
         return current_trade_order
 
+    def start_closing(self, figi: str) -> bool:
+        """
+        Marks the current trade order of figi as closing, so the position is closed only once.
+        :return: False if there is no trade order, it's closing already or retry time after failed close hasn't come
+        """
+        current_order = self.get_current_trade_order(figi)
+
+        if not current_order or current_order.is_closing or time.monotonic() < current_order.close_retry_time:
+            return False
+
+        current_order.is_closing = True
+        return True
+
+    def close_failed(self, figi: str, retry_delay: float) -> None:
+        """
+        The position of the current trade order can be closed again after the delay (seconds)
+        """
+        current_order = self.get_current_trade_order(figi)
+
+        if current_order:
+            current_order.is_closing = False
+            current_order.close_retry_time = time.monotonic() + retry_delay
+
     def close_position(
             self,
             figi: str,
@@ -5,38 +5,41 @@ import traceback
 
 from blog.blogger import Blogger
 from keeper.keeper import Keeper
+from invest_api.instrument_registry import InstrumentRegistry
 from configuration.settings import AccountSettings, TradingSettings, BlogSettings, StrategySettings
-from invest_api.services.accounts_service import AccountService
-from invest_api.services.client_service import ClientService
-from invest_api.services.instruments_service import InstrumentService
-from invest_api.services.market_data_service import MarketDataService
-from invest_api.services.operations_service import OperationService
-from invest_api.services.orders_service import OrderService
+from invest_api.services.accounts_service import AsyncAccountService
+from invest_api.services.client_service import AsyncClientService
+from invest_api.services.instruments_service import AsyncInstrumentService
+from invest_api.services.market_data_service import AsyncMarketDataService
+from invest_api.services.operations_service import AsyncOperationService
+from invest_api.services.orders_service import AsyncOrderService
 from invest_api.services.market_data_stream_service import MarketDataStreamService
 from invest_api.utils import get_next_morning
 from trade_system.strategies.base_strategy import IStrategy
 from trading.trader import Trader
+from trading.universe_builder import UniverseBuilder
 
 __all__ = ("TradeService")
 
 logger = logging.getLogger(__name__)
 
-
 class TradeService:
     """
     Represent logic keep trading going
     """
     def __init__(
             self,
-            account_service: AccountService,
-            client_service: ClientService,
-            instrument_service: InstrumentService,
-            operation_service: OperationService,
-            order_service: OrderService,
+            account_service: AsyncAccountService,
+            client_service: AsyncClientService,
+            instrument_service: AsyncInstrumentService,
+            operation_service: AsyncOperationService,
+            order_service: AsyncOrderService,
             stream_service: MarketDataStreamService,
-            market_data_service: MarketDataService,
+            market_data_service: AsyncMarketDataService,
             blogger: Blogger,
             keeper: Keeper,
+            instrument_registry: InstrumentRegistry,
+            universe_builder: UniverseBuilder,
             account_settings: AccountSettings,
             trading_settings: TradingSettings,
             strategies: list[IStrategy]
@@ -50,6 +53,8 @@ class TradeService:
         self.__market_data_service = market_data_service
         self.__blogger = blogger
         self.__keeper = keeper
+        self.__instrument_registry = instrument_registry
+        self.__universe_builder = universe_builder
         self.__account_settings = account_settings
         self.__trading_settings = trading_settings
         self.__strategies = strategies
@@ -57,7 +62,7 @@ class TradeService:
     async def worker(self) -> None:
         try:
             logger.info("Finding account for trading")
-            account_id = self.__account_service.trading_account_id(self.__account_settings)
+            account_id = await self.__account_service.trading_account_id(self.__account_settings)
 
             if not account_id:
                 logger.error("Account for trading hasn't been found")
@@ -69,16 +74,21 @@ class TradeService:
             logger.error(f"Start trading error: {repr(ex)}")
             return None
 
-        await self.__working_loop(account_id)
+        # Rate of preparation requests is limited by tariff in the rate limiter of api channel,
+        # so only count of parallel requests is limited here
+        preparation_concurrency = max(1, self.__trading_settings.preparation_concurrency)
+        logger.info(f"Preparation concurrency: {preparation_concurrency}")
+
+        await self.__working_loop(account_id, preparation_concurrency)
 
-    async def __working_loop(self, account_id: str) -> None:
+    async def __working_loop(self, account_id: str, preparation_concurrency: int) -> None:
         logger.info("Start every day trading")
 
         while True:
             logger.info("Check trading schedule on today")
             next_time = get_next_morning()
             try:
-                is_trading_day, start_time, end_time, next_time = self.__instrument_service.moex_today_trading_schedule()
+                is_trading_day, start_time, end_time, next_time = await self.__instrument_service.moex_today_trading_schedule()
                 # for tests purposes
                 #is_trading_day, start_time, end_time = \
                 #    True, \
@@ -88,6 +98,10 @@ class TradeService:
                 if is_trading_day and datetime.datetime.now(datetime.UTC) <= end_time:
                     logger.info(f"Today is trading day. Start time: {start_time}, End time: {end_time}, Next time: {next_time}")
 
+                    # Strategies from configuration and generated for all suitable futures
+                    today_strategies = self.__strategies + \
+                        await self.__universe_builder.build({x.settings.figi for x in self.__strategies})
+
                     await TradeService.__sleep_to(
                         start_time # + datetime.timedelta(seconds=self.__trading_settings.delay_start_after_open)
                     )
@@ -102,11 +116,13 @@ class TradeService:
                         stream_service=self.__stream_service,
                         market_data_service=self.__market_data_service,
                         blogger=self.__blogger,
-                        keeper=self.__keeper
+                        keeper=self.__keeper,
+                        instrument_registry=self.__instrument_registry,
+                        preparation_concurrency=preparation_concurrency
                     ).trade_day(
                         account_id,
                         self.__trading_settings,
-                        self.__strategies,
+                        today_strategies,
                         end_time,
                         self.__account_settings.min_rub_on_account
                     )
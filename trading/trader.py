@@ -1,31 +1,41 @@
+import asyncio
 import datetime
 import collections
 import logging
+import time
 import traceback
 from decimal import Decimal
+from typing import Awaitable, Coroutine, Optional
 
 
-from tinkoff.invest import Candle, OrderBook, OrderExecutionReportStatus
-from tinkoff.invest.utils import quotation_to_decimal
+from tinkoff.invest import OrderExecutionReportStatus
 
 from blog.blogger import Blogger
 from keeper.keeper import Keeper
-from invest_api.services.client_service import ClientService
-from invest_api.services.instruments_service import InstrumentService
-from invest_api.services.market_data_service import MarketDataService
-from invest_api.services.operations_service import OperationService
-from invest_api.services.orders_service import OrderService
+from invest_api.channel_manager import ChannelManager
+from invest_api.instrument_registry import InstrumentRegistry
+from invest_api.invest_error_decorators import circuit_breakers
+from invest_api.services.client_service import AsyncClientService
+from invest_api.services.instruments_service import AsyncInstrumentService
+from invest_api.services.market_data_service import AsyncMarketDataService
+from invest_api.services.operations_service import AsyncOperationService
+from invest_api.services.orders_service import AsyncOrderService
 from invest_api.services.market_data_stream_service import MarketDataStreamService
-from invest_api.utils import candle_to_historiccandle
-from trade_system.signal import SignalType
+from invest_api.book_snapshot import BookSnapshot
+from invest_api.utils import is_trading_available, nanos_to_decimal
+from trade_system.signal import Signal, SignalType
 from trade_system.strategies.base_strategy import IStrategy
+from trading.strategy_dispatcher import StrategyDispatcher
 from trading.trade_results import TradeResults
-from configuration.settings import TradingSettings
+from configuration.settings import InstrumentSettings, TradingSettings
 
 __all__ = ("Trader")
 
 logger = logging.getLogger(__name__)
 
+# Delay before the next attempt to close a position after failed one (seconds)
+CLOSE_RETRY_DELAY = 60.0
+
 
 class Trader:
     """
@@ -34,14 +44,16 @@ class Trader:
 
     def __init__(
             self,
-            client_service: ClientService,
-            instrument_service: InstrumentService,
-            operation_service: OperationService,
-            order_service: OrderService,
+            client_service: AsyncClientService,
+            instrument_service: AsyncInstrumentService,
+            operation_service: AsyncOperationService,
+            order_service: AsyncOrderService,
             stream_service: MarketDataStreamService,
-            market_data_service: MarketDataService,
+            market_data_service: AsyncMarketDataService,
             blogger: Blogger,
-            keeper: Keeper
+            keeper: Keeper,
+            instrument_registry: InstrumentRegistry,
+            preparation_concurrency: int
     ) -> None:
         self.__today_trade_results: TradeResults = None
         self.__client_service = client_service
@@ -52,7 +64,13 @@ class Trader:
         self.__market_data_service = market_data_service
         self.__blogger = blogger
         self.__keeper = keeper
-        self.__tickers: dict[str, str] = collections.defaultdict(None)
+        self.__instrument_registry = instrument_registry
+        self.__preparation_concurrency = preparation_concurrency
+
+        # Order and position requests are executed by order worker, so books are dispatched without waiting for api
+        self.__order_requests: asyncio.Queue = asyncio.Queue()
+        # Figies with open or close requests in the queue or in progress
+        self.__pending_figies: set[str] = set()
 
     async def trade_day(
             self,
@@ -63,14 +81,14 @@ class Trader:
             min_rub: int
     ) -> None:
         logger.info("Start preparations for trading today")
-        today_trade_strategies = self.__get_today_strategies(strategies)
+        today_trade_strategies = await self.__get_today_strategies(strategies)
         if not today_trade_strategies:
             logger.info("No shares to trade today.")
             return None
 
-        #self.__clear_all_positions(account_id, today_trade_strategies)
+        #await self.__clear_all_positions(account_id, today_trade_strategies)
 
-        rub_before_trade_day = self.__operation_service.available_rub_on_account(account_id)
+        rub_before_trade_day = await self.__operation_service.available_rub_on_account(account_id)
         logger.info(f"Amount of RUB on account {rub_before_trade_day} and minimum for trading: {min_rub}")
         if rub_before_trade_day < min_rub:
             return None
@@ -98,20 +116,33 @@ class Trader:
         """
         try:
             if self.__today_trade_results:
-                for key_figi, value_order_id in self.__clear_all_positions(account_id, today_trade_strategies).items():
+                for key_figi, value_order_id in (await self.__clear_all_positions(account_id, today_trade_strategies)).items():
                     trade_order = self.__today_trade_results.close_position(key_figi, value_order_id)
                     self.__blogger.close_position_message(trade_order)
             else:
-                self.__clear_all_positions(account_id, today_trade_strategies)
+                await self.__clear_all_positions(account_id, today_trade_strategies)
         except Exception as ex:
             logger.error(f"Finishing trading error: {repr(ex)}")
         """
         logger.info("Show trade results today")
         try:
-            self.__summary_today_trade_results(account_id, rub_before_trade_day)
+            await self.__summary_today_trade_results(account_id, rub_before_trade_day)
         except Exception as ex:
             logger.error(f"Summary trading day error: {repr(ex)}")
 
+        self.__log_statistics()
+
+    @staticmethod
+    def __log_statistics() -> None:
+        logger.info("Api requests statistics:")
+        for breaker in circuit_breakers():
+            logger.info(f"{breaker.name}: {breaker.stats()}")
+
+        logger.info("Api rate limits statistics:")
+        for channel_manager in ChannelManager.managers():
+            for group_name, group_stats in channel_manager.rate_limiter.stats().items():
+                logger.info(f"{group_name}: {group_stats}")
+
     
     async def __trading_orderbook(
             self,
@@ -132,19 +163,176 @@ class Trader:
         
         self.__today_trade_results = TradeResults()
 
-        logger.info(f"Subscribe and read OrderBook for {strategies.keys()}, end_time = {})
-        
-        async for book in self.__stream_service.start_async_orderbook_stream(
-                list(strategies.keys()),
-                trade_before_time
-        ):
-            self.__keeper.save_data(book, self.__get_ticker(book.figi))
+        dispatcher = StrategyDispatcher(strategies)
+        # Future figi -> strategy (lot size for closing of positions)
+        future_strategies = _future_strategies(strategies)
+        # The last book of every instrument (prices for orders)
+        last_books: dict[str, BookSnapshot] = dict()
+
+        logger.info(f"Subscribe and read OrderBook for {strategies.keys()}, end_time = {trade_before_time}")
+
+        order_worker = asyncio.create_task(self.__order_worker(), name="OrderWorker")
+        try:
+            async for book in self.__stream_service.start_async_orderbook_stream(
+                    dispatcher.figies(),
+                    trade_before_time
+            ):
+                await self.__keeper.save_data(book)
+
+                figi = book.figi
+                last_books[figi] = book
+
+                try:
+                    current_trade_order = self.__today_trade_results.get_current_trade_order(figi)
+                    if current_trade_order and self.__is_position_should_be_closed(current_trade_order.signal, book) \
+                            and self.__today_trade_results.start_closing(figi):
+                        logger.info(f"Take or stop level has been reached: {current_trade_order.signal}")
+                        self.__submit_order_request(
+                            figi, self.__close_position_and_send_message(account_id, figi, future_strategies)
+                        )
+
+                    # The same book is analyzed by all strategies of the figi
+                    signals = dispatcher.dispatch(book)
+                    if signals and datetime.datetime.now(datetime.UTC) < signals_before_time:
+                        for strategy, signal in signals:
+                            self.__process_signal(account_id, strategy, signal, last_books, future_strategies)
+                except Exception as ex:
+                    logger.error(f"Trading by book {figi} error: {repr(ex)}")
+                    logger.error(traceback.format_exc())
+
+            # Orders of the last books are completed before results of the day
+            await self.__order_requests.join()
+        finally:
+            order_worker.cancel()
+            await asyncio.gather(order_worker, return_exceptions=True)
+
+            # Requests left after stream error aren't executed
+            while not self.__order_requests.empty():
+                _, request = self.__order_requests.get_nowait()
+                request.close()
+                self.__order_requests.task_done()
+            self.__pending_figies.clear()
+
+        await self.__keeper.save_data(None)
+        logger.info(f"Keeper statistics: {self.__keeper.stats()}")
+
+        logger.info("Strategies statistics:")
+        for strategy_name, strategy_stats in dispatcher.stats():
+            logger.info(f"{strategy_name}: {strategy_stats}")
 
-        self.__keeper.save_data(None)
         logger.info("Today trading has been completed")
 
+    def __process_signal(
+            self,
+            account_id: str,
+            strategy: IStrategy,
+            signal: Signal,
+            last_books: dict[str, BookSnapshot],
+            future_strategies: dict[str, IStrategy]
+    ) -> None:
+        if signal.signal_type == SignalType.CLOSE:
+            if self.__today_trade_results.start_closing(signal.figi):
+                logger.info(f"Close position by signal: {signal}")
+                self.__submit_order_request(
+                    signal.figi, self.__close_position_and_send_message(account_id, signal.figi, future_strategies)
+                )
+            return None
+
+        # One position per future
+        if self.__today_trade_results.get_current_trade_order(signal.figi) or signal.figi in self.__pending_figies:
+            logger.debug(f"Signal is skipped, position is opened: {signal}")
+            return None
+
+        book = last_books.get(signal.figi, None)
+        if not (book and book.has_bids_and_asks()):
+            logger.info(f"Signal is skipped, no book for price: {signal}")
+            return None
+
+        self.__submit_order_request(signal.figi, self.__open_position_and_send_message(account_id, strategy, signal, book))
+
+    def __submit_order_request(self, figi: str, request: Coroutine) -> None:
+        self.__pending_figies.add(figi)
+        self.__order_requests.put_nowait((figi, request))
+
+    async def __order_worker(self) -> None:
+        """
+        Executes order and position requests one by one in order of signals
+        """
+        while True:
+            figi, request = await self.__order_requests.get()
+            try:
+                await request
+            except Exception as ex:
+                logger.error(f"Order request {figi} error: {repr(ex)}")
+                logger.error(traceback.format_exc())
+            finally:
+                self.__pending_figies.discard(figi)
+                self.__order_requests.task_done()
+
+    async def __open_position_and_send_message(
+            self,
+            account_id: str,
+            strategy: IStrategy,
+            signal: Signal,
+            book: BookSnapshot
+    ) -> None:
+        open_order_id = await self.__open_position(account_id, strategy, signal, book)
+        if open_order_id:
+            trade_order = self.__today_trade_results.open_position(signal.figi, open_order_id, signal)
+            self.__blogger.open_position_message(trade_order)
+
+    async def __open_position(
+            self,
+            account_id: str,
+            strategy: IStrategy,
+            signal: Signal,
+            book: BookSnapshot
+    ) -> Optional[str]:
+        """
+        Post market order by signal
+        :return: Order id if the order has been filled
+        """
+        is_buy = signal.signal_type == SignalType.LONG
+        price = nanos_to_decimal(book.best_ask if is_buy else book.best_bid)
+
+        count_lots = await self.__open_position_lots_count(
+            account_id,
+            strategy.settings.max_lots_per_order,
+            price,
+            strategy.settings.lot_size
+        )
+        if count_lots < 1:
+            logger.info(f"Not enough money to open position: {signal}")
+            return None
+
+        open_order = await self.__order_service.post_market_order(
+            account_id=account_id,
+            figi=signal.figi,
+            count_lots=count_lots,
+            is_buy=is_buy
+        )
+        if open_order and \
+                (open_order.execution_report_status == OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_FILL or
+                 open_order.execution_report_status == OrderExecutionReportStatus.EXECUTION_REPORT_STATUS_PARTIALLYFILL):
+            return open_order.order_id
+
+        logger.info(f"Open order status failed: {open_order}")
+        return None
+
+    @staticmethod
+    def __is_position_should_be_closed(signal: Signal, book: BookSnapshot) -> bool:
+        if not book.has_bids_and_asks():
+            return False
+
+        if signal.signal_type == SignalType.LONG:
+            bid = nanos_to_decimal(book.best_bid)
+            return bid >= signal.take_profit_level or bid <= signal.stop_loss_level
+
+        ask = nanos_to_decimal(book.best_ask)
+        return ask <= signal.take_profit_level or ask >= signal.stop_loss_level
+
         
-    def __summary_today_trade_results(
+    async def __summary_today_trade_results(
             self,
             account_id: str,
             rub_before_trade_day: Decimal
@@ -152,7 +340,7 @@ class Trader:
         logger.info("Today trading summary:")
         self.__blogger.summary_message()
 
-        current_rub_on_depo = self.__operation_service.available_rub_on_account(account_id)
+        current_rub_on_depo = await self.__operation_service.available_rub_on_account(account_id)
         logger.info(f"RUBs on account before:{rub_before_trade_day}, after:{current_rub_on_depo}")
 
         today_profit = current_rub_on_depo - rub_before_trade_day
@@ -165,7 +353,7 @@ class Trader:
             for figi_key, trade_order_value in self.__today_trade_results.get_current_open_orders().items():
                 logger.info(f"Stock: {figi_key}")
 
-                open_order_state = self.__order_service.get_order_state(account_id, trade_order_value.open_order_id)
+                open_order_state = await self.__order_service.get_order_state(account_id, trade_order_value.open_order_id)
                 logger.info(f"Signal {trade_order_value.signal}")
                 logger.info(f"Open: {open_order_state}")
                 self.__blogger.summary_open_signal_message(trade_order_value, open_order_state)
@@ -176,8 +364,8 @@ class Trader:
             for figi_key, trade_orders_value in self.__today_trade_results.get_closed_orders().items():
                 logger.info(f"Stock: {figi_key}")
                 for trade_order in trade_orders_value:
-                    open_order_state = self.__order_service.get_order_state(account_id, trade_order.open_order_id)
-                    close_order_state = self.__order_service.get_order_state(account_id, trade_order.close_order_id)
+                    open_order_state = await self.__order_service.get_order_state(account_id, trade_order.open_order_id)
+                    close_order_state = await self.__order_service.get_order_state(account_id, trade_order.close_order_id)
                     logger.info(f"Signal {trade_order.signal}")
                     logger.info(f"Open: {open_order_state}")
                     logger.info(f"Close: {close_order_state}")
@@ -189,7 +377,7 @@ class Trader:
 
         self.__blogger.final_message()
 
-    def __open_position_lots_count(
+    async def __open_position_lots_count(
             self,
             account_id: str,
             max_lots_per_order: int,
@@ -199,52 +387,61 @@ class Trader:
         """
         Calculate counts of lots for order
         """
-        current_rub_on_depo = self.__operation_service.available_rub_on_account(account_id)
+        current_rub_on_depo = await self.__operation_service.available_rub_on_account(account_id)
 
         available_lots = int(current_rub_on_depo / (share_lot_size * price))
 
         return available_lots if max_lots_per_order > available_lots else max_lots_per_order
 
-    def __clear_all_positions(
+    async def __clear_all_positions(
             self,
             account_id: str,
-            strategies: dict[str, IStrategy]
+            strategies: dict[str, list[IStrategy]]
     ) -> dict[str, str]:
         logger.info("Clear all orders and close all open positions")
 
         logger.debug("Cancel all order.")
-        self.__client_service.cancel_all_orders(account_id)
+        await self.__client_service.cancel_all_orders(account_id)
 
         logger.debug("Close all positions.")
-        return self.__close_position_by_figi(account_id, strategies.keys(), strategies)
+        # Positions are opened by futures of strategies
+        future_strategies = _future_strategies(strategies)
+        return await self.__close_position_by_figi(account_id, list(future_strategies.keys()), future_strategies)
 
-    def __close_position_and_send_message(
+    async def __close_position_and_send_message(
             self,
             account_id: str,
             figi: str,
             strategies: dict[str, IStrategy]
     ) -> None:
-        close_order_id = self.__close_position_by_figi(account_id, [figi], strategies).get(figi, None)
-        if close_order_id:
-            trade_order = self.__today_trade_results.close_position(figi, close_order_id)
-            self.__blogger.close_position_message(trade_order)
+        close_order_id = None
+        try:
+            close_order_id = (await self.__close_position_by_figi(account_id, [figi], strategies)).get(figi, None)
+        finally:
+            if close_order_id:
+                trade_order = self.__today_trade_results.close_position(figi, close_order_id)
+                self.__blogger.close_position_message(trade_order)
+            else:
+                logger.error(f"Position {figi} hasn't been closed, the next attempt in {CLOSE_RETRY_DELAY} s")
+                self.__today_trade_results.close_failed(figi, CLOSE_RETRY_DELAY)
 
-    def __close_position_by_figi(
+    async def __close_position_by_figi(
             self,
             account_id: str,
             figies: list[str],
             strategies: dict[str, IStrategy]
     ) -> dict[str, str]:
         result: dict[str, str] = dict()
-        current_positions = self.__operation_service.positions_securities(account_id)
+        # Positions of shares and futures
+        current_positions = await self.__operation_service.open_positions(account_id)
 
         if current_positions:
             logger.info(f"Current positions: {current_positions}")
             for position in current_positions:
                 if position.figi in figies:
                     # Check a stock
-                    if self.__market_data_service.is_stock_ready_for_trading(position.figi):
-                        close_order = self.__order_service.post_market_order(
+                    if await self.__market_data_service.is_stock_ready_for_trading(position.figi):
+                        close_order = await self.__order_service.post_market_order(
                             account_id=account_id,
                             figi=position.figi,
                             count_lots=abs(int(position.balance / strategies[position.figi].settings.lot_size)),
@@ -257,52 +454,127 @@ class Trader:
                             logger.info(f"Close order status failed: {close_order}")
         return result
 
-    def __add_ticker(self, figi: str, ticker: str) -> None:
-        self.__tickers[figi] = ticker
-
-    def __get_ticker(self, figi: str) -> str:
-        return self.__tickers[figi]
-    
-    def __get_today_strategies(self, strategies: list[IStrategy]) -> dict[str, list[IStrategy]]:
+    async def __get_today_strategies(self, strategies: list[IStrategy]) -> dict[str, list[IStrategy]]:
         """
         Check and Select stocks for trading today.
+        Strategies are checked concurrently, count of parallel api requests is limited.
         """
         logger.info("Check futures and strategy settings")
+        await self.__instrument_registry.refresh()
+
         today_trade_strategy: dict[str, list[IStrategy]] = collections.defaultdict(list)
-        
-        for strategy in strategies:
-            logger.info(f"Update strategy settings: {str(strategy)}")
-            
-            future_settings = self.__instrument_service.future_by_figi(strategy.settings.figi)
-            logger.debug(f"Check share settings for figi {strategy.settings.figi}: {future_settings}")
-
-            if (not future_settings.otc_flag) \
-                    and future_settings.buy_available_flag \
-                    and future_settings.sell_available_flag \
-                    and future_settings.api_trade_available_flag:
-                logger.debug(f"Future is ready for trading")
-
-                self.__add_ticker(future_settings.figi, future_settings.ticker)
-                
-                # refresh information by latest info
-                strategy.update_lot_count(future_settings.lot)
-                strategy.update_short_status(future_settings.short_enabled_flag)
-                strategy.update_basic_asset_size(future_settings.basic_asset_size)
-
-                # Find basic asset for future
-                instruments = self.__instrument_service.find_instrument(future_settings.basic_asset_position_uid)
-                if not instruments:
-                    logger.info(f"Not found basic asset for future: {future_settings.figi}")
-                    continue
-
-                self.__add_ticker(instruments[0].figi, instruments[0].ticker)
-                basic_asset_figi = instruments[0].figi
-                strategy.update_basic_asset_figi(basic_asset_figi)
-                
+
+        requests_semaphore = asyncio.Semaphore(self.__preparation_concurrency)
+        basic_asset_requests: dict[str, asyncio.Task] = dict()
+
+        start_time = time.perf_counter()
+        basic_assets = await asyncio.gather(
+            *[self.__prepare_strategy(strategy, requests_semaphore, basic_asset_requests) for strategy in strategies],
+            return_exceptions=True
+        )
+        logger.info(f"Strategies have been checked: {len(strategies)}, time: {time.perf_counter() - start_time:.3f} s")
+
+        for strategy, basic_asset in zip(strategies, basic_assets):
+            if isinstance(basic_asset, Exception):
+                logger.error(f"Check strategy {str(strategy)} error: {repr(basic_asset)}")
+                continue
+
+            if basic_asset:
                 # Формируем словарь из основного и парного инструментов
-                today_trade_strategy[strategy.settings.figi] = [strategy]
-                today_trade_strategy[basic_asset_figi] = [strategy]
-                    
+                # Several strategies can trade one future or share one basic asset
+                today_trade_strategy[strategy.settings.figi].append(strategy)
+                today_trade_strategy[basic_asset.figi].append(strategy)
 
         logger.debug(f"Generated list of Instruments {str(today_trade_strategy)}")
         return today_trade_strategy
+
+    async def __prepare_strategy(
+            self,
+            strategy: IStrategy,
+            requests_semaphore: asyncio.Semaphore,
+            basic_asset_requests: dict[str, asyncio.Task]
+    ) -> Optional[InstrumentSettings]:
+        """
+        Refresh strategy settings by future and its basic asset.
+        :return: Basic asset if the future is ready for trading
+        """
+        logger.info(f"Update strategy settings: {str(strategy)}")
+
+        future_settings = self.__instrument_registry.future(strategy.settings.figi)
+        if not future_settings:
+            future_settings = await Trader.__timed_request(
+                f"FutureBy {strategy.settings.figi}",
+                self.__instrument_service.future_by_figi(strategy.settings.figi),
+                requests_semaphore
+            )
+            self.__instrument_registry.add(future_settings)
+        logger.debug(f"Check share settings for figi {strategy.settings.figi}: {future_settings}")
+
+        if not is_trading_available(future_settings):
+            return None
+
+        logger.debug(f"Future is ready for trading")
+
+        # refresh information by latest info
+        strategy.update_lot_count(future_settings.lot)
+        strategy.update_short_status(future_settings.short_enabled_flag)
+        strategy.update_basic_asset_size(future_settings.basic_asset_size)
+
+        # Find basic asset for future. Futures with the same basic asset share one request.
+        basic_asset_request = basic_asset_requests.get(future_settings.basic_asset_position_uid, None)
+        if not basic_asset_request:
+            basic_asset_request = asyncio.create_task(
+                self.__find_basic_asset(future_settings.basic_asset_position_uid, requests_semaphore)
+            )
+            basic_asset_requests[future_settings.basic_asset_position_uid] = basic_asset_request
+
+        basic_asset = await basic_asset_request
+        if not basic_asset:
+            logger.info(f"Not found basic asset for future: {future_settings.figi}")
+            return None
+
+        strategy.update_basic_asset_figi(basic_asset.figi)
+
+        return basic_asset
+
+    async def __find_basic_asset(
+            self,
+            basic_asset_position_uid: str,
+            requests_semaphore: asyncio.Semaphore
+    ) -> Optional[InstrumentSettings]:
+        basic_asset = self.__instrument_registry.by_position_uid(basic_asset_position_uid)
+
+        if not basic_asset:
+            instruments = await Trader.__timed_request(
+                f"FindInstrument {basic_asset_position_uid}",
+                self.__instrument_service.find_instrument(basic_asset_position_uid),
+                requests_semaphore
+            )
+            if not instruments:
+                return None
+
+            basic_asset = InstrumentSettings(
+                ticker=instruments[0].ticker,
+                figi=instruments[0].figi,
+                uid=instruments[0].uid,
+                position_uid=basic_asset_position_uid
+            )
+            self.__instrument_registry.add(basic_asset)
+
+        return basic_asset
+
+    @staticmethod
+    async def __timed_request(name: str, request: Awaitable, requests_semaphore: asyncio.Semaphore):
+        async with requests_semaphore:
+            start_time = time.perf_counter()
+            try:
+                return await request
+            finally:
+                logger.info(f"Request {name} time: {time.perf_counter() - start_time:.3f} s")
+
+
+def _future_strategies(strategies: dict[str, list[IStrategy]]) -> dict[str, IStrategy]:
+    """
+    :return: Future figi -> strategy
+    """
+    return {strategy.settings.figi: strategy for figi_strategies in strategies.values() for strategy in figi_strategies}
@@ -0,0 +1,84 @@
+import logging
+
+from configuration.settings import UniverseSettings, StrategySettings, FutureSettings
+from invest_api.instrument_registry import InstrumentRegistry
+from invest_api.utils import is_trading_available
+from trade_system.strategies.base_strategy import IStrategy
+from trade_system.strategies.strategy_factory import StrategyFactory
+
+__all__ = ("UniverseBuilder")
+
+logger = logging.getLogger(__name__)
+
+
+class UniverseBuilder:
+    """
+    The class creates strategies for all pairs future - basic asset from instruments cache.
+    Futures and basic assets are joined in memory, so no api request is required for every pair.
+    """
+    def __init__(
+            self,
+            instrument_registry: InstrumentRegistry,
+            universe_settings: UniverseSettings
+    ) -> None:
+        self.__instrument_registry = instrument_registry
+        self.__universe_settings = universe_settings
+
+    async def build(self, skip_figies: set[str] = frozenset()) -> list[IStrategy]:
+        """
+        :param skip_figies: futures with manually configured strategies
+        :return: New strategy for every future ready for trading
+        """
+        if not self.__universe_settings.universe_status:
+            return []
+
+        await self.__instrument_registry.refresh()
+
+        result: list[IStrategy] = []
+        # Basic assets without order books in the cache (e.g. indexes IMOEX, RTSI)
+        unresolved: set[str] = set()
+
+        for future in self.__instrument_registry.futures():
+            if future.figi in skip_figies or not is_trading_available(future):
+                continue
+
+            basic_asset = self.__instrument_registry.by_position_uid(future.basic_asset_position_uid)
+            if not basic_asset:
+                unresolved.add(future.basic_asset)
+                continue
+
+            if self.__universe_settings.basic_assets \
+                    and basic_asset.ticker not in self.__universe_settings.basic_assets:
+                continue
+
+            strategy = StrategyFactory.new_factory(
+                self.__universe_settings.strategy_name,
+                self.__strategy_settings(future, basic_asset.figi)
+            )
+
+            if not strategy:
+                logger.error(f"Unknown strategy name: {self.__universe_settings.strategy_name}")
+                return []
+
+            result.append(strategy)
+
+        if unresolved:
+            logger.warning(f"Futures of basic assets not found in instruments cache are skipped: "
+                           f"{', '.join(sorted(unresolved))}")
+
+        logger.info(f"Universe strategies count: {len(result)}")
+
+        return result
+
+    def __strategy_settings(self, future: FutureSettings, basic_asset_figi: str) -> StrategySettings:
+        return StrategySettings(
+            name=self.__universe_settings.strategy_name,
+            figi=future.figi,
+            ticker=future.ticker,
+            max_lots_per_order=self.__universe_settings.max_lots_per_order,
+            settings=self.__universe_settings.settings,
+            lot_size=future.lot,
+            short_enabled_flag=future.short_enabled_flag,
+            basic_asset_figi=basic_asset_figi,
+            basic_asset_size=future.basic_asset_size
+        )